@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Backup Store
+Incremental, content-addressed and compressed backups of all channel data
+"""
+
+import os
+import json
+import gzip
+import hashlib
+from datetime import datetime, timedelta
+from env_loader import get_settings
+
+DEFAULT_BACKUP_DIR = "backups"
+CHUNK_RECORDS = 256  # Records per chunk of a list part
+KEEP_LAST = 10       # Most recent backups always kept
+KEEP_DAILY = 30      # Days for which the last backup of the day is kept
+
+class BackupStore:
+    """Point-in-time backups that only store what changed since earlier ones.
+
+    Every part of a backup (a channel's todo list, the sync log) is cut
+    into chunks of `chunk_records` records. Each chunk is written once,
+    gzip-compressed, under the SHA-256 of its canonical JSON, so a run in
+    which todos were only appended or a few completed adds just the
+    touched chunks plus a small manifest naming the chunks of each part.
+    restore() reassembles the newest backup at or before any point in
+    time, and prune() applies the retention policy, then deletes chunks
+    no remaining manifest refers to.
+    """
+
+    def __init__(self, backup_dir=DEFAULT_BACKUP_DIR, chunk_records=CHUNK_RECORDS,
+                 keep_last=KEEP_LAST, keep_daily=KEEP_DAILY):
+        self.backup_dir = backup_dir
+        self.objects_dir = os.path.join(backup_dir, 'objects')
+        self.manifests_dir = os.path.join(backup_dir, 'manifests')
+        self.chunk_records = chunk_records
+        self.keep_last = keep_last
+        self.keep_daily = keep_daily
+
+    def object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], f"{digest}.json.gz")
+
+    def manifest_path(self, backup_id):
+        return os.path.join(self.manifests_dir, f"{backup_id}.json")
+
+    def write_atomic(self, path, data, compress=False):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_file = f"{path}.tmp"
+        opener = gzip.open if compress else open
+        with opener(tmp_file, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_file, path)
+
+    def put_object(self, data):
+        """Store one chunk unless it exists already; returns (digest, bytes written)"""
+        payload = json.dumps(data, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        digest = hashlib.sha256(payload).hexdigest()
+        path = self.object_path(digest)
+        if os.path.exists(path):
+            return digest, 0
+        self.write_atomic(path, payload, compress=True)
+        return digest, os.path.getsize(path)
+
+    def read_object(self, digest):
+        with gzip.open(self.object_path(digest), 'rb') as f:
+            return json.load(f)
+
+    def backup(self, parts, created=None):
+        """Back up {name: list of records | dict}; returns (backup id, stats)"""
+        created = created or datetime.now()
+        backup_id = created.strftime('%Y%m%d_%H%M%S_%f')
+        stats = {'chunks': 0, 'new_chunks': 0, 'bytes_written': 0}
+        manifest = {'created': created.isoformat(), 'parts': {}}
+
+        for name, data in parts.items():
+            if isinstance(data, list):
+                chunks = [data[i:i + self.chunk_records] for i in range(0, len(data), self.chunk_records)]
+                entry = {'type': 'list', 'records': len(data), 'chunks': []}
+            else:
+                chunks = [data]
+                entry = {'type': 'object', 'chunks': []}
+
+            for chunk in chunks:
+                digest, written = self.put_object(chunk)
+                entry['chunks'].append(digest)
+                stats['chunks'] += 1
+                if written:
+                    stats['new_chunks'] += 1
+                    stats['bytes_written'] += written
+            manifest['parts'][name] = entry
+
+        data = json.dumps(manifest, separators=(',', ':')).encode('utf-8')
+        self.write_atomic(self.manifest_path(backup_id), data)
+        stats['bytes_written'] += len(data)
+        return backup_id, stats
+
+    def list_backups(self):
+        """Backup ids, oldest first"""
+        try:
+            names = os.listdir(self.manifests_dir)
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-5] for name in names if name.endswith('.json'))
+
+    def load_manifest(self, backup_id):
+        with open(self.manifest_path(backup_id), 'r') as f:
+            return json.load(f)
+
+    def find(self, at=None):
+        """Id of the newest backup taken at or before `at` (datetime or ISO string)"""
+        if isinstance(at, str):
+            at = datetime.fromisoformat(at)
+        for backup_id in reversed(self.list_backups()):
+            if at is None or datetime.fromisoformat(self.load_manifest(backup_id)['created']) <= at:
+                return backup_id
+        return None
+
+    def iter_records(self, backup_id, part):
+        """Stream one list part of a backup, a chunk at a time"""
+        for digest in self.load_manifest(backup_id)['parts'][part]['chunks']:
+            yield from self.read_object(digest)
+
+    def restore(self, at=None):
+        """Contents of the backup in effect at `at` (latest if None), or None"""
+        backup_id = self.find(at)
+        if backup_id is None:
+            return None
+
+        manifest = self.load_manifest(backup_id)
+        restored = {'backup_id': backup_id, 'backup_created': manifest['created']}
+        for name, entry in manifest['parts'].items():
+            if entry['type'] == 'list':
+                restored[name] = list(self.iter_records(backup_id, name))
+            else:
+                restored[name] = self.read_object(entry['chunks'][0])
+        return restored
+
+    def prune(self, now=None):
+        """Drop backups outside the retention policy and unreferenced chunks.
+
+        Keeps the `keep_last` newest backups plus the last backup of each
+        of the past `keep_daily` days. Returns (backups removed, chunks removed).
+        """
+        now = now or datetime.now()
+        backup_ids = self.list_backups()
+        keep = set(backup_ids[-self.keep_last:]) if self.keep_last else set()
+
+        oldest_day = (now - timedelta(days=self.keep_daily)).date()
+        last_of_day = {}
+        for backup_id in backup_ids:
+            created = datetime.fromisoformat(self.load_manifest(backup_id)['created'])
+            if created.date() > oldest_day:
+                last_of_day[created.date()] = backup_id
+        keep.update(last_of_day.values())
+
+        removed = 0
+        referenced = set()
+        for backup_id in backup_ids:
+            if backup_id in keep:
+                for entry in self.load_manifest(backup_id)['parts'].values():
+                    referenced.update(entry['chunks'])
+            else:
+                os.remove(self.manifest_path(backup_id))
+                removed += 1
+
+        # Chunks are shared between backups; only those no kept backup uses go
+        removed_chunks = 0
+        if removed:
+            for root, _, files in os.walk(self.objects_dir):
+                for name in files:
+                    if name.endswith('.json.gz') and name[:-8] not in referenced:
+                        os.remove(os.path.join(root, name))
+                        removed_chunks += 1
+        return removed, removed_chunks
+
+def open_backup_store():
+    """Backup store configured from .env (BACKUP_DIR, BACKUP_KEEP_LAST, BACKUP_KEEP_DAILY)"""
+    settings = get_settings()
+    return BackupStore(
+        settings.backup_dir or DEFAULT_BACKUP_DIR,
+        keep_last=KEEP_LAST if settings.backup_keep_last is None else settings.backup_keep_last,
+        keep_daily=KEEP_DAILY if settings.backup_keep_daily is None else settings.backup_keep_daily
+    )
+
+def test_backups(runs=30, todos_per_run=200):
+    """Compare incremental backups against full JSON dumps over simulated sync runs"""
+    import time
+    import tempfile
+
+    print(f"🧪 Backing up {runs} sync runs ({todos_per_run} new todos each)...")
+
+    workdir = tempfile.mkdtemp()
+    store = BackupStore(os.path.join(workdir, 'backups'), keep_last=5, keep_daily=0)
+    todos = []
+    full_bytes = full_time = incremental_time = 0.0
+    checkpoints = {}
+    start = datetime(2026, 1, 1, 9, 0)
+
+    for run in range(runs):
+        for _ in range(todos_per_run):
+            todos.append({'id': len(todos) + 1, 'description': f"Follow up on item {len(todos) + 1}",
+                          'phone_number': '919742814697', 'status': 'pending',
+                          'created_at': start.isoformat(), 'completed_at': None})
+        for todo in todos[run * 7:run * 7 + 5]:  # A few old todos get completed each run
+            todo['status'] = 'completed'
+        parts = {'whatsapp_todos': todos, 'sync_log': {'last_sync': run}}
+        created = start + timedelta(days=run)
+
+        started = time.perf_counter()
+        full_file = os.path.join(workdir, f"emergency_backup_{run}.json")
+        with open(full_file, 'w') as f:
+            json.dump({'backup_created': created.isoformat(), **parts}, f, indent=2)
+        full_time += time.perf_counter() - started
+        full_bytes += os.path.getsize(full_file)
+
+        started = time.perf_counter()
+        backup_id, stats = store.backup(parts, created=created)
+        incremental_time += time.perf_counter() - started
+        checkpoints[created] = json.loads(json.dumps(parts))
+
+    object_bytes = sum(os.path.getsize(os.path.join(root, name))
+                       for root, _, files in os.walk(store.backup_dir) for name in files)
+    print(f"   • full dumps   {full_bytes / 1e6:>7.2f} MB  {full_time * 1000:>7.1f}ms")
+    print(f"   • incremental  {object_bytes / 1e6:>7.2f} MB  {incremental_time * 1000:>7.1f}ms"
+          f"  (last run wrote {stats['new_chunks']}/{stats['chunks']} chunks)")
+
+    when = start + timedelta(days=runs // 2, hours=3)
+    restored = store.restore(when)
+    expected = checkpoints[start + timedelta(days=runs // 2)]
+    print(f"⏪ Restore as of {when:%Y-%m-%d %H:%M}: {restored['backup_id']} "
+          f"({len(restored['whatsapp_todos'])} todos, matches: {restored['whatsapp_todos'] == expected['whatsapp_todos']})")
+
+    removed, removed_chunks = store.prune(now=start + timedelta(days=runs))
+    latest = store.restore()
+    print(f"🧹 Pruned {removed} backups and {removed_chunks} chunks; {len(store.list_backups())} kept, "
+          f"latest intact: {latest['whatsapp_todos'] == todos}")
+
+def main():
+    import sys
+
+    store = open_backup_store()
+    command = sys.argv[1] if len(sys.argv) > 1 else 'list'
+
+    if command == 'test':
+        test_backups()
+    elif command == 'list':
+        for backup_id in store.list_backups():
+            manifest = store.load_manifest(backup_id)
+            sizes = ", ".join(f"{name} {entry.get('records', 1)}" for name, entry in manifest['parts'].items())
+            print(f"💾 {backup_id}  {manifest['created']}  ({sizes})")
+    elif command == 'restore':
+        at = sys.argv[2] if len(sys.argv) > 2 else None
+        restored = store.restore(at)
+        if restored is None:
+            print(f"❌ No backup found{' at or before ' + at if at else ''}")
+            return
+        output = sys.argv[3] if len(sys.argv) > 3 else f"restored_backup_{restored['backup_id']}.json"
+        with open(output, 'w') as f:
+            json.dump(restored, f, indent=2)
+        print(f"⏪ Restored backup {restored['backup_id']} ({restored['backup_created']}) to {output}")
+    elif command == 'prune':
+        removed, removed_chunks = store.prune()
+        print(f"🧹 Removed {removed} backups and {removed_chunks} unreferenced chunks")
+    else:
+        print("Usage: python backup_store.py [list | restore [YYYY-MM-DDTHH:MM:SS] [output.json] | prune | test]")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+WhatsApp Command Parser
+Compiles the todo command grammar once and dispatches on command keywords
+"""
+
+import re
+import time
+
+# Command patterns in priority order: the first pattern that matches
+# anywhere in the message wins
+COMMAND_PATTERNS = [
+    ('add', [
+        r'add todo[:\s]+(.+)',
+        r'new todo[:\s]+(.+)',
+        r'create todo[:\s]+(.+)',
+        r'todo[:\s]+(.+)',
+        r'task[:\s]+(.+)',
+    ]),
+    ('complete', [
+        r'complete[:\s]+(?:#)?(\d+)',
+        r'done[:\s]+(?:#)?(\d+)',
+        r'finished[:\s]+(?:#)?(\d+)',
+        r'mark done[:\s]+(?:#)?(\d+)',
+    ]),
+    ('list', [
+        r'list todos?',
+        r'show todos?',
+        r'my todos?',
+        r'what are my todos?',
+        r'pending todos?',
+    ]),
+    ('help', [
+        r'help',
+        r'how to use',
+        r'commands',
+        r'what can you do',
+    ]),
+]
+
+class CommandParser:
+    """Keyword-dispatch matcher for the WhatsApp command grammar.
+
+    Patterns are compiled once. Each pattern starts with a literal keyword
+    ("add todo", "done", "help", ...) that must appear in the message for it
+    to match, so a single scan for any keyword settles plain-text messages
+    immediately, and otherwise only patterns whose keyword is present are
+    tried, in the original priority order.
+    """
+
+    def __init__(self, command_patterns=COMMAND_PATTERNS):
+        self.rules = []
+        for action, pattern_list in command_patterns:
+            for pattern in pattern_list:
+                self.rules.append((action, re.compile(pattern), self.leading_literal(pattern)))
+
+        keywords = sorted({keyword for _, _, keyword in self.rules}, key=len, reverse=True)
+        self.keyword_regex = re.compile('|'.join(re.escape(keyword) for keyword in keywords))
+
+    def leading_literal(self, pattern):
+        """Literal text every match of pattern must contain (its leading words)"""
+        literal = re.match(r'[a-z ]*', pattern).group(0)
+        if pattern[len(literal):].startswith('?'):
+            literal = literal[:-1]  # Last character is optional, e.g. "todos?"
+        if not literal.strip():
+            raise ValueError(f"Command pattern needs a leading keyword: {pattern}")
+        return literal
+
+    def parse(self, message):
+        """Return (action, data) for a stripped, lower-cased message"""
+        if self.keyword_regex.search(message):
+            for action, regex, keyword in self.rules:
+                if keyword not in message:
+                    continue
+                match = regex.search(message)
+                if match:
+                    if action == 'add':
+                        return action, match.group(1).strip()
+                    elif action == 'complete':
+                        return action, int(match.group(1))
+                    else:
+                        return action, None
+
+        # If no pattern matches, treat as add todo
+        if len(message) > 3:  # Avoid very short messages
+            return 'add', message
+
+        return 'unknown', None
+
+COMMAND_PARSER = CommandParser()
+
+def legacy_parse(message):
+    """Previous implementation: build the pattern table and re.search each entry"""
+    patterns = {action: pattern_list for action, pattern_list in COMMAND_PATTERNS}
+
+    for action, pattern_list in patterns.items():
+        for pattern in pattern_list:
+            match = re.search(pattern, message)
+            if match:
+                if action in ['add']:
+                    return action, match.group(1).strip()
+                elif action in ['complete']:
+                    return action, int(match.group(1))
+                else:
+                    return action, None
+
+    if len(message) > 3:
+        return 'add', message
+
+    return 'unknown', None
+
+def benchmark_corpus(size=20000):
+    """Real-looking WhatsApp messages covering every command and plain text"""
+    samples = [
+        "Add todo: Send quarterly report to board",
+        "new todo call the plumber about the kitchen sink",
+        "Task: Review budget",
+        "todo: book flights for the offsite",
+        "Complete 5",
+        "done #12",
+        "Finished: 7",
+        "mark done 3",
+        "List todos",
+        "show todo",
+        "What are my todos?",
+        "pending todos",
+        "Help",
+        "how to use this?",
+        "commands",
+        "what can you do",
+        "Review marketing budget for Q2",
+        "Pick up groceries on the way home and remember the milk",
+        "Call investor meeting",
+        "ok",
+        "Can you help me complete 4 please",
+        "Remind the team about tomorrow's standup at 10",
+        "Send the signed contract back to legal before Friday",
+        "Thanks!",
+    ]
+    return [samples[i % len(samples)].strip().lower() for i in range(size)]
+
+def benchmark(size=20000, rounds=5):
+    """Compare messages/sec of the compiled parser against the legacy loop"""
+    corpus = benchmark_corpus(size)
+
+    mismatches = [m for m in corpus if COMMAND_PARSER.parse(m) != legacy_parse(m)]
+    if mismatches:
+        print(f"❌ Parsers disagree on {len(mismatches)} messages, e.g. {mismatches[0]!r}")
+        return False
+
+    print(f"⏱️  Parsing {len(corpus)} messages, best of {rounds} rounds")
+    print("-" * 40)
+
+    results = {}
+    for name, parse in [('legacy', legacy_parse), ('compiled', COMMAND_PARSER.parse)]:
+        best = None
+        for _ in range(rounds):
+            start = time.perf_counter()
+            for message in corpus:
+                parse(message)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        results[name] = len(corpus) / best
+        print(f"   • {name:<9} {results[name]:>12,.0f} msgs/sec")
+
+    print(f"🚀 Speedup: {results['compiled'] / results['legacy']:.1f}x")
+    return True
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'bench':
+        benchmark()
+    else:
+        print("Usage: python command_parser.py bench")
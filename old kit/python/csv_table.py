@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+CSV Table
+Keyed CSV file with a cached parse, per-row byte offsets and append-only updates
+"""
+
+import io
+import os
+import csv
+
+def in_quoted_field(line, in_quotes=False):
+    """Whether a quoted field is still open at the end of line.
+
+    Only a quote at the start of a field opens a quoted field; a stray
+    quote inside an unquoted one (rows written before the sheet was
+    quoted, e.g. 'Review 5" screen draft') is just a character.
+    """
+    pos = 0
+    while True:
+        quote = line.find(b'"', pos)
+        if quote < 0:
+            return in_quotes
+        if in_quotes:
+            if line[quote + 1:quote + 2] == b'"':
+                pos = quote + 2  # Escaped quote
+                continue
+            in_quotes = False
+        elif quote == 0 or line[quote - 1:quote] == b',':
+            in_quotes = True
+        pos = quote + 1
+
+class CsvTable:
+    """CSV file keyed on its first column, read and patched without full rewrites.
+
+    The parsed table is cached and only re-read when the file's mtime or
+    size changes behind our back. Each row's byte offset is remembered, so
+    an update that keeps the row the same length is written in place;
+    otherwise the new version of the row is appended and wins over earlier
+    rows with the same key. Superseded rows are dropped by `compact()`,
+    which runs automatically once they outnumber the live rows.
+    """
+
+    def __init__(self, path, header, compact_threshold=1000):
+        self.path = path
+        self.header = header
+        self.compact_threshold = compact_threshold
+        self.signature = None
+        self.records = {}     # key -> row (latest version)
+        self.offsets = {}     # key -> (offset, length) of the latest version on disk
+        self.superseded = 0
+        self.ends_with_newline = True
+
+    def ensure_exists(self):
+        if not os.path.exists(self.path):
+            with open(self.path, 'w', newline='', encoding='utf-8') as f:
+                f.write(self.encode_row(self.header).decode('utf-8'))
+
+    def encode_row(self, row):
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator='\n').writerow(row)
+        return buffer.getvalue().encode('utf-8')
+
+    def file_signature(self):
+        try:
+            stat = os.stat(self.path)
+            return (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            return None
+
+    def refresh(self):
+        """Re-parse the file if it changed since we last read or wrote it"""
+        signature = self.file_signature()
+        if signature == self.signature:
+            return
+        self.load()
+
+    def load(self):
+        self.records = {}
+        self.offsets = {}
+        self.superseded = 0
+        self.ends_with_newline = True
+
+        if not os.path.exists(self.path):
+            self.signature = None
+            return
+
+        with open(self.path, 'rb') as f:
+            lines = f.readlines()
+        self.ends_with_newline = not lines or lines[-1].endswith(b'\n')
+
+        offset = len(lines[0]) if lines else 0  # Header row
+        index = 1
+        while index < len(lines):
+            # A quoted field may span lines; the record goes on while one is open
+            end = index + 1
+            quoted = b'"' in lines[index] and in_quoted_field(lines[index])
+            while quoted and end < len(lines):
+                quoted = in_quoted_field(lines[end], quoted)
+                end += 1
+
+            raw = b''.join(lines[index:end])
+            row = self.parse(raw)
+            if end - index > 1 and (row is None or len(row) != len(self.header)):
+                # Multi-line rows are always written whole (one field per column), so
+                # the quote was a stray one in an old unquoted row: take its line alone
+                # and carry on reading from the next one
+                end = index + 1
+                raw = lines[index]
+                row = self.parse(raw)
+
+            self.add_record(row, raw, offset)
+            offset += len(raw)
+            index = end
+
+        self.signature = self.file_signature()
+
+    def parse(self, raw):
+        """Fields of one raw record (None if it cannot be read as CSV)"""
+        try:
+            return next(csv.reader([raw.decode('utf-8').rstrip('\r\n')]), [])
+        except csv.Error:
+            return None
+
+    def add_record(self, row, raw, offset):
+        if row is None:
+            print(f"⚠️  Skipping unreadable row in {self.path}: {raw!r}")
+            return
+        if not any(field.strip() for field in row):
+            return  # Blank line
+        key = row[0]
+        if key in self.records:
+            self.superseded += 1
+        self.records[key] = row
+        self.offsets[key] = (offset, len(raw))
+
+    def rows(self):
+        """All live rows in first-seen order (latest version of each)"""
+        self.refresh()
+        return list(self.records.values())
+
+    def get(self, key):
+        self.refresh()
+        return self.records.get(str(key))
+
+    def keys(self):
+        self.refresh()
+        return list(self.records.keys())
+
+    def append(self, row):
+        """Append a new row (or a newer version of an existing one)"""
+        self.append_many([row])
+
+    def append_many(self, rows):
+        """Append several rows with a single write"""
+        self.refresh()
+        self.ensure_exists()
+        encoded = [self.encode_row(row) for row in rows]
+
+        with open(self.path, 'ab') as f:
+            if not self.ends_with_newline:
+                f.write(b'\n')
+            offset = f.tell()
+            f.write(b''.join(encoded))
+
+        for row, data in zip(rows, encoded):
+            key = row[0]
+            if key in self.records:
+                self.superseded += 1
+            self.records[key] = list(row)
+            self.offsets[key] = (offset, len(data))
+            offset += len(data)
+        self.ends_with_newline = True
+        self.signature = self.file_signature()
+
+    def update(self, key, column, value):
+        """Set one column of a row; returns False if the key is unknown"""
+        key = str(key)
+        self.refresh()
+        row = self.records.get(key)
+        if row is None:
+            return False
+
+        new_row = list(row)
+        while len(new_row) <= column:
+            new_row.append('')
+        new_row[column] = value
+        data = self.encode_row(new_row)
+
+        offset, length = self.offsets[key]
+        if len(data) == length:
+            with open(self.path, 'r+b') as f:
+                f.seek(offset)
+                f.write(data)
+            self.records[key] = new_row
+            self.signature = self.file_signature()
+        else:
+            self.append(new_row)
+            if self.superseded > max(self.compact_threshold, len(self.records)):
+                self.compact()
+        return True
+
+    def compact(self):
+        """Rewrite the file with only the latest version of each row"""
+        self.refresh()
+        tmp_file = f"{self.path}.tmp"
+        with open(tmp_file, 'wb') as f:
+            f.write(self.encode_row(self.header))
+            for row in self.records.values():
+                f.write(self.encode_row(row))
+        os.replace(tmp_file, self.path)
+        self.load()
+
+def test_table():
+    """Round-trip awkward rows, including legacy ones with stray quotes"""
+    import tempfile
+
+    print("🧪 Testing CSV table parsing and updates...")
+    header = ["ID", "Todo Item", "Status", "Date Added", "Due Date", "Priority", "Notes"]
+    path = os.path.join(tempfile.mkdtemp(), "table.csv")
+    with open(path, 'w', encoding='utf-8') as f:
+        # Rows as the old unquoted writer produced them, stray quotes and all
+        f.write('ID,Todo Item,Status,Date Added,Due Date,Priority,Notes\n'
+                '1,Review 5" screen draft,Pending,2025-01-01,,Medium,\n'
+                '2,"Urgent" call the bank,Pending,2025-01-01,,High,\n'
+                '3,"Never closed,Pending,2025-01-01,,Low,\n'
+                '4,Book flights,Pending,2025-01-01,,Medium,\n')
+
+    table = CsvTable(path, header)
+    table.append_many([
+        ["5", 'Send "Q2, plan"\nto the board', "Pending", "2025-01-02", "", "High", ""],
+        ["6", "Plan outing", "Pending", "2025-01-02", "", "Low", 'Say "hi"'],
+    ])
+    table.update(1, 2, "Pending!")   # Same length: rewritten in place
+    table.update(4, 2, "Completed")  # Longer: new version appended
+
+    expected = {
+        '1': ['1', 'Review 5" screen draft', 'Pending!', '2025-01-01', '', 'Medium', ''],
+        '2': ['2', 'Urgent call the bank', 'Pending', '2025-01-01', '', 'High', ''],
+        '3': ['3', 'Never closed,Pending,2025-01-01,,Low,'],
+        '4': ['4', 'Book flights', 'Completed', '2025-01-01', '', 'Medium', ''],
+        '5': ['5', 'Send "Q2, plan"\nto the board', 'Pending', '2025-01-02', '', 'High', ''],
+        '6': ['6', 'Plan outing', 'Pending', '2025-01-02', '', 'Low', 'Say "hi"'],
+    }
+    for name, reader in [("cached", table), ("reloaded", CsvTable(path, header))]:
+        rows = {row[0]: row for row in reader.rows()}
+        print(f"   • {name:<8} {len(rows)} rows, match: {rows == expected}")
+        for key in expected:
+            if rows.get(key) != expected[key]:
+                print(f"     ❌ #{key}: {rows.get(key)!r} != {expected[key]!r}")
+
+    table.compact()
+    rows = {row[0]: row for row in CsvTable(path, header).rows()}
+    print(f"   • compacted {len(rows)} rows, {table.superseded} superseded, match: {rows == expected}")
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'test':
+        test_table()
+    else:
+        print("Usage: python csv_table.py test")
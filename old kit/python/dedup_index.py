@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Cross-Channel Dedup Index
+Recognizes the same task arriving via WhatsApp, email, Sheets or GitHub
+"""
+
+import os
+import re
+import json
+import zlib
+import hashlib
+import threading
+from env_loader import get_settings
+
+DEFAULT_INDEX_FILE = "dedup_index.jsonl"
+
+CHANNEL_PREFIX = re.compile(r'^\s*\[(whatsapp|email|github|sheets)\]\s*', re.IGNORECASE)
+NON_WORD = re.compile(r'[^\w\s]+')
+WHITESPACE = re.compile(r'\s+')
+
+def normalize(text):
+    """Canonical form of a todo description for duplicate detection"""
+    text = CHANNEL_PREFIX.sub('', text or '')
+    text = NON_WORD.sub(' ', text.lower())
+    return WHITESPACE.sub(' ', text).strip()
+
+def content_key(text):
+    """Hash of an already normalized description"""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+class DedupIndex:
+    """Set of (destination, content hash) pairs already written.
+
+    Exact duplicates are found with one hash lookup. Entries are appended
+    to a JSON-lines file, so recording a new item never rewrites the
+    index. With `fuzzy_threshold` set, near-duplicates ("call investor"
+    vs "call the investor") are also caught: MinHash signatures over
+    character 3-grams are bucketed in bands so only a handful of
+    candidates are compared by Jaccard similarity.
+    """
+
+    NUM_HASHES = 16
+    BAND_SIZE = 2
+
+    def __init__(self, index_file=DEFAULT_INDEX_FILE, fuzzy_threshold=None):
+        self.index_file = index_file
+        self.fuzzy_threshold = fuzzy_threshold
+        self.lock = threading.Lock()
+        self.keys = {}       # destination -> set of content keys
+        self.texts = {}      # (destination, key) -> normalized text (fuzzy mode)
+        self.bands = {}      # (destination, band, band hash) -> set of keys
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.index_file):
+            return
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        entry = json.loads(line)
+                        self.remember(entry['d'], entry['k'], entry.get('t', ''))
+        except Exception as e:
+            print(f"Error loading dedup index: {e}")
+
+    def remember(self, destination, key, text):
+        self.keys.setdefault(destination, set()).add(key)
+        if self.fuzzy_threshold:
+            self.texts[(destination, key)] = text
+            for band in self.band_hashes(text):
+                self.bands.setdefault((destination,) + band, set()).add(key)
+
+    def shingles(self, text):
+        if len(text) < 3:
+            return {text}
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def band_hashes(self, text):
+        shingles = self.shingles(text)
+        signature = [
+            min(zlib.crc32(f"{seed}:{shingle}".encode('utf-8')) for shingle in shingles)
+            for seed in range(self.NUM_HASHES)
+        ]
+        return [
+            (band, tuple(signature[band * self.BAND_SIZE:(band + 1) * self.BAND_SIZE]))
+            for band in range(self.NUM_HASHES // self.BAND_SIZE)
+        ]
+
+    def find_near_duplicate(self, destination, text):
+        candidates = set()
+        for band in self.band_hashes(text):
+            candidates |= self.bands.get((destination,) + band, set())
+
+        shingles = self.shingles(text)
+        for key in candidates:
+            other = self.shingles(self.texts[(destination, key)])
+            similarity = len(shingles & other) / len(shingles | other)
+            if similarity >= self.fuzzy_threshold:
+                return key
+        return None
+
+    def seen(self, destination, description):
+        """True if this description (or a near-duplicate) already went to destination"""
+        text = normalize(description)
+        key = content_key(text)
+        with self.lock:
+            if key in self.keys.get(destination, ()):
+                return True
+            if self.fuzzy_threshold and text:
+                return self.find_near_duplicate(destination, text) is not None
+        return False
+
+    def add(self, destination, description):
+        """Record that description was written to destination"""
+        text = normalize(description)
+        key = content_key(text)
+        with self.lock:
+            if key in self.keys.get(destination, ()):
+                return False
+            self.remember(destination, key, text)
+            try:
+                with open(self.index_file, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps({'d': destination, 'k': key, 't': text}) + '\n')
+            except Exception as e:
+                print(f"Error saving dedup index: {e}")
+        return True
+
+    def count(self, destination):
+        with self.lock:
+            return len(self.keys.get(destination, ()))
+
+    def seed(self, destination, descriptions):
+        """Index what a destination already holds (first run after upgrading)"""
+        added = 0
+        for description in descriptions:
+            if self.add(destination, description):
+                added += 1
+        return added
+
+_dedup_index = None
+_dedup_lock = threading.Lock()
+
+def get_dedup_index():
+    """Return the process-wide dedup index"""
+    global _dedup_index
+    with _dedup_lock:
+        if _dedup_index is None:
+            settings = get_settings()
+            _dedup_index = DedupIndex(
+                settings.dedup_index_file or DEFAULT_INDEX_FILE,
+                fuzzy_threshold=settings.dedup_fuzzy_threshold
+            )
+        return _dedup_index
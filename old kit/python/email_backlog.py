@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Email Backlog Processing
+Catches up on a large unseen-mail backlog with a pool of parser processes
+"""
+
+import os
+import time
+from email import policy
+from email.parser import BytesHeaderParser
+from concurrent.futures import ProcessPoolExecutor
+from mail_body import extract_body
+from todo_extractor import TODO_EXTRACTOR
+
+def parse_email(raw):
+    """Worker: raw message bytes -> (sender, subject, todos)"""
+    headers = BytesHeaderParser(policy=policy.default).parsebytes(raw)
+    todos = TODO_EXTRACTOR.extract(extract_body(raw))
+    return str(headers['From']), str(headers['Subject'] or "No Subject"), todos
+
+def process_backlog(manager, folder='INBOX', batch_size=200, workers=None):
+    """Process every unseen email above the watermark, batch by batch.
+
+    MIME parsing and todo extraction run in worker processes while the
+    main process fetches the next batch; results come back in mailbox
+    order and each batch is committed in one store transaction, then
+    recorded in the processed ledger, then the IMAP watermark moves. A
+    crash therefore only ever repeats work, and messages already in the
+    ledger are skipped without being parsed again.
+    """
+    fetcher = manager.connect_to_gmail(folder)
+    if not fetcher:
+        return False
+
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+    done = created = 0
+
+    try:
+        uids = fetcher.search_new()
+        if not uids:
+            print("📧 No email backlog to process")
+            return True
+
+        total = len(uids)
+        batches = [uids[i:i + batch_size] for i in range(0, total, batch_size)]
+        print(f"📥 {total} unseen emails in backlog, parsing with {workers} processes")
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            def submit(batch):
+                raws = [(uid, raw) for uid, raw in fetcher.fetch_raw(batch)
+                        if fetcher.message_key(uid) not in manager.processed_emails]
+                chunksize = max(1, len(raws) // (workers * 4))
+                return batch, raws, pool.map(parse_email, [raw for _, raw in raws], chunksize=chunksize)
+
+            pending = submit(batches[0])
+            for index in range(len(batches)):
+                batch, raws, results = pending
+                # Fetch the next batch while the workers parse this one
+                if index + 1 < len(batches):
+                    pending = submit(batches[index + 1])
+
+                created += commit_batch(manager, fetcher, batch, raws, results)
+                done += len(batch)
+
+                elapsed = time.perf_counter() - started
+                rate = done / elapsed if elapsed else 0.0
+                eta = (total - done) / rate if rate else 0.0
+                print(f"⏳ {done}/{total} emails ({rate:,.0f}/s, ETA {eta:,.0f}s), {created} todos")
+
+        manager.save_processed_emails()
+        print(f"📊 Backlog complete: {done} emails, {created} todos in {time.perf_counter() - started:.1f}s")
+        return True
+
+    except Exception as e:
+        print(f"❌ Error processing email backlog: {e}")
+        return False
+    finally:
+        fetcher.close()
+
+def commit_batch(manager, fetcher, batch, raws, results):
+    """Store one batch's todos in order, then mark its messages processed"""
+    created = 0
+    keys = []
+    with manager.transaction():
+        for (uid, _), (sender, subject, todos) in zip(raws, results):
+            if todos:
+                manager.add_todos_bulk(todos, sender, email_subject=subject)
+                created += len(todos)
+            keys.append(fetcher.message_key(uid))
+
+    for key in keys:
+        manager.processed_emails.add(key)
+    fetcher.commit(batch)
+    return created
+
+def test_backlog(count=2000):
+    """Catch up a synthetic backlog served by the local IMAP stand-in"""
+    import io
+    import tempfile
+    import contextlib
+    from imap_fetcher import start_imap_stand_in, make_test_message
+    from todo_extractor import benchmark_corpus
+    from env_loader import reload_settings
+    from email_todo_integration import EmailTodoManager
+
+    print(f"🧪 Catching up a {count}-email backlog from a local IMAP stand-in...")
+
+    bodies = benchmark_corpus(count)
+    messages = [
+        make_test_message(f"Backlog {i}", body, attachment=b'x' * 4096 if i % 10 == 0 else None)
+        for i, body in enumerate(bodies)
+    ]
+
+    os.environ.update({'GMAIL_USER': 'me@example.com', 'GMAIL_APP_PASSWORD': 'secret',
+                       'IMAP_HOST': 'localhost', 'IMAP_SSL': 'false', 'TODO_STORE_BACKEND': 'json'})
+
+    timings = {}
+    for mode in ('serial', 'backlog'):
+        server, mailbox = start_imap_stand_in()
+        for raw in messages:
+            mailbox.add(raw)
+        os.environ['IMAP_PORT'] = str(server.server_address[1])
+        reload_settings()
+        os.chdir(tempfile.mkdtemp())  # Fresh store, ledger and watermark per run
+
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                manager = EmailTodoManager()
+                started = time.perf_counter()
+                if mode == 'serial':
+                    manager.process_emails(limit=None)
+                else:
+                    process_backlog(manager, batch_size=250)
+                timings[mode] = time.perf_counter() - started
+                rerun = process_backlog(manager) and len(manager.todos)
+            print(f"   • {mode:<8} {timings[mode]:>6.2f}s  {count / timings[mode]:>8,.0f} emails/sec  "
+                  f"{len(manager.todos)} todos (after re-run: {rerun})")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    print(f"🚀 Speedup: {timings['serial'] / timings['backlog']:.1f}x on {os.cpu_count()} CPUs")
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'test':
+        test_backlog(int(sys.argv[2]) if len(sys.argv) > 2 else 2000)
+    else:
+        print("Usage: python email_backlog.py test [count]")
@@ -4,207 +4,115 @@ Email Todo Integration
 Processes emails to create and manage todos via IMAP/SMTP
 """
 
-import os
-import re
-import json
-import imaplib
-import smtplib
-import email
+from collections import deque
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime
-from env_loader import load_env
+from env_loader import get_settings
+from manager_base import ChannelTodoManager
+from imap_fetcher import ImapFetcher, DEFAULT_STATE_FILE
+from message_ledger import MessageLedger
+from mail_sender import get_mail_sender
+from todo_extractor import TODO_EXTRACTOR
+from mail_body import extract_body
+from email_backlog import process_backlog, parse_email
 
-class EmailTodoManager:
-    def __init__(self):
-        load_env()
-        self.gmail_user = os.getenv('GMAIL_USER')
-        self.gmail_password = os.getenv('GMAIL_APP_PASSWORD')
-        self.todo_file = "email_todos.json"
-        self.processed_emails_file = "processed_emails.json"
-        self.load_todos()
-        self.load_processed_emails()
-    
-    def load_todos(self):
-        """Load existing todos from file"""
-        try:
-            if os.path.exists(self.todo_file):
-                with open(self.todo_file, 'r') as f:
-                    self.todos = json.load(f)
-            else:
-                self.todos = []
-        except Exception as e:
-            print(f"Error loading todos: {e}")
-            self.todos = []
+class EmailTodoManager(ChannelTodoManager):
+    CHANNEL = 'email'
+    TABLE = 'email_todos'
+    TODO_FILE = "email_todos.json"
+    OWNER_FIELD = 'sender_email'
+    LAZY_LOADERS = dict(ChannelTodoManager.LAZY_LOADERS, processed_emails='load_processed_emails')
     
-    def save_todos(self):
-        """Save todos to file"""
-        try:
-            with open(self.todo_file, 'w') as f:
-                json.dump(self.todos, f, indent=2)
-        except Exception as e:
-            print(f"Error saving todos: {e}")
+    def __init__(self):
+        super().__init__()
+        settings = get_settings()
+        self.gmail_user = settings.gmail_user
+        self.gmail_password = settings.gmail_password
+        self.processed_emails_file = "processed_emails.log"
+        self.fetcher = ImapFetcher(
+            host=settings.imap_host,
+            user=self.gmail_user,
+            password=self.gmail_password,
+            port=settings.imap_port,
+            use_ssl=settings.imap_ssl,
+            state_file=settings.imap_state_file or DEFAULT_STATE_FILE
+        )
     
     def load_processed_emails(self):
-        """Load list of processed email IDs"""
-        try:
-            if os.path.exists(self.processed_emails_file):
-                with open(self.processed_emails_file, 'r') as f:
-                    self.processed_emails = json.load(f)
-            else:
-                self.processed_emails = []
-        except Exception as e:
-            print(f"Error loading processed emails: {e}")
-            self.processed_emails = []
+        """Load the ledger of processed email IDs"""
+        self.processed_emails = MessageLedger(
+            self.processed_emails_file,
+            legacy_file="processed_emails.json"
+        )
     
     def save_processed_emails(self):
-        """Save processed email IDs"""
+        """Compact the processed email ledger (IDs are appended as they are processed)"""
         try:
-            with open(self.processed_emails_file, 'w') as f:
-                json.dump(self.processed_emails, f, indent=2)
+            self.processed_emails.compact_if_needed()
         except Exception as e:
             print(f"Error saving processed emails: {e}")
     
-    def connect_to_gmail(self):
-        """Connect to Gmail IMAP server"""
+    def connect_to_gmail(self, folder='INBOX'):
+        """Connect to the IMAP server and open a folder"""
         try:
-            mail = imaplib.IMAP4_SSL('imap.gmail.com')
-            mail.login(self.gmail_user, self.gmail_password)
-            return mail
+            self.fetcher.connect()
+            self.fetcher.select(folder)
+            return self.fetcher
         except Exception as e:
             print(f"❌ Error connecting to Gmail: {e}")
+            self.fetcher.close()
             return None
     
     def parse_email_for_todos(self, email_body, sender_email):
-        """Parse email content to extract todo items"""
-        todos = []
-        
-        # Common todo patterns in emails
-        patterns = [
-            r'todo[:\s]*(.+?)(?:\n|$)',
-            r'task[:\s]*(.+?)(?:\n|$)',
-            r'action item[:\s]*(.+?)(?:\n|$)',
-            r'please[:\s]*(.+?)(?:\n|$)',
-            r'reminder[:\s]*(.+?)(?:\n|$)',
-            r'follow up[:\s]*(.+?)(?:\n|$)',
-            r'need to[:\s]*(.+?)(?:\n|$)',
-            r'remember to[:\s]*(.+?)(?:\n|$)',
-        ]
-        
-        # Look for numbered lists
-        numbered_pattern = r'(\d+)\.\s*(.+?)(?:\n|$)'
-        numbered_matches = re.findall(numbered_pattern, email_body, re.IGNORECASE | re.MULTILINE)
-        
-        for _, item in numbered_matches:
-            if len(item.strip()) > 5:  # Avoid very short items
-                todos.append(item.strip())
-        
-        # Look for bullet points
-        bullet_pattern = r'[•\-\*]\s*(.+?)(?:\n|$)'
-        bullet_matches = re.findall(bullet_pattern, email_body, re.MULTILINE)
-        
-        for item in bullet_matches:
-            if len(item.strip()) > 5:
-                todos.append(item.strip())
-        
-        # Look for specific todo patterns
-        for pattern in patterns:
-            matches = re.findall(pattern, email_body, re.IGNORECASE | re.MULTILINE)
-            for match in matches:
-                if len(match.strip()) > 5:
-                    todos.append(match.strip())
-        
-        # If subject line looks like a todo and no todos found in body
-        if not todos and len(email_body.strip()) < 100:  # Short email
-            # Use subject as todo if it seems actionable
-            return [email_body.strip()]
-        
-        return list(set(todos))  # Remove duplicates
+        """Parse email content to extract todo items (in the order they appear)"""
+        return TODO_EXTRACTOR.extract(email_body)
     
     def add_todo(self, description, sender_email, email_subject="", priority="Medium"):
         """Add a new todo from email"""
-        todo_id = len(self.todos) + 1
-        todo = {
-            'id': todo_id,
-            'description': description,
-            'sender_email': sender_email,
-            'email_subject': email_subject,
-            'status': 'pending',
-            'priority': priority,
-            'created_at': datetime.now().isoformat(),
-            'completed_at': None,
-            'source': 'email'
-        }
-        
-        self.todos.append(todo)
-        self.save_todos()
+        with self.lock:
+            todo_id = self.next_todo_id()
+            todo = {
+                'id': todo_id,
+                'description': description,
+                'sender_email': sender_email,
+                'email_subject': email_subject,
+                'status': 'pending',
+                'priority': priority,
+                'created_at': datetime.now().isoformat(),
+                'completed_at': None,
+                'source': 'email'
+            }
+            self.store_new_todo(todo)
         
         print(f"✅ Added email todo #{todo_id}: {description}")
         return todo_id
     
     def process_emails(self, folder='INBOX', limit=10):
-        """Process new emails for todos"""
-        mail = self.connect_to_gmail()
-        if not mail:
+        """Process emails that arrived since the last run"""
+        fetcher = self.connect_to_gmail(folder)
+        if not fetcher:
             return False
         
         try:
-            mail.select(folder)
-            
-            # Search for unread emails
-            status, messages = mail.search(None, 'UNSEEN')
-            email_ids = messages[0].split()
+            todos_created = []
+            processed_count = fetcher.poll(
+                lambda key, raw: todos_created.append(self.process_message(key, raw)),
+                limit=limit
+            )
             
-            if not email_ids:
+            if not processed_count:
                 print("📧 No new emails to process")
                 return True
             
-            processed_count = 0
-            todos_created = 0
-            
-            # Process emails (limit to avoid overwhelming)
-            for email_id in email_ids[-limit:]:
-                email_id_str = email_id.decode()
-                
-                # Skip if already processed
-                if email_id_str in self.processed_emails:
-                    continue
-                
-                status, msg_data = mail.fetch(email_id, '(RFC822)')
-                
-                for response_part in msg_data:
-                    if isinstance(response_part, tuple):
-                        msg = email.message_from_bytes(response_part[1])
-                        
-                        sender = msg['From']
-                        subject = msg['Subject'] or "No Subject"
-                        
-                        # Get email body
-                        body = self.get_email_body(msg)
-                        
-                        # Parse for todos
-                        extracted_todos = self.parse_email_for_todos(body, sender)
-                        
-                        # Add todos to system
-                        for todo_desc in extracted_todos:
-                            todo_id = self.add_todo(
-                                description=todo_desc,
-                                sender_email=sender,
-                                email_subject=subject
-                            )
-                            todos_created += 1
-                        
-                        # Mark email as processed
-                        self.processed_emails.append(email_id_str)
-                        processed_count += 1
-                        
-                        print(f"📧 Processed email from {sender}: {len(extracted_todos)} todos found")
+            if fetcher.remaining:
+                print(f"📬 {fetcher.remaining} more emails waiting (run with 'backlog' to catch up)")
             
             self.save_processed_emails()
             
             print(f"📊 Email processing complete:")
             print(f"   • Processed {processed_count} emails")
-            print(f"   • Created {todos_created} todos")
+            print(f"   • Created {sum(todos_created)} todos")
             
             return True
             
@@ -212,34 +120,48 @@ class EmailTodoManager:
             print(f"❌ Error processing emails: {e}")
             return False
         finally:
-            mail.close()
-            mail.logout()
+            fetcher.close()
     
-    def get_email_body(self, msg):
-        """Extract plain text body from email message"""
-        body = ""
+    def process_message(self, message_key, raw):
+        """Turn one fetched email (raw bytes) into todos; returns how many were created"""
+        # Skip if already processed
+        if message_key in self.processed_emails:
+            return 0
+        
+        # Headers only, then the body streamed - same path as the backlog workers
+        sender, subject, extracted_todos = parse_email(raw)
         
-        if msg.is_multipart():
-            for part in msg.walk():
-                content_type = part.get_content_type()
-                content_disposition = str(part.get("Content-Disposition"))
-                
-                if content_type == "text/plain" and "attachment" not in content_disposition:
-                    try:
-                        body = part.get_payload(decode=True).decode()
-                        break
-                    except:
-                        continue
-        else:
-            try:
-                body = msg.get_payload(decode=True).decode()
-            except:
-                body = str(msg.get_payload())
+        # Add todos to system (one store write per email)
+        self.add_todos_bulk(extracted_todos, sender, email_subject=subject)
+        
+        # Mark email as processed
+        self.processed_emails.add(message_key)
+        
+        print(f"📧 Processed email from {sender}: {len(extracted_todos)} todos found")
+        return len(extracted_todos)
+    
+    def process_email_backlog(self, folder='INBOX', batch_size=200, workers=None):
+        """Catch up on a large unseen backlog using a pool of parser processes"""
+        return process_backlog(self, folder, batch_size, workers)
+    
+    def watch_emails(self, folder='INBOX'):
+        """Process new emails as they arrive (IMAP IDLE), until interrupted"""
+        def handle(message_key, raw):
+            self.process_message(message_key, raw)
+            self.save_processed_emails()
         
-        return body
+        print(f"👀 Watching {folder} for new emails (Ctrl+C to stop)")
+        try:
+            self.fetcher.watch(handle, folder)
+        except KeyboardInterrupt:
+            self.fetcher.close()
+    
+    def get_email_body(self, msg):
+        """Extract the readable text of an email (raw bytes or parsed message)"""
+        return extract_body(msg)
     
     def send_status_email(self, to_email, subject, message):
-        """Send status update email"""
+        """Queue a status update email (delivered in the background)"""
         try:
             msg = MIMEMultipart()
             msg['From'] = self.gmail_user
@@ -272,15 +194,10 @@ class EmailTodoManager:
             
             msg.attach(MIMEText(html_body, 'html'))
             
-            server = smtplib.SMTP('smtp.gmail.com', 587)
-            server.starttls()
-            server.login(self.gmail_user, self.gmail_password)
+            if not get_mail_sender().enqueue(msg):
+                return False
             
-            text = msg.as_string()
-            server.sendmail(self.gmail_user, to_email, text)
-            server.quit()
-            
-            print(f"📤 Status email sent to {to_email}")
+            print(f"📤 Status email queued for {to_email}")
             return True
             
         except Exception as e:
@@ -289,24 +206,27 @@ class EmailTodoManager:
     
     def send_daily_summary(self, to_email):
         """Send daily todo summary via email"""
-        pending_todos = [todo for todo in self.todos if todo['status'] == 'pending']
-        completed_today = [
-            todo for todo in self.todos 
-            if todo['status'] == 'completed' and 
-            todo['completed_at'] and 
-            datetime.fromisoformat(todo['completed_at']).date() == datetime.now().date()
-        ]
+        # Stream the store rather than loading the whole history
+        pending_count = 0
+        recent_pending = deque(maxlen=10)
+        for todo in self.iter_todos(status='pending'):
+            pending_count += 1
+            recent_pending.append(todo)
+        
+        # The store filters on completed_at, so older completions are never read
+        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
+        completed_today = list(self.iter_todos(status='completed', completed_after=today_start))
         
         summary = f"""📊 Daily Todo Summary - {datetime.now().strftime("%B %d, %Y")}
 
-⏳ Pending Todos ({len(pending_todos)}):
+⏳ Pending Todos ({pending_count}):
 """
         
-        for todo in pending_todos[-10:]:  # Show last 10
+        for todo in recent_pending:  # Show last 10
             summary += f"• #{todo['id']}: {todo['description']}\n"
         
-        if len(pending_todos) > 10:
-            summary += f"... and {len(pending_todos) - 10} more\n"
+        if pending_count > 10:
+            summary += f"... and {pending_count - 10} more\n"
         
         summary += f"\n✅ Completed Today ({len(completed_today)}):\n"
         
@@ -316,31 +236,31 @@ class EmailTodoManager:
         if not completed_today:
             summary += "• No todos completed today\n"
         
-        summary += f"\n📈 Progress: {len(completed_today)} completed, {len(pending_todos)} pending"
+        summary += f"\n📈 Progress: {len(completed_today)} completed, {pending_count} pending"
         
         return self.send_status_email(to_email, "Daily Todo Summary", summary)
     
     def list_todos(self, status='pending'):
         """List todos with optional status filter"""
-        return [todo for todo in self.todos if todo['status'] == status]
+        if not self.indexed(status):
+            return list(self.iter_todos(status))
+        with self.lock:
+            return self.index.list(status)
     
     def complete_todo(self, todo_id):
         """Mark a todo as completed"""
-        for todo in self.todos:
-            if todo['id'] == todo_id and todo['status'] == 'pending':
-                todo['status'] = 'completed'
-                todo['completed_at'] = datetime.now().isoformat()
-                self.save_todos()
-                
-                # Send completion notification to sender
-                self.send_status_email(
-                    todo['sender_email'],
-                    f"Todo Completed: #{todo_id}",
-                    f"✅ Todo has been marked as completed:\n\n{todo['description']}"
-                )
-                
-                return True
-        return False
+        todo = self.mark_completed(todo_id)
+        if todo is None:
+            return False
+
+        # Send completion notification to sender
+        self.send_status_email(
+            todo['sender_email'],
+            f"Todo Completed: #{todo_id}",
+            f"✅ Todo has been marked as completed:\n\n{todo['description']}"
+        )
+
+        return True
     
     def sync_with_other_sources(self, whatsapp_todos=None, sheets_todos=None):
         """Sync email todos with other sources"""
@@ -348,7 +268,7 @@ class EmailTodoManager:
         
         # This would sync email todos to other systems
         # For now, we just track the sync
-        print(f"📊 Email todos ready for sync: {len(self.todos)}")
+        print(f"📊 Email todos ready for sync: {len(self.list_todos())}")
         return synced_count
 
 def test_email_integration():
@@ -387,9 +307,10 @@ def test_email_integration():
     print(f"\n📋 Current todos: {len(manager.list_todos())}")
     
     # Complete a todo
-    if manager.todos:
+    if manager.list_todos():
         manager.complete_todo(1)
         print("✅ Marked todo #1 as completed")
+        get_mail_sender().flush()
 
 def main():
     """Main email processing function"""
@@ -427,5 +348,9 @@ if __name__ == "__main__":
     
     if len(sys.argv) > 1 and sys.argv[1] == 'test':
         test_email_integration()
+    elif len(sys.argv) > 1 and sys.argv[1] == 'watch':
+        EmailTodoManager().watch_emails()
+    elif len(sys.argv) > 1 and sys.argv[1] == 'backlog':
+        EmailTodoManager().process_email_backlog()
     else:
         main()
\ No newline at end of file
@@ -6,30 +6,157 @@ Loads variables from .env file in project root
 
 import os
 import sys
+import time
+import threading
 from pathlib import Path
 
-def load_env():
-    """Load environment variables from .env file"""
-    # Find .env file in project root (go up from current script location)
-    current_dir = Path(__file__).parent
-    project_root = current_dir.parent
-    env_file = project_root / '.env'
-    
-    if not env_file.exists():
-        print(f"Warning: .env file not found at {env_file}")
-        return False
-    
+# .env lives in the project root (one level up from this script)
+ENV_FILE = Path(__file__).parent.parent / '.env'
+RELOAD_CHECK_INTERVAL = 5.0  # Seconds between checks for an edited .env
+
+_lock = threading.RLock()
+_loaded = False
+_loaded_mtime = None
+_settings = None
+_last_check = 0.0
+
+def env_file_mtime():
     try:
-        with open(env_file, 'r') as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith('#') and '=' in line:
-                    key, value = line.split('=', 1)
-                    os.environ[key.strip()] = value.strip()
-        return True
-    except Exception as e:
-        print(f"Error loading .env file: {e}")
-        return False
+        return ENV_FILE.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+def load_env(force=False):
+    """Load environment variables from .env file.
+
+    The file is parsed once per process; later calls are free unless the
+    file changed since (or force is set).
+    """
+    global _loaded, _loaded_mtime
+    with _lock:
+        mtime = env_file_mtime()
+        if _loaded and not force and mtime == _loaded_mtime:
+            return mtime is not None
+        changed = not _loaded or mtime != _loaded_mtime
+        _loaded = True
+        _loaded_mtime = mtime
+
+        if mtime is None:
+            if changed:
+                print(f"Warning: .env file not found at {ENV_FILE}")
+            return False
+
+        try:
+            with open(ENV_FILE, 'r') as f:
+                for line in f:
+                    line = line.strip()
+                    if line and not line.startswith('#') and '=' in line:
+                        key, value = line.split('=', 1)
+                        os.environ[key.strip()] = value.strip()
+            return True
+        except Exception as e:
+            print(f"Error loading .env file: {e}")
+            return False
+
+def env_int(env, key, default):
+    value = env.get(key)
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        print(f"⚠️  {key}={value!r} is not a number, using {default}")
+        return default
+
+def env_float(env, key, default):
+    value = env.get(key)
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        print(f"⚠️  {key}={value!r} is not a number, using {default}")
+        return default
+
+def env_bool(env, key, default):
+    value = env.get(key)
+    if not value:
+        return default
+    return value.strip().lower() not in ('0', 'false', 'no', 'off')
+
+class Settings:
+    """Typed snapshot of the configuration, read from the environment once"""
+
+    def __init__(self, env=None):
+        env = os.environ if env is None else env
+
+        # Gmail / IMAP / SMTP
+        self.gmail_user = env.get('GMAIL_USER')
+        self.gmail_password = env.get('GMAIL_APP_PASSWORD')
+        self.imap_host = env.get('IMAP_HOST', 'imap.gmail.com')
+        self.imap_port = env_int(env, 'IMAP_PORT', None)
+        self.imap_ssl = env_bool(env, 'IMAP_SSL', True)
+        self.imap_state_file = env.get('IMAP_STATE_FILE')
+        self.smtp_host = env.get('SMTP_HOST', 'smtp.gmail.com')
+        self.smtp_port = env_int(env, 'SMTP_PORT', 587)
+        self.smtp_starttls = env_bool(env, 'SMTP_STARTTLS', True)
+
+        # GitHub
+        self.github_token = env.get('GITHUB_TOKEN')
+        self.github_repo = env.get('GITHUB_REPO')
+        self.github_api_url = env.get('GITHUB_API_URL')
+
+        # Storage
+        self.todo_store_backend = env.get('TODO_STORE_BACKEND', 'json').strip().lower()
+        self.todo_store_db = env.get('TODO_STORE_DB')
+        self.todo_id_sequence_file = env.get('TODO_ID_SEQUENCE_FILE')
+        self.dedup_index_file = env.get('DEDUP_INDEX_FILE')
+        self.dedup_fuzzy_threshold = env_float(env, 'DEDUP_FUZZY_THRESHOLD', None)
+        self.report_view_file = env.get('REPORT_VIEW_FILE')
+        self.backup_dir = env.get('BACKUP_DIR')
+        self.backup_keep_last = env_int(env, 'BACKUP_KEEP_LAST', None)
+        self.backup_keep_daily = env_int(env, 'BACKUP_KEEP_DAILY', None)
+
+        # Webhook server
+        self.webhook_workers = env_int(env, 'WEBHOOK_WORKERS', None)
+        self.webhook_spool_db = env.get('WEBHOOK_SPOOL_DB')
+        self.webhook_queue_workers = env_int(env, 'WEBHOOK_QUEUE_WORKERS', None)
+        self.webhook_log_file = env.get('WEBHOOK_LOG_FILE')
+        self.webhook_payload_log_chars = env_int(env, 'WEBHOOK_PAYLOAD_LOG_CHARS', None)
+        self.webhook_payload_sample_rate = env_float(env, 'WEBHOOK_PAYLOAD_SAMPLE_RATE', None)
+
+        # Logging
+        self.log_max_bytes = env_int(env, 'LOG_MAX_BYTES', None)
+        self.log_backup_count = env_int(env, 'LOG_BACKUP_COUNT', None)
+        self.log_rotate_when = env.get('LOG_ROTATE_WHEN')
+
+def get_settings():
+    """Return the process-wide settings.
+
+    Built on first use; afterwards .env is checked for edits at most every
+    RELOAD_CHECK_INTERVAL seconds and the settings are rebuilt if it changed,
+    so long-running servers pick up configuration changes without restarts.
+    """
+    global _settings, _last_check
+    now = time.monotonic()
+    if _settings is not None and now - _last_check < RELOAD_CHECK_INTERVAL:
+        return _settings
+
+    with _lock:
+        _last_check = now
+        if _settings is None or env_file_mtime() != _loaded_mtime:
+            load_env()
+            _settings = Settings()
+        return _settings
+
+def reload_settings():
+    """Re-read .env and the environment now (e.g. after changing os.environ)"""
+    global _settings, _last_check
+    with _lock:
+        load_env(force=True)
+        _settings = Settings()
+        _last_check = time.monotonic()
+        return _settings
 
 def get_env_var(key, required=True):
     """Get environment variable with error handling"""
@@ -50,4 +177,4 @@ if __name__ == "__main__":
             if any(secret in key.upper() for secret in ['API', 'TOKEN', 'PASSWORD', 'KEY', 'SID']):
                 print(f"  {key}=***")
     else:
-        print("❌ Failed to load environment variables")
\ No newline at end of file
+        print("❌ Failed to load environment variables")
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+GitHub Issue Publisher
+Creates GitHub issues through the REST API from a background queue
+"""
+
+import json
+import time
+import queue
+import atexit
+import threading
+import subprocess
+import http.client
+import urllib.parse
+from env_loader import get_settings
+
+DEFAULT_REPO = "hebbarp/todo-management"
+DEFAULT_API_URL = "https://api.github.com"
+
+class GitHubIssuePublisher:
+    """Publishes queued issues over one persistent API connection.
+
+    Callers enqueue issues and return immediately; a worker thread drains
+    the queue in batches, waits out rate limits using GitHub's rate-limit
+    headers, and reports each new issue number through `on_created`.
+    """
+
+    def __init__(self, repo=None, token=None, api_url=None, batch_size=10,
+                 min_interval=1.0, max_retries=5, timeout=30):
+        settings = get_settings()
+        self.repo = repo or settings.github_repo or DEFAULT_REPO
+        self.token = token or settings.github_token or self.token_from_gh_cli()
+        self.api_url = urllib.parse.urlparse(api_url or settings.github_api_url or DEFAULT_API_URL)
+        self.batch_size = batch_size
+        self.min_interval = min_interval  # GitHub asks for ~1s between content-creating calls
+        self.max_retries = max_retries
+        self.timeout = timeout
+
+        self.queue = queue.Queue()
+        self.conn = None
+        self.last_request = 0.0
+        self.worker = None
+        self.lock = threading.Lock()
+        self.warned = False
+
+    @property
+    def enabled(self):
+        return bool(self.token)
+
+    def token_from_gh_cli(self):
+        """Reuse the GitHub CLI login if no GITHUB_TOKEN is configured"""
+        try:
+            result = subprocess.run(['gh', 'auth', 'token'], check=True, capture_output=True, text=True)
+            return result.stdout.strip() or None
+        except (subprocess.CalledProcessError, FileNotFoundError):
+            return None
+
+    def enqueue(self, title, body, labels=None, on_created=None):
+        """Queue an issue for creation; returns False if publishing is not configured"""
+        if not self.enabled:
+            if not self.warned:
+                print("⚠️ GitHub token not configured (set GITHUB_TOKEN or run gh auth login)")
+                self.warned = True
+            return False
+
+        self.queue.put({
+            'title': title,
+            'body': body,
+            'labels': labels or [],
+            'on_created': on_created
+        })
+        self.start()
+        return True
+
+    def start(self):
+        with self.lock:
+            if self.worker is None or not self.worker.is_alive():
+                self.worker = threading.Thread(target=self.worker_loop, name='github-publisher', daemon=True)
+                self.worker.start()
+
+    def flush(self, timeout=60):
+        """Wait until every queued issue has been published (or given up on)"""
+        deadline = time.time() + timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self.queue.all_tasks_done.wait(remaining)
+        return True
+
+    def worker_loop(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                self.publish_batch(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def publish_batch(self, batch):
+        """Create each issue in the batch back-to-back on the same connection"""
+        for item in batch:
+            try:
+                number = self.create_issue(item['title'], item['body'], item['labels'])
+            except Exception as e:
+                print(f"⚠️ Could not create GitHub issue '{item['title']}': {e}")
+                continue
+
+            print(f"✅ Created GitHub issue #{number}: {item['title']}")
+            if item['on_created']:
+                try:
+                    item['on_created'](number)
+                except Exception as e:
+                    print(f"Error recording GitHub issue #{number}: {e}")
+
+    def create_issue(self, title, body, labels=None):
+        """Create one issue, retrying on rate limits and transient errors"""
+        payload = {'title': title, 'body': body}
+        if labels:
+            payload['labels'] = labels
+
+        for attempt in range(self.max_retries + 1):
+            wait = self.min_interval - (time.time() - self.last_request)
+            if wait > 0:
+                time.sleep(wait)
+
+            try:
+                status, headers, data = self.request('POST', f"/repos/{self.repo}/issues", payload)
+            except (OSError, http.client.HTTPException) as e:
+                self.reset_connection()
+                if attempt == self.max_retries:
+                    raise
+                self.backoff(attempt, f"connection error: {e}")
+                continue
+
+            if status == 201:
+                self.respect_remaining_quota(headers)
+                return data['number']
+
+            delay = self.rate_limit_delay(status, headers)
+            if delay is not None and attempt < self.max_retries:
+                print(f"⏳ GitHub rate limit hit, waiting {delay:.0f}s")
+                time.sleep(delay)
+                continue
+
+            if status >= 500 and attempt < self.max_retries:
+                self.backoff(attempt, f"HTTP {status}")
+                continue
+
+            message = data.get('message', '') if isinstance(data, dict) else ''
+            raise RuntimeError(f"GitHub API returned {status}: {message}")
+
+    def rate_limit_delay(self, status, headers):
+        """Seconds to wait for a rate-limited response, or None if not rate limited"""
+        if status not in (403, 429):
+            return None
+        if headers.get('retry-after'):
+            return float(headers['retry-after'])
+        if headers.get('x-ratelimit-remaining') == '0' and headers.get('x-ratelimit-reset'):
+            return max(0.0, float(headers['x-ratelimit-reset']) - time.time()) + 1
+        if status == 429:
+            return 60.0
+        return None  # Plain 403: permissions problem, retrying won't help
+
+    def respect_remaining_quota(self, headers):
+        """Sleep until the window resets once the quota is used up"""
+        if headers.get('x-ratelimit-remaining') == '0' and headers.get('x-ratelimit-reset'):
+            delay = float(headers['x-ratelimit-reset']) - time.time()
+            if delay > 0:
+                print(f"⏳ GitHub quota exhausted, pausing {delay:.0f}s")
+                time.sleep(delay)
+
+    def backoff(self, attempt, reason):
+        delay = min(60, 2 ** attempt)
+        print(f"🔁 Retrying GitHub request in {delay}s ({reason})")
+        time.sleep(delay)
+
+    def connect(self):
+        if self.conn is None:
+            port = self.api_url.port
+            if self.api_url.scheme == 'http':
+                self.conn = http.client.HTTPConnection(self.api_url.hostname, port, timeout=self.timeout)
+            else:
+                self.conn = http.client.HTTPSConnection(self.api_url.hostname, port, timeout=self.timeout)
+        return self.conn
+
+    def reset_connection(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def request(self, method, path, payload=None):
+        """Send one API request on the persistent connection"""
+        conn = self.connect()
+        body = json.dumps(payload).encode() if payload is not None else None
+        headers = {
+            'Authorization': f"Bearer {self.token}",
+            'Accept': 'application/vnd.github+json',
+            'User-Agent': 'todo-management-publisher',
+            'Content-Type': 'application/json'
+        }
+
+        conn.request(method, self.api_url.path.rstrip('/') + path, body, headers)
+        response = conn.getresponse()
+        raw = response.read()
+        self.last_request = time.time()
+
+        if response.getheader('Connection', '').lower() == 'close':
+            self.reset_connection()
+
+        response_headers = {key.lower(): value for key, value in response.getheaders()}
+        data = json.loads(raw) if raw else {}
+        return response.status, response_headers, data
+
+_publisher = None
+_publisher_lock = threading.Lock()
+
+def get_publisher():
+    """Return the process-wide publisher shared by all channel managers"""
+    global _publisher
+    with _publisher_lock:
+        if _publisher is None:
+            _publisher = GitHubIssuePublisher()
+            atexit.register(_publisher.flush)  # The worker is a daemon thread: publish queued issues before exit
+        return _publisher
+
+def test_publisher():
+    """Publish a few issues against a local stand-in for the GitHub API"""
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+
+    print("🧪 Testing GitHub publisher against a local API stand-in...")
+
+    class FakeGitHubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        issues = []
+
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            # Rate limit the very first request to exercise the retry path
+            if not self.issues and not getattr(self.server, 'limited', False):
+                self.server.limited = True
+                self.reply(429, {'message': 'slow down'}, {'Retry-After': '1'})
+                return
+            self.issues.append(payload)
+            self.reply(201, {'number': len(self.issues), 'title': payload['title']},
+                       {'X-RateLimit-Remaining': '4999'})
+
+        def reply(self, status, data, headers):
+            body = json.dumps(data).encode()
+            self.send_response(status)
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = HTTPServer(('localhost', 0), FakeGitHubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    try:
+        publisher = GitHubIssuePublisher(
+            token='test-token',
+            api_url=f"http://localhost:{server.server_address[1]}",
+            min_interval=0
+        )
+        created = {}
+        for i in range(1, 4):
+            publisher.enqueue(f"Test todo {i}", "Created by publisher test",
+                              labels=['source:test'], on_created=lambda n, i=i: created.__setitem__(i, n))
+        publisher.flush()
+        publisher.reset_connection()  # The stand-in serves one connection at a time
+        print(f"📋 Issue numbers recorded: {created}")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'test':
+        test_publisher()
+    else:
+        print("Usage: python github_publisher.py test")
@@ -4,10 +4,16 @@ Google Sheets Todo Integration
 Syncs todos with Google Sheets for mobile-friendly todo management
 """
 
-import os
 import json
 from datetime import datetime
-from env_loader import load_env
+from id_sequence import get_id_sequence
+from csv_table import CsvTable
+from todo_stats import summarize_todos
+from dedup_index import get_dedup_index
+from report_view import get_report_view
+
+SHEET_HEADER = ["ID", "Todo Item", "Status", "Date Added", "Due Date", "Priority", "Notes"]
+STATUS_COLUMN = 2
 
 # Note: This is a simplified version using CSV for demonstration
 # For actual Google Sheets API integration, you would need:
@@ -17,43 +23,62 @@ from env_loader import load_env
 
 class GoogleSheetsTodoManager:
     def __init__(self, sheet_file="google_sheets_todos.csv"):
-        load_env()
         self.sheet_file = sheet_file
+        self.table = CsvTable(sheet_file, SHEET_HEADER)
+        self.stats_cache = None  # (table signature, date, stats)
         self.initialize_sheet()
+        self.dedup = get_dedup_index()
+        if not self.dedup.count('sheets'):
+            self.dedup.seed('sheets', (todo['description'] for todo in self.iter_todos()))
+        self.id_sequence = get_id_sequence(f"sheets:{sheet_file}", seed=self.scan_next_id)
+        self.report = get_report_view()
+        self.refresh_report()
+    
+    def refresh_report(self):
+        """Recount the sheet in the report view if the file changed behind its back; True if it did"""
+        return self.report.attach('sheets', self.table.file_signature(), self.iter_todos)
     
     def initialize_sheet(self):
         """Initialize the CSV file that simulates Google Sheets"""
-        if not os.path.exists(self.sheet_file):
-            with open(self.sheet_file, 'w') as f:
-                # Create header row
-                f.write("ID,Todo Item,Status,Date Added,Due Date,Priority,Notes\n")
+        self.table.ensure_exists()
     
     def add_todo(self, description, due_date="", priority="Medium", notes=""):
         """Add a new todo to the sheet"""
-        todo_id = self.get_next_id()
-        date_added = datetime.now().strftime("%Y-%m-%d")
+        row = self.new_row(description, due_date, priority, notes)
+        self.table.append(row)
+        self.dedup.add('sheets', description)
+        self.report.todo_added('sheets', self.row_todo(row), self.table.file_signature())
         
-        with open(self.sheet_file, 'a') as f:
-            f.write(f"{todo_id},{description},Pending,{date_added},{due_date},{priority},{notes}\n")
+        print(f"✅ Added todo #{row[0]}: {description}")
+        return int(row[0])
+    
+    def add_todos_bulk(self, items):
+        """Add many todos with one write; items are dicts of add_todo arguments"""
+        rows = [self.new_row(**item) for item in items]
+        if not rows:
+            return []
+        
+        self.table.append_many(rows)
+        signature = self.table.file_signature()
+        for row in rows:
+            self.dedup.add('sheets', row[1])
+            self.report.todo_added('sheets', self.row_todo(row), signature)
         
-        print(f"✅ Added todo #{todo_id}: {description}")
-        return todo_id
+        print(f"✅ Added {len(rows)} todos (#{rows[0][0]}-#{rows[-1][0]})")
+        return [int(row[0]) for row in rows]
+    
+    def new_row(self, description, due_date="", priority="Medium", notes=""):
+        date_added = datetime.now().strftime("%Y-%m-%d")
+        return [str(self.get_next_id()), description, "Pending", date_added, due_date, priority, notes]
     
     def get_next_id(self):
         """Get the next available ID"""
-        try:
-            with open(self.sheet_file, 'r') as f:
-                lines = f.readlines()
-                if len(lines) <= 1:  # Only header or empty
-                    return 1
-                # Get the last ID and increment
-                last_line = lines[-1].strip()
-                if last_line:
-                    last_id = int(last_line.split(',')[0])
-                    return last_id + 1
-        except (FileNotFoundError, ValueError, IndexError):
-            pass
-        return 1
+        return self.id_sequence.next_id()
+    
+    def scan_next_id(self):
+        """Next ID after the highest ID in the sheet (seeds the ID sequence once)"""
+        ids = [int(key) for key in self.table.keys() if key.isdigit()]
+        return max(ids) + 1 if ids else 1
     
     def complete_todo(self, todo_id):
         """Mark a todo as completed"""
@@ -62,24 +87,13 @@ class GoogleSheetsTodoManager:
     def update_todo_status(self, todo_id, new_status):
         """Update the status of a todo"""
         try:
-            with open(self.sheet_file, 'r') as f:
-                lines = f.readlines()
-            
-            updated = False
-            for i, line in enumerate(lines):
-                if i == 0:  # Skip header
-                    continue
-                
-                parts = line.strip().split(',')
-                if len(parts) >= 3 and parts[0] == str(todo_id):
-                    parts[2] = new_status  # Update status column
-                    lines[i] = ','.join(parts) + '\n'
-                    updated = True
-                    break
-            
-            if updated:
-                with open(self.sheet_file, 'w') as f:
-                    f.writelines(lines)
+            row = self.table.get(todo_id)
+            if self.table.update(todo_id, STATUS_COLUMN, new_status):
+                old_status = row[STATUS_COLUMN]
+                self.report.status_changed(
+                    'sheets', todo_id, old_status, new_status, self.table.file_signature(),
+                    todo=self.row_todo(self.table.get(todo_id)),
+                    refill=lambda: self.recent_with_status(old_status))
                 print(f"✅ Updated todo #{todo_id} status to: {new_status}")
                 return True
             else:
@@ -90,31 +104,35 @@ class GoogleSheetsTodoManager:
             print(f"❌ Error updating todo: {e}")
             return False
     
+    def iter_todos(self):
+        """Yield each sheet row as a todo dict"""
+        for parts in self.table.rows():
+            if len(parts) >= 6:
+                yield self.row_todo(parts)
+    
+    def recent_with_status(self, status):
+        """Newest rows with the given status, oldest first (refills the report view)"""
+        todos = [todo for todo in self.iter_todos() if todo['status'].lower() == status.lower()]
+        return todos[-self.report.recent_limit:]
+    
+    def row_todo(self, parts):
+        return {
+            'id': parts[0],
+            'description': parts[1],
+            'status': parts[2],
+            'date_added': parts[3],
+            'due_date': parts[4],
+            'priority': parts[5],
+            'notes': parts[6] if len(parts) > 6 else ""
+        }
+    
     def list_todos(self, status_filter=None):
         """List todos with optional status filter"""
         try:
             todos = []
-            with open(self.sheet_file, 'r') as f:
-                lines = f.readlines()
-            
-            for i, line in enumerate(lines):
-                if i == 0:  # Skip header
-                    continue
-                
-                parts = line.strip().split(',')
-                if len(parts) >= 6:
-                    todo = {
-                        'id': parts[0],
-                        'description': parts[1],
-                        'status': parts[2],
-                        'date_added': parts[3],
-                        'due_date': parts[4],
-                        'priority': parts[5],
-                        'notes': parts[6] if len(parts) > 6 else ""
-                    }
-                    
-                    if status_filter is None or todo['status'].lower() == status_filter.lower():
-                        todos.append(todo)
+            for todo in self.iter_todos():
+                if status_filter is None or todo['status'].lower() == status_filter.lower():
+                    todos.append(todo)
             
             return todos
             
@@ -129,7 +147,7 @@ class GoogleSheetsTodoManager:
         # Sync from WhatsApp todos
         if whatsapp_todos:
             for todo in whatsapp_todos:
-                if todo['status'] == 'pending':
+                if todo['status'] == 'pending' and not self.dedup.seen('sheets', todo['description']):
                     self.add_todo(
                         description=f"[WhatsApp] {todo['description']}",
                         notes=f"From WhatsApp: {todo['phone_number']}"
@@ -139,6 +157,8 @@ class GoogleSheetsTodoManager:
         # Sync from GitHub issues (would require GitHub API)
         if github_issues:
             for issue in github_issues:
+                if self.dedup.seen('sheets', issue['title']):
+                    continue
                 self.add_todo(
                     description=f"[GitHub] {issue['title']}",
                     notes=f"Issue #{issue['number']}"
@@ -158,36 +178,49 @@ class GoogleSheetsTodoManager:
         print(f"📤 Exported {len(todos)} todos to {filename}")
         return filename
     
+    def get_stats(self):
+        """Report counters from one pass over the sheet, cached until it changes"""
+        self.table.refresh()
+        today = datetime.now().date()
+        if self.stats_cache and self.stats_cache[:2] == (self.table.signature, today):
+            return self.stats_cache[2]
+        
+        stats = summarize_todos(self.iter_todos(), today)
+        self.stats_cache = (self.table.signature, today, stats)
+        return stats
+    
     def generate_summary_report(self):
         """Generate a summary report of todos"""
-        all_todos = self.list_todos()
-        pending_todos = self.list_todos("pending")
-        completed_todos = self.list_todos("completed")
-        
-        # Priority breakdown
-        priority_count = {}
-        for todo in all_todos:
-            priority = todo['priority']
-            priority_count[priority] = priority_count.get(priority, 0) + 1
+        stats = self.get_stats()
+        due_count = stats['due_count']
         
         report = f"""📊 GOOGLE SHEETS TODO SUMMARY REPORT
 ================================
 Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
 
 📋 Overview:
-• Total Todos: {len(all_todos)}
-• Pending: {len(pending_todos)}
-• Completed: {len(completed_todos)}
-• Completion Rate: {(len(completed_todos)/len(all_todos)*100):.1f}% ({len(completed_todos)}/{len(all_todos)})
+• Total Todos: {stats['total']}
+• Pending: {stats['pending']}
+• Completed: {stats['completed']}
+• Completion Rate: {stats['completion_rate']:.1f}% ({stats['completed']}/{stats['total']})
 
 🎯 Priority Breakdown:
 """
         
-        for priority, count in priority_count.items():
+        for priority, count in stats['priority_count'].items():
             report += f"• {priority}: {count}\n"
         
+        report += f"""
+⏰ Pending by Due Date:
+• Overdue: {due_count['overdue']}
+• Due today: {due_count['due_today']}
+• Due this week: {due_count['due_this_week']}
+• Later: {due_count['due_later']}
+• No due date: {due_count['no_due_date']}
+"""
+        
         report += f"\n📅 Recent Pending Todos:\n"
-        for todo in pending_todos[-5:]:  # Last 5 pending
+        for todo in stats['recent_pending']:  # Last 5 pending
             report += f"• #{todo['id']}: {todo['description']}\n"
         
         print(report)
@@ -195,15 +228,15 @@ Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
     
     def mobile_friendly_view(self):
         """Generate a mobile-friendly view of todos"""
-        pending_todos = self.list_todos("pending")
+        stats = self.get_stats()
         
-        if not pending_todos:
+        if not stats['pending']:
             return "🎉 No pending todos! You're all caught up!"
         
         mobile_view = "📱 YOUR TODOS (Mobile View)\n"
         mobile_view += "=" * 30 + "\n\n"
         
-        for i, todo in enumerate(pending_todos[:10], 1):  # Show top 10
+        for i, todo in enumerate(stats['top_pending'], 1):  # Show top 10
             status_emoji = "⏳" if todo['status'] == "Pending" else "✅"
             priority_emoji = {"High": "🔥", "Medium": "📋", "Low": "📝"}.get(todo['priority'], "📋")
             
@@ -215,8 +248,8 @@ Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
             
             mobile_view += "\n"
         
-        if len(pending_todos) > 10:
-            mobile_view += f"... and {len(pending_todos) - 10} more todos\n"
+        if stats['pending'] > 10:
+            mobile_view += f"... and {stats['pending'] - 10} more todos\n"
         
         return mobile_view
 
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Todo ID Sequence
+Persistent, monotonic id allocation shared by all channel managers and processes
+"""
+
+import os
+import json
+import threading
+from env_loader import get_settings
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+DEFAULT_SEQUENCE_FILE = "todo_ids.json"
+
+class FileLock:
+    """Exclusive inter-process lock held on a companion .lock file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.handle = None
+
+    def __enter__(self):
+        self.handle = open(self.path, 'a+')
+        if fcntl:
+            fcntl.flock(self.handle, fcntl.LOCK_EX)
+        else:
+            self.handle.seek(0)
+            msvcrt.locking(self.handle.fileno(), msvcrt.LK_LOCK, 1)
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            if fcntl:
+                fcntl.flock(self.handle, fcntl.LOCK_UN)
+            else:
+                self.handle.seek(0)
+                msvcrt.locking(self.handle.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self.handle.close()
+            self.handle = None
+
+class IdSequence:
+    """Named counter that never hands out the same id twice.
+
+    The counter lives in a small JSON file ({name: next_free_id}) guarded by
+    a file lock. Each process reserves a block of ids at a time and hands
+    them out from memory, so most allocations never touch the disk; ids
+    left unused in a block when a process exits are skipped, not reused.
+    """
+
+    def __init__(self, name, seq_file=DEFAULT_SEQUENCE_FILE, block_size=10, seed=None):
+        self.name = name
+        self.seq_file = seq_file
+        self.block_size = block_size
+        self.seed = seed  # Called once, when the sequence is first created
+        self.lock = threading.Lock()
+        self.next_free = 0
+        self.block_end = 0  # Exclusive end of the reserved block
+
+    def next_id(self, floor=1):
+        """Allocate the next id, never lower than floor"""
+        with self.lock:
+            if self.next_free < floor:
+                self.next_free = floor
+            if self.next_free >= self.block_end:
+                self.reserve_block(floor)
+            todo_id = self.next_free
+            self.next_free += 1
+            return todo_id
+
+    def reserve_block(self, floor):
+        with FileLock(f"{self.seq_file}.lock"):
+            counters = self.read_counters()
+
+            start = counters.get(self.name)
+            if start is None:
+                start = self.seed() if self.seed else 1
+            start = max(start, floor, self.next_free)
+
+            counters[self.name] = start + self.block_size
+            self.write_counters(counters)
+
+        self.next_free = start
+        self.block_end = start + self.block_size
+
+    def read_counters(self):
+        try:
+            with open(self.seq_file, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def write_counters(self, counters):
+        tmp_file = f"{self.seq_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(counters, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.seq_file)
+
+_sequences = {}
+_sequences_lock = threading.Lock()
+
+def get_id_sequence(name, seed=None):
+    """Return the process-wide sequence for a channel (e.g. 'whatsapp')"""
+    with _sequences_lock:
+        if name not in _sequences:
+            seq_file = get_settings().todo_id_sequence_file or DEFAULT_SEQUENCE_FILE
+            _sequences[name] = IdSequence(name, seq_file, seed=seed)
+        return _sequences[name]
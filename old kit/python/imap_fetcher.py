@@ -0,0 +1,460 @@
+#!/usr/bin/env python3
+"""
+IMAP Fetcher
+Incremental, UID-based mail fetching with batched FETCH and optional IDLE push
+"""
+
+import os
+import re
+import ssl
+import json
+import email
+import select
+import imaplib
+import threading
+from email import policy
+from email.parser import BytesHeaderParser
+
+DEFAULT_STATE_FILE = "imap_state.json"
+MAX_TEXT_BYTES = 256 * 1024
+IDLE_TIMEOUT = 29 * 60  # RFC 2177: re-issue IDLE before the server's 30 minute cutoff
+COPIED_HEADERS = ('From', 'To', 'Subject', 'Date', 'Message-ID')
+
+MESSAGE_START = re.compile(rb'^\d+ \(')
+UID_ITEM = re.compile(rb'UID (\d+)')
+SECTION = re.compile(rb'BODY\[([^\]]*)\]')
+
+class ImapFetcher:
+    """Fetches only mail that arrived since the last run.
+
+    Progress is kept as a (UIDVALIDITY, last UID) watermark per folder in
+    a small JSON file; if the server renumbers the folder (UIDVALIDITY
+    changes) the watermark starts over. New messages are fetched in
+    batches with one FETCH per batch, and only the headers plus the first
+    body part are transferred - attachments stay on the server. Messages
+    are fetched with BODY.PEEK and flagged \\Seen once handled.
+    """
+
+    def __init__(self, host='imap.gmail.com', user=None, password=None, port=None,
+                 use_ssl=True, state_file=DEFAULT_STATE_FILE, batch_size=50,
+                 max_text_bytes=MAX_TEXT_BYTES):
+        self.host = host
+        self.user = user
+        self.password = password
+        self.port = port
+        self.use_ssl = use_ssl
+        self.state_file = state_file
+        self.batch_size = batch_size
+        self.max_text_bytes = max_text_bytes
+        self.state = self.load_state()
+        self.mail = None
+        self.folder = None
+        self.uidvalidity = None
+        self.remaining = 0
+
+    def load_state(self):
+        try:
+            with open(self.state_file, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"Error loading IMAP state: {e}")
+            return {}
+
+    def save_state(self):
+        tmp_file = f"{self.state_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_file, self.state_file)
+
+    def connect(self):
+        if self.use_ssl:
+            self.mail = imaplib.IMAP4_SSL(self.host, self.port or 993)
+        else:
+            self.mail = imaplib.IMAP4(self.host, self.port or 143)
+        self.mail.login(self.user, self.password)
+        return self.mail
+
+    def select(self, folder='INBOX'):
+        """Open a folder and reset its watermark if the UIDs were renumbered"""
+        status, data = self.mail.select(folder)
+        if status != 'OK':
+            raise imaplib.IMAP4.error(f"Cannot select {folder}: {data}")
+        _, data = self.mail.response('UIDVALIDITY')
+        self.folder = folder
+        self.uidvalidity = int(data[0]) if data and data[0] else 0
+
+        folder_state = self.state.get(folder)
+        if not folder_state or folder_state['uidvalidity'] != self.uidvalidity:
+            self.state[folder] = {'uidvalidity': self.uidvalidity, 'last_uid': 0}
+
+    def close(self):
+        if not self.mail:
+            return
+        try:
+            if self.folder:
+                self.mail.close()
+            self.mail.logout()
+        except Exception:
+            pass
+        self.mail = None
+        self.folder = None
+
+    @property
+    def last_uid(self):
+        return self.state[self.folder]['last_uid']
+
+    def message_key(self, uid):
+        """Stable id for a message (UIDs are only unique within a UIDVALIDITY)"""
+        return f"{self.uidvalidity}:{uid}"
+
+    def search_new(self):
+        """UIDs of unread messages above the watermark, oldest first"""
+        status, data = self.mail.uid('SEARCH', None, f'UID {self.last_uid + 1}:* UNSEEN')
+        if status != 'OK' or not data or not data[0]:
+            return []
+        # "n:*" always matches the newest message, even when its UID is below n
+        return sorted(uid for uid in map(int, data[0].split()) if uid > self.last_uid)
+
+    def fetch_sections(self, uids, items):
+        status, data = self.mail.uid('FETCH', ','.join(map(str, uids)), items)
+        if status != 'OK':
+            raise imaplib.IMAP4.error(f"FETCH failed: {data}")
+        return self.parse_fetch(data)
+
+    def parse_fetch(self, data):
+        """Map UID -> {section: bytes} from imaplib's FETCH response list"""
+        messages = {}
+        sections = None
+        for item in data:
+            prefix = item[0] if isinstance(item, tuple) else item
+            if not isinstance(prefix, bytes):
+                continue
+            if MESSAGE_START.match(prefix):
+                sections = {}
+            if sections is None:
+                continue
+
+            match = UID_ITEM.search(prefix)
+            if match:
+                messages[int(match.group(1))] = sections
+            if isinstance(item, tuple):
+                section = SECTION.search(prefix)
+                if section:
+                    sections[section.group(1).decode().upper()] = item[1]
+        return messages
+
+    def fetch_raw(self, uids):
+        """Yield (uid, raw bytes) for the given UIDs, one FETCH round trip per stage per batch"""
+        header_parser = BytesHeaderParser()
+        for start in range(0, len(uids), self.batch_size):
+            batch = uids[start:start + self.batch_size]
+            headers = self.fetch_sections(batch, '(UID BODY.PEEK[HEADER])')
+
+            multipart, single = [], []
+            for uid, sections in headers.items():
+                top = header_parser.parsebytes(sections.get('HEADER', b''))
+                (multipart if top.get_content_maintype() == 'multipart' else single).append(uid)
+
+            # First part only for multipart mail (the text, not the attachments)
+            bodies = {}
+            limit = f"<0.{self.max_text_bytes}>"
+            if multipart:
+                bodies.update(self.fetch_sections(multipart, f'(UID BODY.PEEK[1.MIME] BODY.PEEK[1]{limit})'))
+            if single:
+                bodies.update(self.fetch_sections(single, f'(UID BODY.PEEK[TEXT]{limit})'))
+
+            for uid in sorted(headers):
+                yield uid, self.raw_message(headers[uid].get('HEADER', b''), bodies.get(uid, {}))
+
+    def raw_message(self, header, sections):
+        """Bytes of a small message: the top-level headers plus the fetched text"""
+        if 'TEXT' in sections or '1' not in sections:
+            return header + sections.get('TEXT', b'')
+
+        top = BytesHeaderParser().parsebytes(header)
+        copied = b''.join(
+            f"{name}: {top[name]}\r\n".encode('ascii', 'surrogateescape')
+            for name in COPIED_HEADERS if top[name] is not None
+        )
+        mime = sections.get('1.MIME', b'').rstrip(b'\r\n')
+        return copied + mime + b'\r\n\r\n' + sections['1']
+
+    def mark_seen(self, uids):
+        if uids:
+            self.mail.uid('STORE', ','.join(map(str, uids)), '+FLAGS', '(\\Seen)')
+
+    def commit(self, uids):
+        """Flag handled messages \\Seen and move the watermark past them"""
+        if not uids:
+            return
+        self.mark_seen(uids)
+        self.state[self.folder]['last_uid'] = max(self.last_uid, max(uids))
+        self.save_state()
+
+    def poll(self, handler, limit=None):
+        """Hand each new message to handler(key, raw bytes), oldest first; returns how many.
+
+        Messages are passed unparsed, so the handler can read just the
+        headers and stream the body (see mail_body.py). With a limit, the
+        rest stay queued for the next poll; `remaining` tells how many.
+        """
+        uids = self.search_new()
+        self.remaining = max(0, len(uids) - limit) if limit else 0
+        if limit:
+            uids = uids[:limit]
+
+        handled = []
+        try:
+            for uid, raw in self.fetch_raw(uids):
+                handler(self.message_key(uid), raw)
+                handled.append(uid)
+        finally:
+            self.commit(handled)
+        return len(handled)
+
+    def supports_idle(self):
+        return 'IDLE' in self.mail.capabilities
+
+    def idle(self, timeout=IDLE_TIMEOUT):
+        """Block until the server announces new mail or timeout passes.
+
+        Returns True if an EXISTS update arrived. Callers poll after every
+        return either way, so an update that raced the timeout is only
+        delayed, never lost.
+        """
+        self.mail.send(b'IDLE1 IDLE\r\n')
+        line = self.mail.readline()
+        if not line.startswith(b'+'):
+            raise imaplib.IMAP4.error(f"IDLE rejected: {line!r}")
+
+        sock = self.mail.sock
+        new_mail = False
+        deadline = timeout
+        while not new_mail:
+            pending = isinstance(sock, ssl.SSLSocket) and sock.pending()
+            if not pending and not select.select([sock], [], [], deadline)[0]:
+                break
+            line = self.mail.readline()
+            if not line:
+                raise imaplib.IMAP4.abort("Connection closed during IDLE")
+            new_mail = line.rstrip().endswith(b'EXISTS')
+
+        self.mail.send(b'DONE\r\n')
+        while True:
+            line = self.mail.readline()
+            if not line:
+                raise imaplib.IMAP4.abort("Connection closed during IDLE")
+            if line.startswith(b'IDLE1 '):
+                return new_mail
+
+    def watch(self, handler, folder='INBOX', stop=None, idle_timeout=IDLE_TIMEOUT, poll_interval=60):
+        """Push-style ingestion: poll, then IDLE until new mail arrives, until stop is set"""
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            try:
+                if not self.mail:
+                    self.connect()
+                    self.select(folder)
+                self.poll(handler)
+                if self.supports_idle():
+                    self.idle(idle_timeout)
+                else:
+                    stop.wait(poll_interval)
+            except (imaplib.IMAP4.abort, OSError) as e:
+                print(f"⚠️ IMAP connection lost ({e}), reconnecting...")
+                self.mail = None
+                self.folder = None
+                stop.wait(5)
+        self.close()
+
+def make_test_message(subject, text, attachment=None):
+    """Raw CRLF message for the IMAP stand-in"""
+    from email.message import EmailMessage
+
+    msg = EmailMessage()
+    msg['From'] = 'boss@example.com'
+    msg['To'] = 'me@example.com'
+    msg['Subject'] = subject
+    msg.set_content(text)
+    if attachment:
+        msg.add_attachment(attachment, maintype='application', subtype='octet-stream',
+                           filename='report.bin')
+    return msg.as_bytes(policy=policy.SMTP)
+
+def start_imap_stand_in():
+    """Serve an in-memory mailbox over IMAP on localhost; returns (server, mailbox)"""
+    import socketserver
+
+    def sections_of(raw):
+        header, _, text = raw.partition(b'\r\n\r\n')
+        sections = {'HEADER': header + b'\r\n\r\n', 'TEXT': text}
+        boundary = email.message_from_bytes(raw).get_boundary()
+        if boundary:
+            part = text.split(b'--' + boundary.encode())[1].strip(b'\r\n')
+            mime, _, body = part.partition(b'\r\n\r\n')
+            sections['1.MIME'] = mime + b'\r\n\r\n'
+            sections['1'] = body
+        return sections
+
+    class FakeMailbox:
+        uidvalidity = 7001
+
+        def __init__(self):
+            self.messages = []  # [uid, raw, seen]
+            self.sections = {}  # uid -> {section: bytes}
+            self.bytes_sent = 0
+            self.lock = threading.Lock()
+
+        def add(self, raw, seen=False):
+            with self.lock:
+                uid = self.messages[-1][0] + 1 if self.messages else 1
+                self.messages.append([uid, raw, seen])
+                self.sections[uid] = sections_of(raw)
+
+        def uid_set(self, spec):
+            top = self.messages[-1][0] if self.messages else 0
+            uids = set()
+            for piece in spec.split(','):
+                low, _, high = piece.partition(':')
+                low = int(low)
+                high = top if high == '*' else int(high or low)
+                uids.update(range(min(low, high), max(low, high) + 1))
+            return uids
+
+    class FakeImapHandler(socketserver.StreamRequestHandler):
+        def send(self, data):
+            self.server.mailbox.bytes_sent += len(data)
+            self.wfile.write(data)
+
+        def handle(self):
+            mailbox = self.server.mailbox
+            self.send(b'* OK [CAPABILITY IMAP4rev1 IDLE] IMAP stand-in ready\r\n')
+            for line in self.rfile:
+                tag, command, *rest = line.decode().rstrip('\r\n').split(' ', 2)
+                args = rest[0] if rest else ''
+                command = command.upper()
+                if command == 'UID':
+                    command, _, args = args.partition(' ')
+                    getattr(self, f"uid_{command.lower()}")(args)
+                elif command == 'SELECT':
+                    self.send(f"* {len(mailbox.messages)} EXISTS\r\n".encode())
+                    self.send(f"* OK [UIDVALIDITY {mailbox.uidvalidity}] UIDs valid\r\n".encode())
+                elif command == 'IDLE':
+                    self.idle()
+                elif command == 'LOGOUT':
+                    self.send(f"* BYE\r\n{tag} OK LOGOUT completed\r\n".encode())
+                    return
+                self.send(f"{tag} OK {command} completed\r\n".encode())
+
+        def uid_search(self, args):
+            low = int(re.search(r'UID (\d+):\*', args).group(1))
+            matches = [uid for uid, _, seen in self.server.mailbox.messages
+                       if not seen and uid >= low]
+            # Like real servers, "n:*" also matches the newest message
+            if self.server.mailbox.messages:
+                matches.append(self.server.mailbox.messages[-1][0])
+            self.send(f"* SEARCH {' '.join(map(str, sorted(set(matches))))}\r\n".encode())
+
+        def uid_fetch(self, args):
+            spec, _, items = args.partition(' ')
+            wanted = self.server.mailbox.uid_set(spec)
+            for seq, (uid, raw, _) in enumerate(self.server.mailbox.messages, 1):
+                if uid not in wanted:
+                    continue
+                sections = self.server.mailbox.sections[uid]
+                response = f"* {seq} FETCH (UID {uid}".encode()
+                for name, origin, size in re.findall(r'BODY\.PEEK\[([^\]]*)\](?:<(\d+)\.(\d+)>)?', items):
+                    data = sections.get(name, b'')
+                    label = f"BODY[{name}]"
+                    if size:
+                        data = data[int(origin):int(origin) + int(size)]
+                        label += f"<{origin}>"
+                    response += f" {label} {{{len(data)}}}\r\n".encode() + data
+                self.send(response + b')\r\n')
+
+        def uid_store(self, args):
+            spec = args.split(' ', 1)[0]
+            wanted = self.server.mailbox.uid_set(spec)
+            for seq, message in enumerate(self.server.mailbox.messages, 1):
+                if message[0] in wanted:
+                    message[2] = True
+                    self.send(f"* {seq} FETCH (UID {message[0]} FLAGS (\\Seen))\r\n".encode())
+
+        def idle(self):
+            self.send(b'+ idling\r\n')
+            known = len(self.server.mailbox.messages)
+            while True:
+                if len(self.server.mailbox.messages) > known:
+                    known = len(self.server.mailbox.messages)
+                    self.send(f"* {known} EXISTS\r\n".encode())
+                if select.select([self.connection], [], [], 0.05)[0]:
+                    self.rfile.readline()  # DONE
+                    return
+
+    class FakeImapServer(socketserver.ThreadingTCPServer):
+        daemon_threads = True
+        allow_reuse_address = True
+
+    server = FakeImapServer(('localhost', 0), FakeImapHandler)
+    server.mailbox = FakeMailbox()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, server.mailbox
+
+def test_fetcher():
+    """Fetch from a local IMAP stand-in: watermarks, partial fetch and IDLE"""
+    import tempfile
+    from mail_body import extract_body
+
+    print("🧪 Testing IMAP fetcher against a local IMAP stand-in...")
+
+    server, mailbox = start_imap_stand_in()
+    mailbox.add(make_test_message("Old news", "Already read"), seen=True)
+    mailbox.add(make_test_message("Quick task", "Todo: call the bank about the loan\n"))
+    mailbox.add(make_test_message("Meeting notes", "1. Review the quarterly budget\n2. Send project timeline\n",
+                             attachment=os.urandom(512 * 1024)))
+
+    state_file = os.path.join(tempfile.mkdtemp(), "imap_state.json")
+
+    def new_fetcher():
+        fetcher = ImapFetcher('localhost', 'me@example.com', 'secret',
+                              port=server.server_address[1], use_ssl=False, state_file=state_file)
+        fetcher.connect()
+        fetcher.select('INBOX')
+        return fetcher
+
+    received = []
+    header_parser = BytesHeaderParser(policy=policy.default)
+    handler = lambda key, raw: received.append((key, header_parser.parsebytes(raw)['Subject'], extract_body(raw)))
+
+    try:
+        fetcher = new_fetcher()
+        count = fetcher.poll(handler)
+        mailbox_size = sum(len(raw) for _, raw, _ in mailbox.messages)
+        print(f"📧 First poll: {count} messages, {mailbox.bytes_sent:,} bytes sent "
+              f"for a {mailbox_size:,} byte mailbox")
+        for key, subject, body in received:
+            print(f"   • {key} {subject}: {body.strip()!r}")
+
+        print(f"📧 Second poll: {fetcher.poll(handler)} messages")
+        fetcher.close()
+
+        fetcher = new_fetcher()
+        print(f"📧 After reconnect: {fetcher.poll(handler)} messages (watermark {fetcher.last_uid})")
+
+        threading.Timer(0.3, mailbox.add, [make_test_message("Pushed", "Reminder: book flights\n")]).start()
+        print(f"⏳ IDLE woke up for new mail: {fetcher.idle(timeout=5)}")
+        print(f"📧 Poll after IDLE: {fetcher.poll(handler)} messages ({received[-1][1]})")
+        fetcher.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'test':
+        test_fetcher()
+    else:
+        print("Usage: python imap_fetcher.py test")
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Email Body Extraction
+Streams a MIME message to its readable text without decoding attachments
+"""
+
+import io
+import html
+from email import policy
+from email.message import Message
+from email.parser import BytesHeaderParser, BytesFeedParser
+from html.parser import HTMLParser
+
+MAX_TEXT_BYTES = 1024 * 1024
+MAX_LINE_BYTES = 64 * 1024
+
+class HtmlText(HTMLParser):
+    """Plain-text rendering of an HTML body (tags dropped, blocks on new lines)"""
+
+    BLOCK_TAGS = {'p', 'div', 'br', 'li', 'tr', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'table', 'ul', 'ol'}
+    SKIP_TAGS = {'script', 'style', 'head'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self.skipping += 1
+        elif tag == 'li':
+            self.parts.append('\n• ')
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS:
+            self.skipping = max(0, self.skipping - 1)
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_data(self, data):
+        if not self.skipping:
+            self.parts.append(data)
+
+    def text(self):
+        lines = (' '.join(line.split()) for line in ''.join(self.parts).splitlines())
+        return '\n'.join(line for line in lines if line)
+
+def html_to_text(markup):
+    parser = HtmlText()
+    try:
+        parser.feed(markup)
+        parser.close()
+    except Exception:
+        return html.unescape(markup)
+    return parser.text()
+
+class MimeBodyScanner:
+    """Single forward pass over a raw message, one line at a time.
+
+    Part headers are parsed as they stream past; only the body lines of
+    text/plain and text/html parts are kept (up to `max_text_bytes`), and
+    every other part is skipped line by line without being stored or
+    decoded. Scanning stops at the first inline text/plain part, so an
+    attachment that follows it is never even read.
+    """
+
+    def __init__(self, max_text_bytes=MAX_TEXT_BYTES):
+        self.max_text_bytes = max_text_bytes
+        self.header_parser = BytesHeaderParser(policy=policy.default)
+
+    def extract(self, stream):
+        self.plain = None
+        self.html = None
+        lines = iter(lambda: stream.readline(MAX_LINE_BYTES), b'')
+        raw_headers, headers = self.read_headers(lines)
+        self.scan(lines, raw_headers, headers, [])
+        if self.plain is not None:
+            return self.plain
+        if self.html is not None:
+            return html_to_text(self.html)
+        return ""
+
+    def read_headers(self, lines):
+        raw = b''
+        for line in lines:
+            if line in (b'\r\n', b'\n'):
+                break
+            raw += line
+        return raw, self.header_parser.parsebytes(raw)
+
+    def boundary_of(self, line, boundaries):
+        """(delimiter, closing) if line is one of the enclosing boundaries"""
+        if not line.startswith(b'--'):
+            return None
+        marker = line.rstrip(b'\r\n \t')
+        for delimiter in reversed(boundaries):
+            if marker == delimiter:
+                return delimiter, False
+            if marker == delimiter + b'--':
+                return delimiter, True
+        return None
+
+    def skip(self, lines, boundaries):
+        """Discard lines up to the next enclosing boundary; returns it (None at EOF)"""
+        for line in lines:
+            if self.boundary_of(line, boundaries):
+                return line
+        return None
+
+    def collect(self, lines, boundaries):
+        body, size = [], 0
+        for line in lines:
+            if self.boundary_of(line, boundaries):
+                break
+            if size < self.max_text_bytes:
+                body.append(line)
+                size += len(line)
+        else:
+            line = None
+        data = b''.join(body)
+        if line is not None:
+            data = data[:-2] if data.endswith(b'\r\n') else data.rstrip(b'\n')
+        return data, line
+
+    def decode(self, raw_headers, body):
+        """Decode transfer encoding and charset the way the part declares them"""
+        parser = BytesFeedParser(policy=policy.default)
+        parser.feed(raw_headers)
+        parser.feed(b'\r\n')
+        parser.feed(body)
+        part = parser.close()
+        try:
+            return part.get_content()
+        except (LookupError, UnicodeError):
+            payload = part.get_payload(decode=True) or b''
+            return payload.decode('utf-8', errors='replace')
+
+    def scan(self, lines, raw_headers, headers, boundaries):
+        """Consume one entity; returns the boundary line that ended it (None at EOF)"""
+        if headers.get_content_maintype() == 'multipart' and headers.get_param('boundary'):
+            delimiter = b'--' + headers.get_param('boundary').encode()
+            inner = boundaries + [delimiter]
+            line = self.skip(lines, inner)  # Preamble
+            while line is not None:
+                found, closing = self.boundary_of(line, inner)
+                if found != delimiter:
+                    return line  # An enclosing multipart ended
+                if closing:
+                    return self.skip(lines, boundaries)  # Epilogue
+                part_raw, part_headers = self.read_headers(lines)
+                line = self.scan(lines, part_raw, part_headers, inner)
+                if self.plain is not None:
+                    return None
+            return None
+
+        content_type = headers.get_content_type()
+        inline = headers.get_content_disposition() != 'attachment'
+        if inline and content_type == 'text/plain':
+            body, line = self.collect(lines, boundaries)
+            self.plain = self.decode(raw_headers, body)
+            return line
+        if inline and content_type == 'text/html' and self.html is None:
+            body, line = self.collect(lines, boundaries)
+            self.html = self.decode(raw_headers, body)
+            return line
+        return self.skip(lines, boundaries)
+
+def extract_body(source, max_text_bytes=MAX_TEXT_BYTES):
+    """Readable text of an email: the first plain-text part, else its HTML as text.
+
+    source may be raw bytes, a binary file object or a parsed Message.
+    """
+    if isinstance(source, Message):
+        return message_body(source)
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    return MimeBodyScanner(max_text_bytes).extract(source)
+
+def message_body(msg):
+    """Same as extract_body for a message that is already parsed"""
+    if hasattr(msg, 'get_body'):
+        part = msg.get_body(preferencelist=('plain', 'html'))
+        if part is None:
+            return ""
+        try:
+            text = part.get_content()
+        except (LookupError, UnicodeError, KeyError):
+            text = (part.get_payload(decode=True) or b'').decode('utf-8', errors='replace')
+        return html_to_text(text) if part.get_content_type() == 'text/html' else text
+
+    # Legacy (compat32) Message objects
+    for part in msg.walk():
+        if part.get_content_type() == 'text/plain' and part.get_content_disposition() != 'attachment':
+            payload = part.get_payload(decode=True) or b''
+            try:
+                return payload.decode(part.get_content_charset() or 'utf-8', errors='replace')
+            except LookupError:
+                return payload.decode('utf-8', errors='replace')
+    return ""
+
+def test_extraction():
+    """Pull the text out of a message carrying a large attachment"""
+    import time
+    import email
+    import tracemalloc
+    from email.message import EmailMessage
+
+    print("🧪 Testing streaming body extraction...")
+
+    msg = EmailMessage()
+    msg['From'] = 'boss@example.com'
+    msg['Subject'] = 'Quarterly pack'
+    msg.set_content("Todo: review the attached deck\n- Send comments to René by Friday\n", charset='iso-8859-1')
+    msg.add_alternative("<p>Todo: review the attached deck</p><ul><li>Send comments by Friday</li></ul>",
+                        subtype='html')
+    msg.add_attachment(b'\0' * (20 * 1024 * 1024), maintype='application', subtype='zip',
+                       filename='deck.zip')
+    raw = msg.as_bytes()
+
+    html_only = EmailMessage()
+    html_only['Subject'] = 'HTML only'
+    html_only.set_content("<html><body><h1>Notes</h1><p>Please book the venue &amp; caterer</p>"
+                          "<script>var x;</script></body></html>", subtype='html', charset='utf-8')
+
+    for name, parse in [('message_from_bytes', lambda data: message_body(email.message_from_bytes(data, policy=policy.default))),
+                        ('streaming scan', extract_body)]:
+        tracemalloc.start()
+        started = time.perf_counter()
+        text = parse(raw)
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"   • {name:<19} {elapsed * 1000:>8.1f}ms  peak {peak / 1e6:>6.1f} MB  -> {text.strip()!r}")
+
+    print(f"📄 {len(raw) / 1e6:.1f} MB message, HTML-only fallback -> {extract_body(html_only.as_bytes())!r}")
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'test':
+        test_extraction()
+    else:
+        print("Usage: python mail_body.py test")
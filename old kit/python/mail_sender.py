@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Mail Sender
+Sends outbound email from a background queue over one reusable SMTP connection
+"""
+
+import time
+import queue
+import atexit
+import smtplib
+import threading
+from env_loader import get_settings
+
+class MailSender:
+    """Delivers queued messages over a persistent, authenticated SMTP session.
+
+    Callers enqueue a message and return immediately; a worker thread
+    drains the queue in batches on the same connection, so STARTTLS and
+    login happen once per burst instead of once per message. The
+    connection is closed after `idle_timeout` seconds without mail and
+    transparently re-opened if the server dropped it in the meantime.
+    """
+
+    def __init__(self, host=None, port=None, user=None, password=None, use_tls=None,
+                 batch_size=20, idle_timeout=60, max_retries=3, timeout=30):
+        settings = get_settings()
+        self.host = host or settings.smtp_host
+        self.port = port or settings.smtp_port
+        self.user = user or settings.gmail_user
+        self.password = password or settings.gmail_password
+        self.use_tls = settings.smtp_starttls if use_tls is None else use_tls
+        self.batch_size = batch_size
+        self.idle_timeout = idle_timeout
+        self.max_retries = max_retries
+        self.timeout = timeout
+
+        self.queue = queue.Queue()
+        self.conn = None
+        self.worker = None
+        self.lock = threading.Lock()
+        self.warned = False
+
+    @property
+    def enabled(self):
+        return bool(self.user and self.password)
+
+    def enqueue(self, msg, on_sent=None):
+        """Queue a message (with From/To set) for delivery; returns False if SMTP is not configured"""
+        if not self.enabled:
+            if not self.warned:
+                print("⚠️ SMTP credentials not configured (set GMAIL_USER and GMAIL_APP_PASSWORD)")
+                self.warned = True
+            return False
+
+        self.queue.put({'msg': msg, 'on_sent': on_sent})
+        self.start()
+        return True
+
+    def start(self):
+        with self.lock:
+            if self.worker is None or not self.worker.is_alive():
+                self.worker = threading.Thread(target=self.worker_loop, name='mail-sender', daemon=True)
+                self.worker.start()
+
+    def flush(self, timeout=60):
+        """Wait until every queued message has been sent (or given up on)"""
+        deadline = time.time() + timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self.queue.all_tasks_done.wait(remaining)
+        return True
+
+    def worker_loop(self):
+        while True:
+            try:
+                batch = [self.queue.get(timeout=self.idle_timeout)]
+            except queue.Empty:
+                self.reset_connection()  # Don't hold an idle session open
+                continue
+
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                self.send_batch(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def send_batch(self, batch):
+        """Send each message in the batch back-to-back on the same connection"""
+        for item in batch:
+            msg = item['msg']
+            try:
+                self.send(msg)
+            except Exception as e:
+                print(f"❌ Error sending email to {msg['To']}: {e}")
+                continue
+
+            print(f"📤 Email sent to {msg['To']}: {msg['Subject']}")
+            if item['on_sent']:
+                try:
+                    item['on_sent'](msg)
+                except Exception as e:
+                    print(f"Error in email callback: {e}")
+
+    def send(self, msg):
+        """Send one message, reconnecting on dropped sessions and temporary failures"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.connect().send_message(msg)
+                return
+            except smtplib.SMTPRecipientsRefused:
+                raise  # Permanent for this message; the session is still fine
+            except smtplib.SMTPResponseException as e:
+                self.reset_connection()
+                if e.smtp_code < 400 or e.smtp_code >= 500 or attempt == self.max_retries:
+                    raise
+                self.backoff(attempt, f"SMTP {e.smtp_code}")
+            except (smtplib.SMTPServerDisconnected, OSError) as e:
+                self.reset_connection()
+                if attempt == self.max_retries:
+                    raise
+                if attempt:
+                    self.backoff(attempt, f"connection error: {e}")
+
+    def backoff(self, attempt, reason):
+        delay = min(30, 2 ** attempt)
+        print(f"🔁 Retrying email in {delay}s ({reason})")
+        time.sleep(delay)
+
+    def connect(self):
+        if self.conn is None:
+            conn = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            try:
+                conn.ehlo()
+                if self.use_tls:
+                    conn.starttls()
+                    conn.ehlo()
+                conn.login(self.user, self.password)
+            except Exception:
+                conn.close()
+                raise
+            self.conn = conn
+        return self.conn
+
+    def reset_connection(self):
+        if self.conn is not None:
+            try:
+                self.conn.quit()
+            except Exception:
+                self.conn.close()
+            self.conn = None
+
+_mail_sender = None
+_mail_sender_lock = threading.Lock()
+
+def get_mail_sender():
+    """Return the process-wide mail sender shared by all channel managers"""
+    global _mail_sender
+    with _mail_sender_lock:
+        if _mail_sender is None:
+            _mail_sender = MailSender()
+            atexit.register(_mail_sender.flush)  # The worker is a daemon thread: send queued mail before exit
+        return _mail_sender
+
+def test_sender():
+    """Send a burst of mail through a local SMTP stand-in"""
+    import socket
+    import socketserver
+    from email.message import EmailMessage
+
+    print("🧪 Testing mail sender against a local SMTP stand-in...")
+
+    class FakeSmtpHandler(socketserver.StreamRequestHandler):
+        def reply(self, line):
+            self.wfile.write(f"{line}\r\n".encode())
+
+        def handle(self):
+            stats = self.server.stats
+            stats['connections'] += 1
+            self.server.sockets.append(self.connection)
+            self.reply("220 localhost SMTP stand-in")
+            for line in self.rfile:
+                command = line.decode().strip()
+                verb = command.split(' ', 1)[0].upper()
+                if verb == 'EHLO':
+                    self.reply("250-localhost")
+                    self.reply("250 AUTH PLAIN LOGIN")
+                elif verb == 'AUTH':
+                    stats['logins'] += 1
+                    self.reply("235 2.7.0 Authentication successful")
+                elif verb == 'DATA':
+                    self.reply("354 End data with <CR><LF>.<CR><LF>")
+                    for data_line in self.rfile:
+                        if data_line in (b'.\r\n', b'.\n'):
+                            break
+                    stats['messages'] += 1
+                    self.reply("250 2.0.0 Queued")
+                elif verb == 'QUIT':
+                    self.reply("221 Bye")
+                    return
+                else:
+                    self.reply("250 OK")
+
+    class FakeSmtpServer(socketserver.ThreadingTCPServer):
+        daemon_threads = True
+        allow_reuse_address = True
+
+    server = FakeSmtpServer(('localhost', 0), FakeSmtpHandler)
+    server.stats = {'connections': 0, 'logins': 0, 'messages': 0}
+    server.sockets = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def make_message(i):
+        msg = EmailMessage()
+        msg['From'] = 'todo@example.com'
+        msg['To'] = 'me@example.com'
+        msg['Subject'] = f"[Todo System] Test {i}"
+        msg.set_content(f"Test message {i}")
+        return msg
+
+    try:
+        sender = MailSender(host='localhost', port=server.server_address[1], user='todo@example.com',
+                            password='secret', use_tls=False)
+        started = time.perf_counter()
+        for i in range(1, 11):
+            sender.enqueue(make_message(i))
+        print(f"⚡ Enqueued 10 messages in {(time.perf_counter() - started) * 1000:.1f}ms")
+        sender.flush()
+        print(f"📊 After burst: {server.stats}")
+
+        # Simulate the server dropping an idle session
+        for sock in server.sockets:
+            sock.shutdown(socket.SHUT_RDWR)
+        sender.enqueue(make_message(11))
+        sender.flush()
+        print(f"📊 After server dropped the session: {server.stats}")
+        sender.reset_connection()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'test':
+        test_sender()
+    else:
+        print("Usage: python mail_sender.py test")
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Channel Todo Manager Base
+Storage, indexing and bookkeeping shared by the WhatsApp and email todo managers
+"""
+
+import threading
+from itertools import chain
+from contextlib import contextmanager
+from datetime import datetime
+from todo_store import open_todo_store, paginate, matches
+from todo_index import TodoIndex
+from id_sequence import get_id_sequence
+from report_view import get_report_view
+
+class ChannelTodoManager:
+    """Todo list of one channel, kept in the configured store.
+
+    Subclasses name their CHANNEL (used for the id sequence and the report
+    view), the TABLE and TODO_FILE the todos are stored in, and the
+    OWNER_FIELD a todo is filed under (e.g. the sender's phone number).
+    Subclasses build the todo dicts; adding, completing and listing them
+    goes through the shared index, store and report view here.
+    """
+
+    CHANNEL = None
+    TABLE = None
+    TODO_FILE = None
+    OWNER_FIELD = None
+
+    # Attributes created on first access, by the named method
+    LAZY_LOADERS = {
+        'store': 'open_store',
+        'todos': 'load_todos',
+        'index': 'load_todos',
+    }
+
+    def __init__(self):
+        self.todo_file = self.TODO_FILE
+        self.pending_inserts = None  # Set while a transaction() is open
+        self.lock = threading.RLock()  # Webhook workers, sync stages and the GitHub publisher share it
+        # Seeded from the store only if the sequence file has no counter yet
+        self.id_sequence = get_id_sequence(self.CHANNEL, seed=lambda: self.store.max_id() + 1)
+        self.report = get_report_view()
+
+    def __getattr__(self, name):
+        # The store and the todo history are opened on first use, so
+        # commands that never touch them don't pay for loading every todo
+        loader = self.LAZY_LOADERS.get(name)
+        if loader:
+            with self.lock:
+                if name not in self.__dict__:
+                    getattr(self, loader)()
+            return self.__dict__[name]
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
+    def open_store(self):
+        self.store = open_todo_store(self.TABLE, self.todo_file)
+
+    def load_todos(self):
+        """Load the working set from the configured store: the pending todos.
+
+        Completed todos are history; they stay in the store and are
+        streamed by iter_todos when a report asks for them. Stores that
+        rewrite the whole list on every write still need all of it.
+        """
+        full = self.store.writes_full_list
+        with self.lock:
+            todos = self.store.load(status=None if full else 'pending')
+            self.index = TodoIndex(todos, owner_field=self.OWNER_FIELD)
+            self.todos = todos
+        if full:
+            self.report.attach(self.CHANNEL, self.report_signature(), lambda: self.todos)
+        else:
+            self.refresh_report()
+
+    def indexed(self, status):
+        """True if every todo with this status (None: every todo) is held in memory"""
+        return status == 'pending' or self.store.writes_full_list
+
+    def report_signature(self):
+        """Cheap fingerprint of the store, to tell whether the report view matches it"""
+        return self.store.signature()
+
+    def refresh_report(self):
+        """Recount the channel in the report view if the store changed behind its back; True if it did.
+
+        Only the store's signature is read unless it differs from the
+        view's, so this is cheap enough to call before every report. A
+        recount pages through the store itself: todos held in memory here
+        miss whatever the other process wrote.
+        """
+        return self.report.attach(self.CHANNEL, self.report_signature(),
+                                  lambda: chain.from_iterable(self.store.iter_pages()))
+
+    def save_todos(self):
+        """Save the loaded todos to the configured store"""
+        if self.store.writes_full_list:
+            self.store.save_all(self.todos)
+        else:
+            self.store.update_many(self.todos)  # A rewrite would drop the history not in memory
+
+    def next_todo_id(self):
+        return self.id_sequence.next_id(floor=self.index.max_id + 1)
+
+    def store_new_todo(self, todo):
+        """Index a freshly built todo and persist it (buffered inside a transaction)"""
+        with self.lock:
+            self.todos.append(todo)
+            self.index.add(todo)
+            if self.pending_inserts is None:
+                self.store.insert(todo, self.todos)
+                self.report.todo_added(self.CHANNEL, todo, self.report_signature())
+            else:
+                self.pending_inserts.append(todo)
+
+    @contextmanager
+    def transaction(self):
+        """Buffer todos added inside the block and write them to the store once"""
+        with self.lock:
+            outer = self.pending_inserts is None
+            if outer:
+                self.pending_inserts = []
+            try:
+                yield
+            finally:
+                if outer:
+                    pending, self.pending_inserts = self.pending_inserts, None
+                    if pending:
+                        self.store.insert_many(pending, self.todos)
+                        signature = self.report_signature()
+                        for todo in pending:
+                            self.report.todo_added(self.CHANNEL, todo, signature)
+
+    def add_todos_bulk(self, descriptions, owner, **fields):
+        """Add several todos with a single store write"""
+        with self.transaction():
+            return [self.add_todo(description, owner, **fields) for description in descriptions]
+
+    def mark_completed(self, todo_id):
+        """Complete a pending todo; returns it, or None if not found or already done"""
+        with self.lock:
+            todo = self.index.get(todo_id)
+            if not todo or todo['status'] != 'pending':
+                return None
+            todo['status'] = 'completed'
+            todo['completed_at'] = datetime.now().isoformat()
+            self.index.move(todo, 'pending')
+            self.store.update(todo, self.todos)
+            self.report.status_changed(
+                self.CHANNEL, todo_id, 'pending', 'completed', self.report_signature(), todo=todo,
+                refill=lambda: self.index.recent('pending', limit=self.report.recent_limit))
+            return todo
+
+    def iter_todos(self, status=None, since=None, page_size=100, completed_after=None):
+        """Yield todos in id order, fetched page_size at a time.
+
+        since is an id cursor: only todos after it are returned, so a caller
+        can resume from the last id it saw. completed_after (an ISO
+        timestamp) keeps only todos completed at or after it. Unless the
+        requested todos are all in memory, pages are read straight from the
+        store and never kept, so one-off reports don't load every old todo.
+        """
+        if 'index' in self.__dict__ and self.indexed(status):
+            with self.lock:
+                if status is None:
+                    todos = [todo for todo in self.index.list() if since is None or todo['id'] > since]
+                else:
+                    todos = self.index.since(status, since or 0)
+            if completed_after is not None:
+                todos = [todo for todo in todos if matches(todo, completed_after=completed_after)]
+            pages = paginate(todos, page_size)
+        else:
+            pages = self.store.iter_pages(status, since, page_size, completed_after)
+        for page in pages:
+            yield from page
+
+    def set_github_issue(self, todo_id, issue_number):
+        """Record the GitHub issue number created for a todo"""
+        with self.lock:
+            todo = self.index.get(todo_id)
+            if todo:
+                todo['github_issue'] = issue_number
+                signature = self.report_signature()
+                self.store.update(todo, self.todos)
+                self.report.touch(self.CHANNEL, signature, self.report_signature())
+                return True
+        return False
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Message Ledger
+Set of processed message ids backed by an append-only log
+"""
+
+import os
+import json
+import threading
+
+class MessageLedger:
+    """Remembers which messages were already handled.
+
+    Membership is a dict lookup and recording an id appends one line to
+    the log, so the cost per message does not grow with the history. The
+    log is rewritten only by `compact()`: it drops duplicate lines and,
+    with `max_entries` set, forgets the oldest ids (the IMAP watermark
+    already keeps those messages from being fetched again).
+    """
+
+    def __init__(self, log_file, max_entries=100000, legacy_file=None):
+        self.log_file = log_file
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = {}  # id -> None, in the order they were recorded
+        self.log_lines = 0
+        self.load(legacy_file)
+
+    def load(self, legacy_file=None):
+        if not os.path.exists(self.log_file):
+            if legacy_file and os.path.exists(legacy_file):
+                self.import_legacy(legacy_file)
+            return
+
+        try:
+            with open(self.log_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    key = line.rstrip('\n')
+                    if key:
+                        self.entries[key] = None
+                        self.log_lines += 1
+        except Exception as e:
+            print(f"Error loading processed messages: {e}")
+
+    def import_legacy(self, legacy_file):
+        """One-time import of the old JSON list format"""
+        try:
+            with open(legacy_file, 'r') as f:
+                self.entries = dict.fromkeys(json.load(f))
+            self.compact()
+        except Exception as e:
+            print(f"Error importing {legacy_file}: {e}")
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, key):
+        """Record a processed id; returns False if it was already known"""
+        with self.lock:
+            if key in self.entries:
+                return False
+            self.entries[key] = None
+            try:
+                with open(self.log_file, 'a', encoding='utf-8') as f:
+                    f.write(f"{key}\n")
+                self.log_lines += 1
+            except Exception as e:
+                print(f"Error saving processed message: {e}")
+            return True
+
+    def needs_compaction(self):
+        if self.max_entries and len(self.entries) > self.max_entries:
+            return True
+        return self.log_lines > 2 * len(self.entries)
+
+    def compact(self):
+        """Rewrite the log with each id once, keeping only the newest max_entries"""
+        with self.lock:
+            keys = list(self.entries)
+            if self.max_entries and len(keys) > self.max_entries:
+                keys = keys[-self.max_entries:]
+                self.entries = dict.fromkeys(keys)
+
+            tmp_file = f"{self.log_file}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                f.writelines(f"{key}\n" for key in keys)
+            os.replace(tmp_file, self.log_file)
+            self.log_lines = len(keys)
+
+    def compact_if_needed(self):
+        if self.needs_compaction():
+            self.compact()
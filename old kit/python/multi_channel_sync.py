@@ -6,27 +6,80 @@ Coordinates todos across WhatsApp, Email, Google Sheets, and GitHub Issues
 
 import os
 import json
-import subprocess
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 from datetime import datetime
-from env_loader import load_env
+from env_loader import get_settings
 
 # Import our integration modules
 from whatsapp_todo_integration import WhatsAppTodoManager
 from email_todo_integration import EmailTodoManager
 from google_sheets_integration import GoogleSheetsTodoManager
+from github_publisher import get_publisher
+from mail_sender import get_mail_sender
+from dedup_index import get_dedup_index, normalize
+from report_view import get_report_view
+from backup_store import open_backup_store
+from message_ledger import MessageLedger
+
+DEFAULT_PHONE_NUMBER = "919742814697"
+SYNC_LEDGER_FILE = "sync_ledger.log"
+
+# Manager class per channel, instantiated on first use
+CHANNEL_MANAGERS = {
+    'whatsapp': WhatsAppTodoManager,
+    'email': EmailTodoManager,
+    'sheets': GoogleSheetsTodoManager,
+}
+
+# Channels tracked by the report view
+REPORT_CHANNELS = ['whatsapp', 'email', 'sheets']
+
+# Per-stage time limits (seconds) for stages that run concurrently
+CHANNEL_TIMEOUTS = {
+    'whatsapp': 30,
+    'email': 180,
+    'github': 60,
+    'report': 60,
+}
 
 class MultiChannelTodoSync:
     def __init__(self):
-        load_env()
         self.sync_log_file = "sync_log.json"
+        # "destination source:id" for every todo a destination already has.
+        # Kept apart from the todo stores, which belong to the processes
+        # that add and complete todos.
+        self.synced = MessageLedger(SYNC_LEDGER_FILE, max_entries=None)
+        self.channel_timeouts = dict(CHANNEL_TIMEOUTS)
+        self.dedup = get_dedup_index()
+        self.backups = open_backup_store()
         
-        # Initialize all channel managers
-        self.whatsapp_manager = WhatsAppTodoManager()
-        self.email_manager = EmailTodoManager()
-        self.sheets_manager = GoogleSheetsTodoManager()
+        # Channel managers are created the first time a channel is used
+        self.managers = {}
+        self.managers_lock = threading.Lock()
         
         self.load_sync_log()
     
+    def manager(self, channel):
+        """The channel's manager, created on first use"""
+        with self.managers_lock:
+            if channel not in self.managers:
+                self.managers[channel] = CHANNEL_MANAGERS[channel]()
+            return self.managers[channel]
+    
+    @property
+    def whatsapp_manager(self):
+        return self.manager('whatsapp')
+    
+    @property
+    def email_manager(self):
+        return self.manager('email')
+    
+    @property
+    def sheets_manager(self):
+        return self.manager('sheets')
+    
     def load_sync_log(self):
         """Load synchronization log"""
         try:
@@ -41,6 +94,24 @@ class MultiChannelTodoSync:
         except Exception as e:
             print(f"Error loading sync log: {e}")
             self.sync_log = {'last_sync': None, 'sync_history': []}
+        
+        # Id watermarks from older versions; ids are handed out in blocks
+        # per process, so progress is now kept in the sync ledger instead
+        self.sync_log.pop('watermarks', None)
+    
+    def synced_key(self, destination, source, todo_id):
+        return f"{destination} {source}:{todo_id}"
+    
+    def new_todos(self, source, destination):
+        """Pending todos from a channel that the ledger has not seen reach destination"""
+        if source == 'whatsapp':
+            todos = self.whatsapp_manager.list_todos(DEFAULT_PHONE_NUMBER)
+        else:
+            todos = self.email_manager.list_todos()
+        return [todo for todo in todos if self.synced_key(destination, source, todo['id']) not in self.synced]
+    
+    def mark_synced(self, destination, source, todo_id):
+        self.synced.add(self.synced_key(destination, source, todo_id))
     
     def save_sync_log(self):
         """Save synchronization log"""
@@ -50,10 +121,50 @@ class MultiChannelTodoSync:
         except Exception as e:
             print(f"Error saving sync log: {e}")
     
+    def timed(self, func):
+        start = time.perf_counter()
+        result = func()
+        return result, time.perf_counter() - start
+    
+    def run_concurrently(self, stages, sync_results):
+        """Run independent stages in parallel, each bounded by its channel timeout.
+        
+        Returns {stage: result} for the stages that finished; timeouts and
+        failures are recorded in sync_results. A stage that times out keeps
+        running in the background but the sync no longer waits for it.
+        """
+        executor = ThreadPoolExecutor(max_workers=len(stages), thread_name_prefix='sync')
+        started = time.perf_counter()
+        futures = {name: executor.submit(self.timed, func) for name, func in stages.items()}
+        
+        results = {}
+        for name, future in futures.items():
+            timeout = self.channel_timeouts.get(name, 60)
+            remaining = max(0, timeout - (time.perf_counter() - started))
+            try:
+                results[name], elapsed = future.result(timeout=remaining)
+                sync_results['timings'][name] = round(elapsed, 3)
+            except FutureTimeout:
+                sync_results['timings'][name] = None
+                sync_results['errors'].append(f"{name} timed out after {timeout}s")
+            except Exception as e:
+                sync_results['timings'][name] = round(time.perf_counter() - started, 3)
+                sync_results['errors'].append(f"{name} error: {e}")
+        
+        executor.shutdown(wait=False)
+        return results
+    
+    def fetch_email_todos(self):
+        """Pull new emails, then list pending email todos (None if IMAP failed)"""
+        if not self.email_manager.process_emails():
+            return None
+        return self.email_manager.list_todos()
+    
     def sync_all_channels(self):
         """Synchronize todos across all channels"""
         print("🔄 Starting multi-channel synchronization...")
         sync_timestamp = datetime.now().isoformat()
+        sync_started = time.perf_counter()
         
         sync_results = {
             'timestamp': sync_timestamp,
@@ -61,60 +172,50 @@ class MultiChannelTodoSync:
             'emails_processed': 0,
             'sheets_synced': 0,
             'github_created': 0,
+            'duplicates_skipped': 0,
+            'timings': {},
             'errors': []
         }
         
         try:
-            # 1. Process new WhatsApp messages (if webhook data available)
+            # 1-2. Fetch WhatsApp and email todos concurrently
             print("📱 Checking WhatsApp todos...")
-            whatsapp_todos = self.whatsapp_manager.list_todos("919742814697")  # Default number
+            print("📧 Processing emails...")
+            fetched = self.run_concurrently({
+                'whatsapp': lambda: self.whatsapp_manager.list_todos(DEFAULT_PHONE_NUMBER),
+                'email': self.fetch_email_todos,
+            }, sync_results)
+            
+            whatsapp_todos = fetched.get('whatsapp') or []
             sync_results['whatsapp_processed'] = len(whatsapp_todos)
             
-            # 2. Process new emails
-            print("📧 Processing emails...")
-            email_success = self.email_manager.process_emails()
-            if email_success:
-                email_todos = self.email_manager.list_todos()
+            email_todos = fetched.get('email')
+            if email_todos is not None:
                 sync_results['emails_processed'] = len(email_todos)
-            else:
+            elif 'email' in fetched:
                 sync_results['errors'].append("Email processing failed")
             
-            # 3. Sync with Google Sheets
+            # 3. Sync with Google Sheets (the only cross-channel write, so it runs alone)
             print("📊 Syncing Google Sheets...")
+            merge_started = time.perf_counter()
             try:
-                # Add WhatsApp todos to sheets
-                for todo in whatsapp_todos[-5:]:  # Last 5 todos
-                    if todo['status'] == 'pending':
-                        self.sheets_manager.add_todo(
-                            f"[WhatsApp] {todo['description']}",
-                            notes=f"From: {todo['phone_number']}"
-                        )
-                        sync_results['sheets_synced'] += 1
-                
-                # Add email todos to sheets
-                email_todos = self.email_manager.list_todos()
-                for todo in email_todos[-5:]:  # Last 5 todos
-                    if todo['status'] == 'pending':
-                        self.sheets_manager.add_todo(
-                            f"[Email] {todo['description']}",
-                            notes=f"From: {todo['sender_email']}"
-                        )
-                        sync_results['sheets_synced'] += 1
+                # Add todos the sheet has not received yet, one sheet write per channel
+                self.merge_into_sheets('whatsapp', '[WhatsApp]', 'phone_number', sync_results)
+                self.merge_into_sheets('email', '[Email]', 'sender_email', sync_results)
                         
             except Exception as e:
                 sync_results['errors'].append(f"Sheets sync error: {e}")
+            sync_results['timings']['sheets'] = round(time.perf_counter() - merge_started, 3)
             
-            # 4. Create GitHub issues for high-priority todos
+            # 4-5. Create GitHub issues and the unified report concurrently
             print("🐙 Creating GitHub issues...")
-            try:
-                self.create_github_issues_from_channels()
-                sync_results['github_created'] = 1  # Simplified count
-            except Exception as e:
-                sync_results['errors'].append(f"GitHub sync error: {e}")
-            
-            # 5. Generate unified todo report
             print("📋 Generating unified report...")
-            self.generate_unified_report()
+            finished = self.run_concurrently({
+                'github': self.create_github_issues_from_channels,
+                'report': self.generate_unified_report,
+            }, sync_results)
+            sync_results['github_created'] = finished.get('github') or 0
+            sync_results['timings']['total'] = round(time.perf_counter() - sync_started, 3)
             
             # Update sync log
             self.sync_log['last_sync'] = sync_timestamp
@@ -133,6 +234,11 @@ class MultiChannelTodoSync:
             print(f"   • Email todos: {sync_results['emails_processed']}")
             print(f"   • Sheets synced: {sync_results['sheets_synced']}")
             print(f"   • GitHub issues: {sync_results['github_created']}")
+            print(f"   • Duplicates skipped: {sync_results['duplicates_skipped']}")
+            print(f"⏱️  Stage timings (s): " + ", ".join(
+                f"{stage} {seconds if seconds is not None else 'timeout'}"
+                for stage, seconds in sync_results['timings'].items()
+            ))
             
             if sync_results['errors']:
                 print(f"⚠️  Errors encountered: {len(sync_results['errors'])}")
@@ -146,76 +252,128 @@ class MultiChannelTodoSync:
             sync_results['errors'].append(f"General sync error: {e}")
             return False
     
+    def merge_into_sheets(self, source, label, owner_field, sync_results):
+        """Append a channel's new todos to the sheet in one batch"""
+        todos = self.new_todos(source, 'sheets')
+        if not todos:
+            return
+        
+        # Creating the sheets manager seeds the 'sheets' dedup keys from
+        # the sheet's rows, so it must exist before the first seen() check
+        sheets = self.sheets_manager
+        items = []
+        batch = set()
+        for todo in todos:
+            text = normalize(todo['description'])
+            if text in batch or self.dedup.seen('sheets', todo['description']):
+                sync_results['duplicates_skipped'] += 1
+                continue
+            batch.add(text)
+            items.append({
+                'description': f"{label} {todo['description']}",
+                'notes': f"From: {todo[owner_field]}"
+            })
+        
+        sheets.add_todos_bulk(items)
+        sync_results['sheets_synced'] += len(items)
+        for todo in todos:  # Skipped duplicates too
+            self.mark_synced('sheets', source, todo['id'])
+    
     def create_github_issues_from_channels(self):
         """Create GitHub issues from high-priority channel todos"""
         try:
             # Get high-priority todos from all channels
             priority_todos = []
             
-            # WhatsApp todos (recent ones)
-            whatsapp_todos = self.whatsapp_manager.list_todos("919742814697")
-            for todo in whatsapp_todos[-3:]:  # Last 3
-                if todo['status'] == 'pending':
-                    priority_todos.append({
-                        'title': f"[WhatsApp] {todo['description']}",
-                        'body': f"Created via WhatsApp from {todo['phone_number']}\nCreated: {todo['created_at']}",
-                        'source': 'whatsapp'
-                    })
-            
-            # Email todos (recent ones)
-            email_todos = self.email_manager.list_todos()
-            for todo in email_todos[-3:]:  # Last 3
-                if todo['status'] == 'pending':
-                    priority_todos.append({
-                        'title': f"[Email] {todo['description']}",
-                        'body': f"From: {todo['sender_email']}\nSubject: {todo.get('email_subject', 'N/A')}\nCreated: {todo['created_at']}",
-                        'source': 'email'
-                    })
-            
-            # Create GitHub issues
+            # WhatsApp todos without an issue yet
+            for todo in self.new_todos('whatsapp', 'github'):
+                priority_todos.append({
+                    'title': f"[WhatsApp] {todo['description']}",
+                    'body': f"Created via WhatsApp from {todo['phone_number']}\nCreated: {todo['created_at']}",
+                    'source': 'whatsapp',
+                    'github_issue': todo.get('github_issue'),
+                    'todo_id': todo['id']
+                })
+            
+            # Email todos without an issue yet
+            for todo in self.new_todos('email', 'github'):
+                priority_todos.append({
+                    'title': f"[Email] {todo['description']}",
+                    'body': f"From: {todo['sender_email']}\nSubject: {todo.get('email_subject', 'N/A')}\nCreated: {todo['created_at']}",
+                    'source': 'email',
+                    'github_issue': todo.get('github_issue'),
+                    'todo_id': todo['id']
+                })
+            
+            # Queue GitHub issues; the publisher sends them in the background
+            # and each is recorded in the ledger once it exists. Todos whose
+            # publish fails stay unrecorded and are retried by the next sync.
+            publisher = get_publisher()
+            queued = 0
+            batch = set()
             for todo in priority_todos:
-                try:
-                    cmd = [
-                        'gh', 'issue', 'create',
-                        '--repo', 'hebbarp/todo-management',
-                        '--title', todo['title'],
-                        '--body', todo['body'],
-                        '--label', f"source:{todo['source']},status:pending"
-                    ]
-                    subprocess.run(cmd, check=True, capture_output=True)
-                    print(f"✅ Created GitHub issue: {todo['title']}")
-                except subprocess.CalledProcessError:
-                    print(f"⚠️ Could not create GitHub issue (gh CLI may not be available)")
+                text = normalize(todo['title'])
+                if todo['github_issue'] or text in batch or self.dedup.seen('github', todo['title']):
+                    # Already filed, here or from another channel
+                    self.mark_synced('github', todo['source'], todo['todo_id'])
+                    continue
+                
+                # The dedup key is recorded once the issue exists, so a
+                # failed publish is not mistaken for a filed issue later
+                on_created = lambda issue_number, todo=todo: self.issue_created(todo, issue_number)
+                if not publisher.enqueue(
+                    todo['title'],
+                    todo['body'],
+                    labels=[f"source:{todo['source']}", "status:pending"],
+                    on_created=on_created
+                ):
                     break
+                batch.add(text)
+                queued += 1
+            
+            return queued
                     
         except Exception as e:
             print(f"Error creating GitHub issues: {e}")
+            return 0
+    
+    def issue_created(self, todo, issue_number):
+        """Publisher callback: remember the issue for dedup and in the sync ledger"""
+        self.dedup.add('github', todo['title'])
+        self.mark_synced('github', todo['source'], todo['todo_id'])
+    
+    def unified_report(self):
+        """Unified report across all channels, read from the materialized report view"""
+        view = get_report_view()
+        # Managers only see their own writes; recount any channel whose
+        # store another process changed (a cheap signature check otherwise)
+        for channel in REPORT_CHANNELS:
+            self.manager(channel).refresh_report()
+        summary = {
+            'whatsapp_count': view.count('whatsapp', 'pending'),
+            'email_count': view.count('email', 'pending'),
+            'sheets_count': view.count('sheets')
+        }
+        summary['total_todos'] = sum(summary.values())
+        
+        return {
+            'generated_at': datetime.now().isoformat(),
+            'summary': summary,
+            'status_counts': {channel: view.counts(channel) for channel in REPORT_CHANNELS},
+            'todos': {
+                'whatsapp': view.recent('whatsapp', status='pending'),
+                'email': view.recent('email', status='pending'),
+                'sheets': view.recent('sheets')
+            },
+            'sync_status': self.sync_log
+        }
     
     def generate_unified_report(self):
         """Generate a unified report across all channels"""
         report_file = f"unified_todo_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
         
         try:
-            # Collect todos from all sources
-            whatsapp_todos = self.whatsapp_manager.list_todos("919742814697")
-            email_todos = self.email_manager.list_todos()
-            sheets_todos = self.sheets_manager.list_todos()
-            
-            unified_report = {
-                'generated_at': datetime.now().isoformat(),
-                'summary': {
-                    'total_todos': len(whatsapp_todos) + len(email_todos) + len(sheets_todos),
-                    'whatsapp_count': len(whatsapp_todos),
-                    'email_count': len(email_todos),
-                    'sheets_count': len(sheets_todos)
-                },
-                'todos': {
-                    'whatsapp': whatsapp_todos[-10:],  # Last 10
-                    'email': email_todos[-10:],        # Last 10
-                    'sheets': sheets_todos[-10:] if sheets_todos else []  # Last 10
-                },
-                'sync_status': self.sync_log
-            }
+            unified_report = self.unified_report()
             
             # Save report
             with open(report_file, 'w') as f:
@@ -238,12 +396,12 @@ Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
 
 📱 Recent WhatsApp Todos:"""
             
-            for todo in whatsapp_todos[-5:]:
+            for todo in unified_report['todos']['whatsapp'][-5:]:
                 status_emoji = "✅" if todo['status'] == 'completed' else "⏳"
                 summary_text += f"\n   {status_emoji} #{todo['id']}: {todo['description']}"
             
             summary_text += f"\n\n📧 Recent Email Todos:"
-            for todo in email_todos[-5:]:
+            for todo in unified_report['todos']['email'][-5:]:
                 status_emoji = "✅" if todo['status'] == 'completed' else "⏳"
                 summary_text += f"\n   {status_emoji} #{todo['id']}: {todo['description']}"
             
@@ -263,9 +421,7 @@ Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
     def send_daily_digest(self, recipient_email):
         """Send daily digest email with all channel updates"""
         try:
-            report = self.generate_unified_report()
-            if not report:
-                return False
+            report = self.unified_report()
             
             # Create digest email
             digest_subject = f"Daily Todo Digest - {datetime.now().strftime('%B %d, %Y')}"
@@ -291,7 +447,7 @@ Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
             digest_body += f"\n\n🔄 Last sync: {self.sync_log.get('last_sync', 'Never')}"
             digest_body += f"\n\n💡 Reply to this email to add new todos to your list!"
             
-            # Send via email manager
+            # Queue via email manager (sent in the background)
             success = self.email_manager.send_status_email(
                 recipient_email, 
                 digest_subject, 
@@ -305,24 +461,21 @@ Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
             return False
     
     def emergency_backup(self):
-        """Create emergency backup of all todos"""
-        backup_timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        backup_file = f"emergency_backup_{backup_timestamp}.json"
-        
+        """Create an incremental backup of all todos (see backup_store.py)"""
         try:
-            backup_data = {
-                'backup_created': datetime.now().isoformat(),
-                'whatsapp_todos': self.whatsapp_manager.todos,
-                'email_todos': self.email_manager.todos,
-                'sheets_data': self.sheets_manager.list_todos(),
-                'sync_log': self.sync_log
-            }
-            
-            with open(backup_file, 'w') as f:
-                json.dump(backup_data, f, indent=2)
-            
-            print(f"💾 Emergency backup created: {backup_file}")
-            return backup_file
+            with self.whatsapp_manager.lock, self.email_manager.lock:
+                backup_id, stats = self.backups.backup({
+                    'whatsapp_todos': list(self.whatsapp_manager.iter_todos()),
+                    'email_todos': list(self.email_manager.iter_todos()),
+                    'sheets_data': self.sheets_manager.list_todos(),
+                    'sync_log': self.sync_log
+                })
+            removed, _ = self.backups.prune()
+            
+            print(f"💾 Emergency backup created: {backup_id} "
+                  f"({stats['new_chunks']}/{stats['chunks']} chunks new, {stats['bytes_written']:,} bytes written"
+                  f"{f', {removed} old backups pruned' if removed else ''})")
+            return self.backups.manifest_path(backup_id)
             
         except Exception as e:
             print(f"❌ Backup failed: {e}")
@@ -338,6 +491,9 @@ def main():
     # Perform full synchronization
     success = sync_manager.sync_all_channels()
     
+    # Let queued GitHub issues finish publishing before exiting
+    get_publisher().flush()
+    
     if success:
         print("\n🎉 Multi-channel synchronization completed!")
         
@@ -347,10 +503,11 @@ def main():
             print(f"💾 Backup created: {backup_file}")
         
         # Optionally send digest email
-        gmail_user = os.getenv('GMAIL_USER')
+        gmail_user = get_settings().gmail_user
         if gmail_user:
             print(f"📧 Sending digest to {gmail_user}...")
             sync_manager.send_daily_digest(gmail_user)
+            get_mail_sender().flush()
         
         return True
     else:
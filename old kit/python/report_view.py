@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Unified Report View
+Per-channel todo counts and recent todos, kept current as todos change
+"""
+
+import os
+import json
+import atexit
+import threading
+from collections import Counter, deque
+from env_loader import get_settings
+from id_sequence import FileLock
+
+DEFAULT_SNAPSHOT_FILE = "report_view.json"
+RECENT_LIMIT = 10
+SAVE_DELAY = 2.0  # Seconds changes are batched before the snapshot is written
+
+def as_signature(signature):
+    """Store signatures as lists so they compare equal after a JSON round trip"""
+    return list(signature) if isinstance(signature, tuple) else signature
+
+class ReportView:
+    """Materialized view behind the unified report and the daily digest.
+
+    Channel managers report every add and status change, so the status
+    counts and ring buffers of the last `recent_limit` todos of each
+    channel are always current and a report never lists the stores. One
+    ring holds the newest todos overall; each status has its own ring of
+    the todos that most recently got it, so e.g. the newest pending todos
+    can be listed even when the last ten added are all completed. The
+    view is saved as a small JSON snapshot together with a signature of
+    each channel's store; a channel whose store changed behind the
+    snapshot's back (another process, a manual edit) is rebuilt once from
+    the store when its manager attaches.
+
+    Changes are written save_delay seconds after the first one, so a
+    burst of adds costs one write. Several processes share the snapshot:
+    a save re-reads it under a file lock and only replaces the channels
+    this process changed, taking the others as they are on disk.
+    """
+
+    def __init__(self, snapshot_file=DEFAULT_SNAPSHOT_FILE, recent_limit=RECENT_LIMIT, save_delay=SAVE_DELAY):
+        self.snapshot_file = snapshot_file
+        self.recent_limit = recent_limit
+        self.save_delay = save_delay
+        self.lock = threading.RLock()
+        self.channels = {}     # channel -> {'signature', 'counts', 'recent'}
+        self.dirty = set()     # Channels changed here since the last save
+        self.on_disk = {}      # channel -> signature it had in the snapshot when last read
+        self.save_timer = None
+        self.load()
+
+    def read_snapshot(self):
+        """The snapshot's channels as stored ({} if there is none yet)"""
+        try:
+            with open(self.snapshot_file, 'r') as f:
+                return json.load(f).get('channels', {})
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"Error loading report view: {e}")
+            return {}
+
+    def decode(self, stored):
+        by_status = stored.get('recent_by_status')
+        return {
+            # Snapshots from before the per-status rings get rebuilt
+            'signature': stored.get('signature') if by_status is not None else None,
+            'counts': Counter(stored.get('counts', {})),
+            'recent': deque(stored.get('recent', []), maxlen=self.recent_limit),
+            'recent_by_status': {status: deque(todos, maxlen=self.recent_limit)
+                                 for status, todos in (by_status or {}).items()}
+        }
+
+    def encode(self, state):
+        return {
+            'signature': state['signature'],
+            'counts': dict(state['counts']),
+            'recent': list(state['recent']),
+            'recent_by_status': {status: list(todos) for status, todos in state['recent_by_status'].items()}
+        }
+
+    def load(self):
+        with self.lock:
+            for channel, stored in self.read_snapshot().items():
+                self.channels[channel] = self.decode(stored)
+                self.on_disk[channel] = stored.get('signature')
+
+    def save(self):
+        """Merge this process's changed channels into the snapshot.
+
+        The snapshot is re-read under a file lock, so channels other
+        processes updated are kept (and adopted here). If another process
+        also changed one of our channels since we read it, neither copy
+        has every change: the channel is stored without a signature so
+        the next attach rebuilds it from the store.
+        """
+        with self.lock:
+            self.cancel_save()
+            if not self.dirty:
+                return
+            try:
+                with FileLock(f"{self.snapshot_file}.lock"):
+                    snapshot = self.read_snapshot()
+                    for channel, stored in snapshot.items():
+                        if channel not in self.dirty:
+                            self.channels[channel] = self.decode(stored)
+                    for channel in self.dirty:
+                        state = self.channels[channel]
+                        stored = snapshot.get(channel)
+                        if stored is not None and stored.get('signature') != self.on_disk.get(channel):
+                            state['signature'] = None
+                        snapshot[channel] = self.encode(state)
+
+                    tmp_file = f"{self.snapshot_file}.tmp"
+                    with open(tmp_file, 'w') as f:
+                        json.dump({'channels': snapshot}, f)
+                    os.replace(tmp_file, self.snapshot_file)
+                self.on_disk = {channel: stored['signature'] for channel, stored in snapshot.items()}
+                self.dirty.clear()
+            except Exception as e:
+                print(f"Error saving report view: {e}")
+
+    def changed(self, channel):
+        """Mark a channel for the next save and schedule one if none is pending"""
+        self.dirty.add(channel)
+        if self.save_timer is None:
+            self.save_timer = threading.Timer(self.save_delay, self.save)
+            self.save_timer.daemon = True
+            self.save_timer.start()
+
+    def cancel_save(self):
+        if self.save_timer is not None:
+            self.save_timer.cancel()
+            self.save_timer = None
+
+    def flush(self):
+        """Write pending changes now (called at exit)"""
+        self.save()
+
+    def attach(self, channel, signature, load_todos):
+        """Bring a channel in line with its store; returns True if it was rebuilt.
+
+        load_todos is only called when the snapshot does not match the
+        store's current signature.
+        """
+        signature = as_signature(signature)
+        with self.lock:
+            state = self.channels.get(channel)
+            if state is not None and state['signature'] == signature:
+                return False
+            self.rebuild(channel, load_todos(), signature)
+            return True
+
+    def rebuild(self, channel, todos, signature=None):
+        """Recount a channel from all of its todos"""
+        counts = Counter()
+        recent = deque(maxlen=self.recent_limit)
+        by_status = {}
+        for todo in todos:
+            status = todo['status'].lower()
+            counts[status] += 1
+            recent.append(dict(todo))
+            by_status.setdefault(status, deque(maxlen=self.recent_limit)).append(dict(todo))
+        with self.lock:
+            self.channels[channel] = {'signature': as_signature(signature), 'counts': counts,
+                                      'recent': recent, 'recent_by_status': by_status}
+            self.changed(channel)
+
+    def state(self, channel):
+        return self.channels.setdefault(channel, {
+            'signature': None, 'counts': Counter(), 'recent': deque(maxlen=self.recent_limit),
+            'recent_by_status': {}
+        })
+
+    def status_ring(self, state, status):
+        return state['recent_by_status'].setdefault(status.lower(), deque(maxlen=self.recent_limit))
+
+    def todo_added(self, channel, todo, signature=None):
+        with self.lock:
+            state = self.state(channel)
+            state['counts'][todo['status'].lower()] += 1
+            state['recent'].append(dict(todo))
+            self.status_ring(state, todo['status']).append(dict(todo))
+            state['signature'] = as_signature(signature)
+            self.changed(channel)
+
+    def status_changed(self, channel, todo_id, old_status, new_status, signature=None,
+                       todo=None, refill=None, **fields):
+        """Move one todo between status counts and rings (updating it wherever it is still recent).
+
+        todo is the changed todo, appended to the new status's ring. When
+        the old status's ring drops below what its count allows, refill()
+        replaces it with that status's newest todos, oldest first;
+        managers that hold them in memory pass it so the ring never runs
+        dry.
+        """
+        with self.lock:
+            state = self.state(channel)
+            old, new = old_status.lower(), new_status.lower()
+            if state['counts'][old] > 0:
+                state['counts'][old] -= 1
+            state['counts'][new] += 1
+            for ring in (state['recent'], *state['recent_by_status'].values()):
+                for recent in ring:
+                    if str(recent['id']) == str(todo_id):
+                        recent['status'] = new_status
+                        recent.update(fields)
+
+            old_ring = self.status_ring(state, old)
+            moved = [recent for recent in old_ring if str(recent['id']) == str(todo_id)]
+            for recent in moved:
+                old_ring.remove(recent)
+            if refill and len(old_ring) < min(self.recent_limit, state['counts'][old]):
+                state['recent_by_status'][old] = deque(
+                    (dict(recent) for recent in refill()), maxlen=self.recent_limit)
+            if todo is not None:
+                self.status_ring(state, new).append(dict(todo, **fields))
+            elif moved:
+                self.status_ring(state, new).append(moved[-1])
+
+            state['signature'] = as_signature(signature)
+            self.changed(channel)
+
+    def touch(self, channel, old_signature, signature):
+        """The store changed without affecting the view (e.g. a todo gained a field)
+
+        The new signature is only taken if the view matched the old one,
+        so a channel that was already stale still gets rebuilt.
+        """
+        with self.lock:
+            state = self.channels.get(channel)
+            if state is not None and state['signature'] == as_signature(old_signature):
+                state['signature'] = as_signature(signature)
+                self.changed(channel)
+
+    def count(self, channel, status=None):
+        """Todos in a channel, optionally only those with the given status"""
+        with self.lock:
+            counts = self.channels.get(channel, {}).get('counts', Counter())
+            if status is None:
+                return sum(counts.values())
+            return counts[status.lower()]
+
+    def counts(self, channel):
+        with self.lock:
+            counts = self.channels.get(channel, {}).get('counts', {})
+            return {status: n for status, n in counts.items() if n}
+
+    def recent(self, channel, limit=None, status=None):
+        """Most recently added todos of a channel (those that most recently got status), oldest first"""
+        with self.lock:
+            state = self.channels.get(channel, {})
+            if status is None:
+                ring = state.get('recent', ())
+            else:
+                ring = state.get('recent_by_status', {}).get(status.lower(), ())
+            todos = [dict(todo) for todo in ring]
+        return todos[-limit:] if limit else todos
+
+_report_view = None
+_report_view_lock = threading.Lock()
+
+def get_report_view():
+    """Return the process-wide report view shared by all channel managers"""
+    global _report_view
+    with _report_view_lock:
+        if _report_view is None:
+            _report_view = ReportView(get_settings().report_view_file or DEFAULT_SNAPSHOT_FILE)
+            atexit.register(_report_view.flush)
+        return _report_view
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Structured Logging
+JSON-lines logs written to rotating files by a background thread
+"""
+
+import sys
+import json
+import time
+import queue
+import random
+import atexit
+import logging
+import logging.handlers
+import threading
+from env_loader import get_settings
+
+MAX_BYTES = 10 * 1024 * 1024  # Rotate once a log file reaches this size
+BACKUP_COUNT = 5              # Rotated files kept per log
+QUEUE_SIZE = 10000            # Records buffered before new ones are dropped
+DROP_REPORT_INTERVAL = 10.0   # Seconds between "records dropped" warnings
+MAX_PAYLOAD_CHARS = 2000      # Longest payload excerpt written to a log
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message plus the record's fields"""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        entry.update(getattr(record, 'fields', {}))
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class DeferredFlushMixin:
+    """Leave flushing to the log writer instead of flushing after every record"""
+
+    def flush(self):
+        pass  # StreamHandler.emit calls this once per record
+
+    def flush_now(self):
+        super().flush()
+
+    def close(self):
+        self.flush_now()
+        super().close()
+
+class BufferedRotatingFileHandler(DeferredFlushMixin, logging.handlers.RotatingFileHandler):
+    pass
+
+class BufferedTimedRotatingFileHandler(DeferredFlushMixin, logging.handlers.TimedRotatingFileHandler):
+    pass
+
+class InProcessQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the writer thread as they are"""
+
+    def prepare(self, record):
+        # The writer is a thread in this process, so the record needs no
+        # copying or pre-formatting; it is formatted off the request path
+        return record
+
+class DroppingQueueHandler(InProcessQueueHandler):
+    """Drops records rather than block when the writer falls behind.
+
+    Drops are counted and reported in the log itself: a WARNING with the
+    number of records lost goes out at most every DROP_REPORT_INTERVAL
+    seconds, once the queue has room again, and on flush_logs().
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0      # Total since the logger was created
+        self.unreported = 0   # Dropped since the last warning
+        self.reported_at = time.monotonic()
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            self.unreported += 1
+            return
+        if self.unreported and time.monotonic() - self.reported_at >= DROP_REPORT_INTERVAL:
+            self.report_dropped(record.name)
+
+    def report_dropped(self, name):
+        """Queue a warning for the records dropped since the last one"""
+        with self.lock:
+            if not self.unreported:
+                return
+            warning = logging.makeLogRecord({
+                'name': name, 'levelno': logging.WARNING, 'levelname': 'WARNING',
+                'msg': f"⚠️  {self.unreported} log records dropped (queue full)",
+                'fields': {'dropped': self.unreported, 'dropped_total': self.dropped}
+            })
+            try:
+                self.queue.put_nowait(warning)
+            except queue.Full:
+                return
+            self.unreported = 0
+            self.reported_at = time.monotonic()
+
+class LogWriter(logging.handlers.QueueListener):
+    """Background thread that writes queued records.
+
+    Files are flushed when the queue runs dry rather than per record, so
+    a burst is written in a few large writes and the log is still up to
+    date as soon as traffic pauses.
+    """
+
+    def dequeue(self, block):
+        try:
+            return self.queue.get_nowait()
+        except queue.Empty:
+            self.flush()
+            return self.queue.get(block)
+
+    def flush(self):
+        for handler in self.handlers:
+            getattr(handler, 'flush_now', handler.flush)()
+
+    def stop(self):
+        super().stop()
+        self.flush()
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+def file_handler(log_file):
+    """Rotating JSON-lines handler: by time if LOG_ROTATE_WHEN is set (e.g. midnight), else by size"""
+    settings = get_settings()
+    backup_count = BACKUP_COUNT if settings.log_backup_count is None else settings.log_backup_count
+    if settings.log_rotate_when:
+        handler = BufferedTimedRotatingFileHandler(
+            log_file, when=settings.log_rotate_when, backupCount=backup_count, encoding='utf-8', delay=True)
+    else:
+        handler = BufferedRotatingFileHandler(
+            log_file, maxBytes=settings.log_max_bytes or MAX_BYTES, backupCount=backup_count,
+            encoding='utf-8', delay=True)
+    handler.setFormatter(JsonFormatter())
+    return handler
+
+def get_logger(name, log_file, console=False, lossless=False):
+    """Logger whose records are written to log_file (and the console) off the calling thread.
+
+    Every record goes to the file as JSON; with console=True, INFO and
+    above are also printed as plain messages. Logging never blocks: the
+    caller only puts the record on a bounded queue, and records that do
+    not fit are dropped (and counted). Use lossless=True for logs that
+    must be complete, such as sent responses: their queue is unbounded.
+    """
+    with _writers_lock:
+        logger = logging.getLogger(name)
+        if name not in _writers:
+            handlers = [file_handler(log_file)]
+            if console:
+                console_handler = logging.StreamHandler(sys.stdout)
+                console_handler.setLevel(logging.INFO)
+                console_handler.setFormatter(logging.Formatter('%(message)s'))
+                handlers.append(console_handler)
+
+            log_queue = queue.Queue(maxsize=0 if lossless else QUEUE_SIZE)
+            writer = LogWriter(log_queue, *handlers, respect_handler_level=True)
+            writer.start()
+            atexit.register(writer.stop)
+
+            logger.addHandler(InProcessQueueHandler(log_queue) if lossless else DroppingQueueHandler(log_queue))
+            logger.setLevel(logging.DEBUG)
+            logger.propagate = False
+            _writers[name] = writer
+        return logger
+
+def flush_logs():
+    """Wait until every queued record has been written and flushed.
+
+    An empty queue is not enough: the writer may still be handling the
+    record it took last. QueueListener calls task_done() only after a
+    record's handlers ran, so join() returns once all of them are written.
+    Drops not reported yet are logged once the queue has drained.
+    """
+    with _writers_lock:
+        writers = dict(_writers)
+    for name, writer in writers.items():
+        writer.queue.join()
+        for handler in logging.getLogger(name).handlers:
+            if isinstance(handler, DroppingQueueHandler):
+                handler.report_dropped(name)
+        writer.queue.join()
+        writer.flush()
+
+def log_event(logger, level, message, **fields):
+    """Log a message with structured fields (they become keys of the JSON line)"""
+    logger.log(level, message, extra={'fields': fields})
+
+def truncate(payload, max_chars=MAX_PAYLOAD_CHARS):
+    """Payload text (raw bytes, str or compact JSON) cut to max_chars with the size of the rest noted.
+
+    Pass the raw request body where there is one: it is sliced without
+    serializing (or decoding) the whole payload again.
+    """
+    if isinstance(payload, bytes):
+        size = len(payload)
+        text = payload[:max_chars].decode('utf-8', 'replace')
+    else:
+        text = payload if isinstance(payload, str) else json.dumps(
+            payload, separators=(',', ':'), ensure_ascii=False, default=str)
+        size = len(text)
+        text = text[:max_chars]
+    if size <= max_chars:
+        return text
+    return f"{text}...[{size - max_chars} more {'bytes' if isinstance(payload, bytes) else 'chars'}]"
+
+def sampled(rate):
+    """True for roughly `rate` (0-1) of calls"""
+    return rate >= 1 or (rate > 0 and random.random() < rate)
+
+def benchmark(count=20000):
+    """Per-message cost of appending to a reopened log file vs queueing a record.
+
+    The queued run uses a lossless logger, so both runs write every
+    record and the timings compare the same amount of work.
+    """
+    import os
+    import tempfile
+
+    workdir = tempfile.mkdtemp()
+    payload = {'entry': [{'changes': [{'value': {'messages': [{'text': {'body': 'x' * 5000}}]}}]}]}
+    body = json.dumps(payload).encode('utf-8')  # As received by the webhook
+    print(f"🧪 Logging {count} webhook responses and payloads...")
+
+    started = time.perf_counter()
+    for i in range(count):
+        with open(os.path.join(workdir, 'reopened.log'), 'a') as f:
+            f.write(f"919742814697: Added todo #{i}\n")
+            f.write(f"{json.dumps(payload, indent=2)}\n")
+    reopened = time.perf_counter() - started
+
+    logger = get_logger('structured_log.benchmark', os.path.join(workdir, 'queued.log'), lossless=True)
+    started = time.perf_counter()
+    for i in range(count):
+        log_event(logger, logging.INFO, "response", phone_number='919742814697', response=f"Added todo #{i}")
+        log_event(logger, logging.DEBUG, "payload", payload=truncate(body))
+    queued = time.perf_counter() - started
+    flush_logs()
+    written = time.perf_counter() - started
+
+    # The queued log may have rotated: count every file it wrote
+    queued_files = [os.path.join(workdir, name) for name in os.listdir(workdir) if name.startswith('queued.log')]
+    sizes = {'reopened.log': os.path.getsize(os.path.join(workdir, 'reopened.log')),
+             'queued.log': sum(os.path.getsize(path) for path in queued_files)}
+    records = 0
+    for path in queued_files:
+        with open(path, encoding='utf-8') as f:
+            records += sum(1 for _ in f)
+    if records != 2 * count:
+        print(f"❌ Queued run wrote {records} of {2 * count} records")
+        return
+    print(f"   • reopen + append  {reopened / count * 1e6:>7.1f}µs/message  {sizes['reopened.log'] / 1e6:>7.1f} MB"
+          f"  ({2 * count} records)")
+    print(f"   • queued records   {queued / count * 1e6:>7.1f}µs/message  {sizes['queued.log'] / 1e6:>7.1f} MB"
+          f"  ({records} records, written after {written:.2f}s)")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'bench':
+        benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 20000)
+    else:
+        print("Usage: python structured_log.py bench [count]")
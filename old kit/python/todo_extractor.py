@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Email Todo Extractor
+Finds todo items in an email body with one precompiled scan
+"""
+
+import re
+import time
+
+# Phrases that introduce a todo anywhere in a line ("please send the deck")
+TODO_KEYWORDS = [
+    'action item',
+    'remember to',
+    'follow up',
+    'reminder',
+    'need to',
+    'please',
+    'todo',
+    'task',
+]
+
+MIN_ITEM_LENGTH = 6
+SHORT_EMAIL_LENGTH = 100
+
+# Where the quoted part of a reply starts; everything after it is history
+QUOTE_START = re.compile(
+    r'^(?:On\b[^\n]*\bwrote:[ \t]*$'
+    r'|[ \t]*-{2,}[ \t]*Original Message[ \t]*-{2,}'
+    r'|_{10,}[ \t]*$'
+    r'|From:[^\n]*\n(?:Sent|Date):'
+    r'|-- $)',
+    re.MULTILINE | re.IGNORECASE
+)
+
+class TodoExtractor:
+    """Single-pass extractor for list items and keyword phrases.
+
+    One combined regex walks the body line by line: a numbered or bulleted
+    line yields its text, any other line yields whatever follows the first
+    todo keyword in it. Quoted reply history is cut off before scanning,
+    and both the scanned length and the number of items are capped, so a
+    huge thread costs no more than its first `max_chars` characters.
+    Items come back in the order they appear.
+    """
+
+    def __init__(self, keywords=TODO_KEYWORDS, max_chars=50000, max_items=50):
+        self.max_chars = max_chars
+        self.max_items = max_items
+        keyword = '|'.join(re.escape(k) for k in sorted(keywords, key=len, reverse=True))
+        self.line_regex = re.compile(
+            r'^[ \t]*(?:'
+            r'(?:\d+[.)]|[•*-])[ \t]+(?P<item>[^\n]+)'           # 1. item / • item
+            r'|(?!>)[^\n]*?(?:\b(?:' + keyword + r')s?\b[: \t]*)+'  # ... please remember to:
+            r'(?P<phrase>[^\n]+))',
+            re.MULTILINE | re.IGNORECASE
+        )
+
+    def strip_quoted(self, body):
+        body = body[:self.max_chars]
+        match = QUOTE_START.search(body)
+        return body[:match.start()] if match else body
+
+    def extract(self, body):
+        """Todo descriptions in source order, without duplicates"""
+        body = self.strip_quoted(body or '')
+
+        todos = {}
+        for match in self.line_regex.finditer(body):
+            item = (match.group('item') or match.group('phrase')).strip()
+            # "Please remember to:" only introduces the list that follows
+            if len(item) < MIN_ITEM_LENGTH or item.endswith(':'):
+                continue
+            todos[item] = None
+            if len(todos) >= self.max_items:
+                break
+
+        if not todos:
+            # A short email is usually a single todo in itself
+            text = body.strip()
+            if text and len(text) < SHORT_EMAIL_LENGTH:
+                return [text]
+        return list(todos)
+
+TODO_EXTRACTOR = TodoExtractor()
+
+def legacy_extract(email_body):
+    """Previous implementation: one re.findall pass per pattern, then set()"""
+    todos = []
+    patterns = [
+        r'todo[:\s]*(.+?)(?:\n|$)',
+        r'task[:\s]*(.+?)(?:\n|$)',
+        r'action item[:\s]*(.+?)(?:\n|$)',
+        r'please[:\s]*(.+?)(?:\n|$)',
+        r'reminder[:\s]*(.+?)(?:\n|$)',
+        r'follow up[:\s]*(.+?)(?:\n|$)',
+        r'need to[:\s]*(.+?)(?:\n|$)',
+        r'remember to[:\s]*(.+?)(?:\n|$)',
+    ]
+
+    for _, item in re.findall(r'(\d+)\.\s*(.+?)(?:\n|$)', email_body, re.IGNORECASE | re.MULTILINE):
+        if len(item.strip()) > 5:
+            todos.append(item.strip())
+
+    for item in re.findall(r'[•\-\*]\s*(.+?)(?:\n|$)', email_body, re.MULTILINE):
+        if len(item.strip()) > 5:
+            todos.append(item.strip())
+
+    for pattern in patterns:
+        for match in re.findall(pattern, email_body, re.IGNORECASE | re.MULTILINE):
+            if len(match.strip()) > 5:
+                todos.append(match.strip())
+
+    if not todos and len(email_body.strip()) < 100:
+        return [email_body.strip()]
+
+    return list(set(todos))
+
+def benchmark_corpus(size=2000):
+    """Synthetic mailbox: short notes, meeting minutes and long reply threads"""
+    meeting = (
+        "Hi team,\n\nHere are the action items from our meeting:\n\n"
+        "1. Review the quarterly budget\n2. Schedule investor call\n3. Update website content\n\n"
+        "Also, please remember to:\n• Call the marketing agency\n• Send project timeline\n\nThanks!\n"
+    )
+    note = "Reminder: renew the office lease before March"
+    chatter = (
+        "Hello,\n\nJust checking in on how things are going. The weather has been great and the "
+        "team lunch was fun. Let me know if you need to reschedule the review next week.\n\nBest,\nAnna\n"
+    )
+    history = "".join(
+        f"> {line}\n" for line in (meeting + chatter).splitlines()
+    ) * 40
+    thread = (
+        "Sounds good, I will follow up with legal on the contract.\n\n"
+        "On Tue, Mar 4, 2025 at 9:12 AM Raj <raj@example.com> wrote:\n" + history
+    )
+    samples = [meeting, note, chatter, thread]
+    return [samples[i % len(samples)] for i in range(size)]
+
+def benchmark(size=2000, rounds=3):
+    """Compare emails/sec of the single-scan extractor against the legacy passes"""
+    corpus = benchmark_corpus(size)
+    megabytes = sum(len(body) for body in corpus) / 1e6
+
+    print(f"⏱️  Extracting todos from {len(corpus)} emails ({megabytes:.1f} MB), best of {rounds} rounds")
+    print("-" * 40)
+
+    results = {}
+    for name, extract in [('legacy', legacy_extract), ('compiled', TODO_EXTRACTOR.extract)]:
+        best = None
+        for _ in range(rounds):
+            start = time.perf_counter()
+            for body in corpus:
+                extract(body)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        results[name] = len(corpus) / best
+        print(f"   • {name:<9} {results[name]:>12,.0f} emails/sec")
+
+    print(f"🚀 Speedup: {results['compiled'] / results['legacy']:.1f}x")
+    print(f"📋 Meeting notes -> {TODO_EXTRACTOR.extract(corpus[0])}")
+    return True
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'bench':
+        benchmark()
+    else:
+        print("Usage: python todo_extractor.py bench")
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Todo Index
+In-memory secondary indexes over a channel's todo list
+"""
+
+from itertools import islice, takewhile
+
+class TodoIndex:
+    """Hash indexes for todo lookups that would otherwise scan every todo.
+
+    Keeps id -> todo, status -> ids and (owner, status) -> ids, where the
+    owner is e.g. the WhatsApp phone number. Id buckets are insertion-ordered
+    dicts used as ordered sets, so adds and status moves are O(1) and the
+    most recent k ids of a bucket are read in O(k).
+    """
+
+    def __init__(self, todos=(), owner_field=None):
+        self.owner_field = owner_field
+        self.rebuild(todos)
+
+    def rebuild(self, todos):
+        """Index a freshly loaded todo list"""
+        self.by_id = {}
+        self.max_id = 0
+        self.buckets = {}
+        self.unsorted = set()  # Buckets that received an id out of order
+        for todo in todos:
+            self.add(todo)
+
+    def bucket_keys(self, todo, status):
+        keys = [('status', status)]
+        if self.owner_field:
+            keys.append(('owner', todo.get(self.owner_field), status))
+        return keys
+
+    def add(self, todo):
+        """Index a new todo"""
+        self.by_id[todo['id']] = todo
+        if todo['id'] > self.max_id:
+            self.max_id = todo['id']
+        for key in self.bucket_keys(todo, todo['status']):
+            self.insert_id(key, todo['id'])
+
+    def insert_id(self, key, todo_id):
+        bucket = self.buckets.setdefault(key, {})
+        if bucket and todo_id < next(reversed(bucket)):
+            self.unsorted.add(key)
+        bucket[todo_id] = None
+
+    def move(self, todo, old_status):
+        """Re-file a todo whose status changed from old_status"""
+        for key in self.bucket_keys(todo, old_status):
+            self.buckets.get(key, {}).pop(todo['id'], None)
+        for key in self.bucket_keys(todo, todo['status']):
+            self.insert_id(key, todo['id'])
+
+    def get(self, todo_id):
+        """Return the todo with this id, or None"""
+        return self.by_id.get(todo_id)
+
+    def ordered_bucket(self, status, owner=None):
+        key = ('owner', owner, status) if owner is not None else ('status', status)
+        bucket = self.buckets.get(key, {})
+        if key in self.unsorted:
+            # Completed todos arrive in completion order; restore id order lazily
+            bucket = dict.fromkeys(sorted(bucket))
+            self.buckets[key] = bucket
+            self.unsorted.discard(key)
+        return bucket
+
+    def list(self, status=None, owner=None):
+        """Todos with the given status (and owner), in id order"""
+        if status is None:
+            todos = self.by_id.values()
+            if owner is not None:
+                todos = [todo for todo in todos if todo.get(self.owner_field) == owner]
+            return sorted(todos, key=lambda todo: todo['id'])
+        return [self.by_id[todo_id] for todo_id in self.ordered_bucket(status, owner)]
+
+    def recent(self, status, owner=None, limit=5):
+        """Last `limit` todos with the given status, oldest first"""
+        bucket = self.ordered_bucket(status, owner)
+        todo_ids = list(islice(reversed(bucket), limit))
+        return [self.by_id[todo_id] for todo_id in reversed(todo_ids)]
+
+    def since(self, status, after_id, owner=None):
+        """Todos with the given status and an id above after_id, in id order"""
+        bucket = self.ordered_bucket(status, owner)
+        todo_ids = list(takewhile(lambda todo_id: todo_id > after_id, reversed(bucket)))
+        return [self.by_id[todo_id] for todo_id in reversed(todo_ids)]
+
+    def count(self, status, owner=None):
+        """Number of todos with the given status (and owner)"""
+        key = ('owner', owner, status) if owner is not None else ('status', status)
+        return len(self.buckets.get(key, {}))
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Todo Statistics
+Single-pass aggregation of sheet todos for reports and the mobile view
+"""
+
+from collections import Counter, deque
+from datetime import datetime, timedelta
+
+DUE_BUCKETS = ['overdue', 'due_today', 'due_this_week', 'due_later', 'no_due_date']
+
+def due_bucket(due_date, today):
+    """Classify a pending todo's due date (YYYY-MM-DD) relative to today"""
+    if not due_date:
+        return 'no_due_date'
+    try:
+        due = datetime.strptime(due_date, "%Y-%m-%d").date()
+    except ValueError:
+        return 'no_due_date'
+    if due < today:
+        return 'overdue'
+    if due == today:
+        return 'due_today'
+    if due <= today + timedelta(days=7):
+        return 'due_this_week'
+    return 'due_later'
+
+def summarize_todos(todos, today=None, recent_limit=5, top_limit=10):
+    """Compute every report counter in one pass over an iterable of todos.
+
+    Besides the counts, keeps the first `top_limit` pending todos (mobile
+    view) and the last `recent_limit` pending todos (summary report), so
+    callers never need to materialize or re-filter the full list.
+    """
+    today = today or datetime.now().date()
+    status_count = Counter()
+    priority_count = Counter()
+    due_count = Counter({bucket: 0 for bucket in DUE_BUCKETS})
+    top_pending = []
+    recent_pending = deque(maxlen=recent_limit)
+    total = 0
+
+    for todo in todos:
+        total += 1
+        status = todo['status'].lower()
+        status_count[status] += 1
+        priority_count[todo['priority']] += 1
+
+        if status == 'pending':
+            due_count[due_bucket(todo.get('due_date'), today)] += 1
+            if len(top_pending) < top_limit:
+                top_pending.append(todo)
+            recent_pending.append(todo)
+
+    completed = status_count['completed']
+    return {
+        'total': total,
+        'pending': status_count['pending'],
+        'completed': completed,
+        'status_count': dict(status_count),
+        'priority_count': dict(priority_count),
+        'due_count': dict(due_count),
+        'completion_rate': (completed / total * 100) if total else 0.0,
+        'top_pending': top_pending,
+        'recent_pending': list(recent_pending)
+    }
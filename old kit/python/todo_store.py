@@ -0,0 +1,674 @@
+#!/usr/bin/env python3
+"""
+Todo Storage Backends
+Pluggable persistence for channel todo managers (JSON, NDJSON log or SQLite)
+"""
+
+import os
+import re
+import json
+import sqlite3
+import threading
+from itertools import islice
+from env_loader import get_settings
+from id_sequence import FileLock
+
+DEFAULT_DB_FILE = "todos.db"
+COMPACT_THRESHOLD = 1000  # Superseded NDJSON lines tolerated before a rewrite
+READ_BLOCK_LINES = 4096   # NDJSON lines parsed per json.loads call
+
+def matches(todo, status=None, after_id=None, completed_after=None):
+    """Filter shared by the stores' load(status=..., after_id=..., completed_after=...)
+
+    completed_after is an ISO timestamp; completed_at values are ISO
+    timestamps too, so they compare as strings.
+    """
+    return ((status is None or todo['status'] == status) and
+            (after_id is None or todo['id'] > after_id) and
+            (completed_after is None or (todo.get('completed_at') or '') >= completed_after))
+
+def paginate(todos, page_size):
+    for start in range(0, len(todos), page_size):
+        yield todos[start:start + page_size]
+
+def file_signature(path):
+    """(mtime, size) of a store file, or None if it does not exist yet"""
+    try:
+        stat = os.stat(path)
+        return [stat.st_mtime_ns, stat.st_size]
+    except FileNotFoundError:
+        return None
+
+class JsonTodoStore:
+    """Original storage format: the whole todo list in one JSON document.
+
+    Every write rewrites the full file, so the in-memory list is passed in
+    alongside the changed todo - and must therefore hold every todo.
+    """
+
+    writes_full_list = True
+
+    def __init__(self, todo_file):
+        self.todo_file = todo_file
+
+    def load(self, status=None, after_id=None, completed_after=None):
+        """Load todos from the JSON file (optionally only those matching)"""
+        try:
+            if os.path.exists(self.todo_file):
+                with open(self.todo_file, 'r') as f:
+                    todos = json.load(f)
+                if status is None and after_id is None and completed_after is None:
+                    return todos
+                return [todo for todo in todos if matches(todo, status, after_id, completed_after)]
+        except Exception as e:
+            print(f"Error loading todos: {e}")
+        return []
+
+    def iter_pages(self, status=None, after_id=None, page_size=100, completed_after=None):
+        """Matching todos in id order, page_size at a time.
+
+        The JSON document can only be parsed whole, so the matching todos
+        are loaded up front; use the ndjson or sqlite backend for long
+        histories.
+        """
+        return paginate(self.load(status, after_id, completed_after), page_size)
+
+    def signature(self):
+        """Changes whenever the stored todos do, without reading them"""
+        return file_signature(self.todo_file)
+
+    def max_id(self):
+        return max((todo['id'] for todo in self.load()), default=0)
+
+    def save_all(self, todos):
+        """Rewrite the whole file (temp file + rename so a crash never truncates it)"""
+        try:
+            tmp_file = f"{self.todo_file}.tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump(todos, f, indent=2)
+            os.replace(tmp_file, self.todo_file)
+        except Exception as e:
+            print(f"Error saving todos: {e}")
+
+    def insert(self, todo, todos):
+        """Persist a newly added todo"""
+        self.save_all(todos)
+
+    def insert_many(self, new_todos, todos):
+        """Persist a batch of newly added todos with one rewrite"""
+        self.save_all(todos)
+
+    def update(self, todo, todos):
+        """Persist a changed todo"""
+        self.save_all(todos)
+
+    def update_many(self, changed, todos):
+        """Persist a batch of changed todos with one rewrite"""
+        self.save_all(todos)
+
+    def close(self):
+        pass
+
+class NdjsonTodoStore:
+    """Append-only log with one compact JSON todo per line.
+
+    Adding a todo appends one line and changing one appends its new
+    version, so writes no longer rewrite the file. On load the last
+    version of each id wins; records can be filtered while streaming, so
+    only the matching todos are ever materialized. Once superseded lines
+    outnumber live ones (and COMPACT_THRESHOLD), the file is rewritten
+    with just the current versions. An existing JSON file of the same
+    name is imported the first time.
+
+    The webhook server and the sync write the same log, so appends and
+    rewrites hold an inter-process lock on a companion .lock file: a
+    compaction reads and replaces the log without another process's
+    append slipping in between.
+    """
+
+    writes_full_list = False
+
+    def __init__(self, todo_file, compact_threshold=COMPACT_THRESHOLD):
+        base, ext = os.path.splitext(todo_file)
+        self.todo_file = base + '.ndjson' if ext == '.json' else todo_file
+        self.legacy_file = todo_file if ext == '.json' else None
+        self.compact_threshold = compact_threshold
+        self.lock = threading.RLock()  # Also guards the live/superseded counters
+        self.file_lock = f"{self.todo_file}.lock"
+        self.live = 0
+        self.superseded = 0
+        if not os.path.exists(self.todo_file) and self.legacy_file and os.path.exists(self.legacy_file):
+            todos = JsonTodoStore(self.legacy_file).load()
+            self.save_all(todos)
+            print(f"📦 Imported {len(todos)} todos from {self.legacy_file} into {self.todo_file}")
+
+    def encode(self, todo):
+        return json.dumps(todo, separators=(',', ':')) + '\n'
+
+    def iter_blocks(self, block_lines=READ_BLOCK_LINES):
+        """Stream the raw lines of the log in blocks"""
+        try:
+            with open(self.todo_file, 'r', encoding='utf-8') as f:
+                while True:
+                    block = [line for line in islice(f, block_lines) if line.strip()]
+                    if not block:
+                        return
+                    yield block
+        except FileNotFoundError:
+            return
+
+    def iter_records(self):
+        """Stream every stored version, oldest first"""
+        for block in self.iter_blocks():
+            yield from (todo for todo in self.decode_block(block) if todo is not None)
+
+    def decode_block(self, lines):
+        """Decode a block of lines (None in place of an unreadable line)"""
+        # One parse per block is much faster than one per line; JSON never
+        # holds a raw newline, so the lines join into a valid array
+        try:
+            return json.loads('[' + ','.join(lines) + ']')
+        except json.JSONDecodeError:
+            records = []
+            for line in lines:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    print(f"⚠️  Skipping unreadable line in {self.todo_file}")
+                    records.append(None)
+            return records
+
+    def line_id(self, line):
+        """Id of an encoded todo without parsing it (None if not at the front)"""
+        if line.startswith('{"id":'):
+            try:
+                return int(line[6:line.index(',', 6)])
+            except ValueError:
+                return None
+        return None
+
+    def prefilter(self, block, status_token, after_id, anything_matched):
+        """Split a block into lines worth decoding and ids that certainly stopped matching.
+
+        Returns (lines, steps): steps holds, in file order, None for each
+        line to decode or the id of a todo whose newer version fails the
+        filter (so an older matching version must be dropped).
+        """
+        lines, steps = [], []
+        for line in block:
+            if after_id is not None:
+                todo_id = self.line_id(line)
+                if todo_id is not None and todo_id <= after_id:
+                    continue
+            if status_token is not None and status_token not in line:
+                if not anything_matched and not lines:
+                    continue  # Nothing matched so far, so there is nothing to drop
+                todo_id = self.line_id(line)
+                if todo_id is not None:
+                    steps.append(todo_id)
+                    continue
+            lines.append(line)
+            steps.append(None)
+        return lines, steps
+
+    def load(self, status=None, after_id=None, completed_after=None):
+        """Current version of each todo in first-added order (optionally only those matching).
+
+        When filtering, lines that cannot match are recognized from their
+        text and never decoded, so loading the pending todos of a long,
+        mostly completed history parses only the pending ones.
+        """
+        todos = {}
+        lines = 0
+        filtered = status is not None or after_id is not None or completed_after is not None
+        status_token = f'"status":{json.dumps(status)}' if status is not None else None
+        try:
+            for block in self.iter_blocks():
+                lines += len(block)
+                if filtered:
+                    block, steps = self.prefilter(block, status_token, after_id, bool(todos))
+                else:
+                    steps = [None] * len(block)
+
+                records = iter(self.decode_block(block) if block else ())
+                for step in steps:
+                    if step is not None:
+                        todos.pop(step, None)
+                        continue
+                    todo = next(records)
+                    if todo is None:
+                        continue
+                    if matches(todo, status, after_id, completed_after):
+                        todos[todo['id']] = todo
+                    else:
+                        todos.pop(todo['id'], None)  # A newer version no longer matches
+        except Exception as e:
+            print(f"Error loading todos: {e}")
+            return []
+
+        if not filtered:
+            with self.lock:
+                self.live = len(todos)
+                self.superseded = lines - len(todos)
+        return list(todos.values())
+
+    def iter_pages(self, status=None, after_id=None, page_size=100, completed_after=None):
+        """Matching todos in first-added order, page_size at a time, streamed from the log.
+
+        A first pass over the log keeps only the byte offset of each id's
+        latest version; pages are then decoded from those offsets, so no
+        more than one page of todos is held at a time. Both passes read
+        the same open file, so a compaction in between changes nothing.
+        """
+        status_token = f'"status":{json.dumps(status)}'.encode('utf-8') if status is not None else None
+        try:
+            f = open(self.todo_file, 'rb')
+        except FileNotFoundError:
+            return
+        with f:
+            latest = {}
+            offset = 0
+            for line in f:
+                if line.strip():
+                    todo_id = None
+                    if line.rstrip().endswith(b'}'):  # A line torn by a crash never does
+                        todo_id = self.line_id(line[:32].decode('utf-8', 'replace'))
+                    if todo_id is None:
+                        try:
+                            todo_id = json.loads(line)['id']
+                        except (ValueError, KeyError, TypeError):
+                            todo_id = None  # Unreadable (e.g. torn) line
+                    if todo_id is not None:
+                        latest[todo_id] = offset
+                offset += len(line)
+
+            page = []
+            for todo_id, offset in latest.items():
+                if after_id is not None and todo_id <= after_id:
+                    continue
+                f.seek(offset)
+                line = f.readline()
+                if status_token is not None and status_token not in line:
+                    continue
+                try:
+                    todo = json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"⚠️  Skipping unreadable line in {self.todo_file}")
+                    continue
+                if matches(todo, status, after_id, completed_after):
+                    page.append(todo)
+                    if len(page) == page_size:
+                        yield page
+                        page = []
+            if page:
+                yield page
+
+    def signature(self):
+        """Changes whenever the log is appended to or compacted, without reading it"""
+        return file_signature(self.todo_file)
+
+    def max_id(self):
+        """Highest id in the log, read from the line prefixes where possible"""
+        highest = 0
+        for block in self.iter_blocks():
+            ids = [self.line_id(line) for line in block]
+            unknown = [line for line, todo_id in zip(block, ids) if todo_id is None]
+            if unknown:
+                ids.extend(todo['id'] for todo in self.decode_block(unknown) if todo is not None)
+            highest = max(highest, max((todo_id for todo_id in ids if todo_id is not None), default=0))
+        return highest
+
+    def append(self, todos):
+        data = ''.join(self.encode(todo) for todo in todos).encode('utf-8')
+        with self.lock, FileLock(self.file_lock):
+            with open(self.todo_file, 'a+b') as f:
+                if f.tell():
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b'\n':
+                        data = b'\n' + data  # Never extend a line torn by a crash
+                f.write(data)
+
+    def rewrite(self, todos):
+        """Replace the log with one line per todo (caller holds both locks)"""
+        tmp_file = f"{self.todo_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write(''.join(self.encode(todo) for todo in todos))
+        os.replace(tmp_file, self.todo_file)
+        self.live = len(todos)
+        self.superseded = 0
+
+    def save_all(self, todos):
+        """Rewrite the log with one line per todo (temp file + rename)"""
+        try:
+            with self.lock, FileLock(self.file_lock):
+                self.rewrite(todos)
+        except Exception as e:
+            print(f"Error saving todos: {e}")
+
+    def insert(self, todo, todos=None):
+        """Append a newly added todo"""
+        self.insert_many([todo], todos)
+
+    def insert_many(self, new_todos, todos=None):
+        """Append a batch of new todos with a single write"""
+        try:
+            with self.lock:
+                self.append(new_todos)
+                self.live += len(new_todos)
+        except Exception as e:
+            print(f"Error saving {len(new_todos)} todos: {e}")
+
+    def update(self, todo, todos=None):
+        """Append the new version of a changed todo (compacting now and then)"""
+        self.update_many([todo], todos)
+
+    def update_many(self, changed, todos=None):
+        """Append the new versions of several changed todos with a single write"""
+        try:
+            with self.lock:
+                self.append(changed)
+                self.superseded += len(changed)
+                if self.superseded > max(self.compact_threshold, self.live):
+                    self.compact()  # From the log: managers only hold part of the history
+        except Exception as e:
+            print(f"Error updating {len(changed)} todos: {e}")
+
+    def compact(self):
+        """Drop superseded versions from the log (read and rewritten under the file lock)"""
+        try:
+            with self.lock, FileLock(self.file_lock):
+                self.rewrite(self.load())
+        except Exception as e:
+            print(f"Error compacting todos: {e}")
+
+    def close(self):
+        pass
+
+class SQLiteTodoStore:
+    """One row per todo in a WAL-mode SQLite table.
+
+    Inserts and updates touch a single row, so write cost no longer grows
+    with the number of todos already stored. Every write also bumps the
+    table's counter in todo_versions within the same transaction; that
+    counter is the store's signature, read with one primary-key lookup.
+    """
+
+    writes_full_list = False
+
+    def __init__(self, db_file, table):
+        if not re.match(r'^[A-Za-z_][A-Za-z0-9_]*$', table):
+            raise ValueError(f"Invalid table name: {table}")
+        self.db_file = db_file
+        self.table = table
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.create_schema()
+
+    def create_schema(self):
+        """Create the todo table and its lookup indexes"""
+        with self.lock, self.conn:
+            self.conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {self.table} (
+                    id INTEGER PRIMARY KEY,
+                    phone_number TEXT,
+                    status TEXT NOT NULL,
+                    created_at TEXT,
+                    completed_at TEXT,
+                    data TEXT NOT NULL
+                )
+            """)
+            columns = [row[1] for row in self.conn.execute(f"PRAGMA table_info({self.table})")]
+            if 'completed_at' not in columns:
+                # Tables created before completed_at had its own column
+                self.conn.execute(f"ALTER TABLE {self.table} ADD COLUMN completed_at TEXT")
+                self.conn.execute(f"UPDATE {self.table} SET completed_at = json_extract(data, '$.completed_at')")
+            self.conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{self.table}_phone_status "
+                f"ON {self.table} (phone_number, status, id)"
+            )
+            self.conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{self.table}_status "
+                f"ON {self.table} (status, id)"
+            )
+            self.conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{self.table}_status_completed "
+                f"ON {self.table} (status, completed_at)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS todo_versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL)"
+            )
+            self.conn.execute("INSERT OR IGNORE INTO todo_versions (name, version) VALUES (?, 0)", (self.table,))
+
+    def bump_version(self):
+        """Count a write (call inside the write's transaction)"""
+        self.conn.execute("UPDATE todo_versions SET version = version + 1 WHERE name = ?", (self.table,))
+
+    def row_values(self, todo):
+        return (
+            todo['id'],
+            todo.get('phone_number'),
+            todo['status'],
+            todo.get('created_at'),
+            todo.get('completed_at'),
+            json.dumps(todo)
+        )
+
+    def where_clause(self, status=None, after_id=None, completed_after=None):
+        where, params = [], []
+        if status is not None:
+            where.append("status = ?")
+            params.append(status)
+        if after_id is not None:
+            where.append("id > ?")
+            params.append(after_id)
+        if completed_after is not None:
+            where.append("completed_at >= ?")
+            params.append(completed_after)
+        return (f" WHERE {' AND '.join(where)}" if where else ""), params
+
+    def load(self, status=None, after_id=None, completed_after=None):
+        """Load todos ordered by id (optionally only those matching)"""
+        clause, params = self.where_clause(status, after_id, completed_after)
+        try:
+            with self.lock:
+                rows = self.conn.execute(
+                    f"SELECT data FROM {self.table}{clause} ORDER BY id", params
+                ).fetchall()
+            return [json.loads(row[0]) for row in rows]
+        except Exception as e:
+            print(f"Error loading todos: {e}")
+            return []
+
+    def iter_pages(self, status=None, after_id=None, page_size=100, completed_after=None):
+        """Matching todos in id order, one keyset query per page"""
+        cursor = after_id
+        while True:
+            clause, params = self.where_clause(status, cursor, completed_after)
+            with self.lock:
+                rows = self.conn.execute(
+                    f"SELECT data FROM {self.table}{clause} ORDER BY id LIMIT ?", params + [page_size]
+                ).fetchall()
+            if not rows:
+                return
+            page = [json.loads(row[0]) for row in rows]
+            yield page
+            if len(page) < page_size:
+                return
+            cursor = page[-1]['id']
+
+    def signature(self):
+        """The table's write counter (changes with every write, from any process)"""
+        with self.lock:
+            row = self.conn.execute("SELECT version FROM todo_versions WHERE name = ?", (self.table,)).fetchone()
+        return [row[0] if row else 0]
+
+    def max_id(self):
+        with self.lock:
+            return self.conn.execute(f"SELECT MAX(id) FROM {self.table}").fetchone()[0] or 0
+
+    def save_all(self, todos):
+        """Upsert every todo in a single transaction"""
+        try:
+            with self.lock, self.conn:
+                self.conn.executemany(
+                    f"INSERT OR REPLACE INTO {self.table} "
+                    f"(id, phone_number, status, created_at, completed_at, data) VALUES (?, ?, ?, ?, ?, ?)",
+                    [self.row_values(todo) for todo in todos]
+                )
+                self.bump_version()
+        except Exception as e:
+            print(f"Error saving todos: {e}")
+
+    def insert(self, todo, todos=None):
+        """Insert a single todo row"""
+        try:
+            with self.lock, self.conn:
+                self.conn.execute(
+                    f"INSERT INTO {self.table} "
+                    f"(id, phone_number, status, created_at, completed_at, data) VALUES (?, ?, ?, ?, ?, ?)",
+                    self.row_values(todo)
+                )
+                self.bump_version()
+        except Exception as e:
+            print(f"Error saving todo #{todo.get('id')}: {e}")
+
+    def insert_many(self, new_todos, todos=None):
+        """Insert a batch of todo rows in one transaction"""
+        try:
+            with self.lock, self.conn:
+                self.conn.executemany(
+                    f"INSERT INTO {self.table} "
+                    f"(id, phone_number, status, created_at, completed_at, data) VALUES (?, ?, ?, ?, ?, ?)",
+                    [self.row_values(todo) for todo in new_todos]
+                )
+                self.bump_version()
+        except Exception as e:
+            print(f"Error saving {len(new_todos)} todos: {e}")
+
+    def update(self, todo, todos=None):
+        """Update a single todo row in place"""
+        try:
+            with self.lock, self.conn:
+                self.conn.execute(
+                    f"UPDATE {self.table} SET status = ?, completed_at = ?, data = ? WHERE id = ?",
+                    (todo['status'], todo.get('completed_at'), json.dumps(todo), todo['id'])
+                )
+                self.bump_version()
+        except Exception as e:
+            print(f"Error updating todo #{todo.get('id')}: {e}")
+
+    def update_many(self, changed, todos=None):
+        """Update several todo rows in one transaction"""
+        try:
+            with self.lock, self.conn:
+                self.conn.executemany(
+                    f"UPDATE {self.table} SET status = ?, completed_at = ?, data = ? WHERE id = ?",
+                    [(todo['status'], todo.get('completed_at'), json.dumps(todo), todo['id']) for todo in changed]
+                )
+                self.bump_version()
+        except Exception as e:
+            print(f"Error updating {len(changed)} todos: {e}")
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+def open_todo_store(table, todo_file):
+    """Open the storage backend selected by TODO_STORE_BACKEND (json, ndjson or sqlite)"""
+    settings = get_settings()
+    backend = settings.todo_store_backend
+
+    if backend == 'sqlite':
+        return SQLiteTodoStore(settings.todo_store_db or DEFAULT_DB_FILE, table)
+    if backend == 'ndjson':
+        return NdjsonTodoStore(todo_file)
+
+    if backend != 'json':
+        print(f"⚠️  Unknown TODO_STORE_BACKEND '{backend}', using json")
+    return JsonTodoStore(todo_file)
+
+def migrate_json_to_sqlite(json_file, db_file, table):
+    """One-shot import of an existing JSON todo file into SQLite.
+
+    Safe to re-run: todos whose id already exists in the table are skipped.
+    """
+    todos = JsonTodoStore(json_file).load()
+    store = SQLiteTodoStore(db_file, table)
+
+    try:
+        with store.lock, store.conn:
+            before = store.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            store.conn.executemany(
+                f"INSERT OR IGNORE INTO {table} "
+                f"(id, phone_number, status, created_at, completed_at, data) VALUES (?, ?, ?, ?, ?, ?)",
+                [store.row_values(todo) for todo in todos]
+            )
+            store.bump_version()
+            after = store.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    finally:
+        store.close()
+
+    migrated = after - before
+    print(f"📦 Migrated {migrated} of {len(todos)} todos from {json_file} into {db_file}:{table}")
+    return migrated
+
+def main():
+    """Migrate the channel JSON files into the SQLite store"""
+    db_file = get_settings().todo_store_db or DEFAULT_DB_FILE
+
+    print("🗄️  Migrating JSON todo files to SQLite")
+    print("=" * 40)
+
+    for table, json_file in [('whatsapp_todos', 'whatsapp_todos.json'),
+                             ('email_todos', 'email_todos.json')]:
+        if os.path.exists(json_file):
+            migrate_json_to_sqlite(json_file, db_file, table)
+        else:
+            print(f"⏭️  {json_file} not found, skipping")
+
+    print("\n💡 Set TODO_STORE_BACKEND=sqlite in your .env file to use the new store")
+
+def benchmark(count=100000, pending_ratio=0.05):
+    """Compare the JSON and NDJSON stores on a large, mostly completed history"""
+    import time
+    import tempfile
+
+    print(f"🏁 {count:,} todos, {pending_ratio:.0%} pending")
+    workdir = tempfile.mkdtemp()
+    todos = [{
+        'id': i,
+        'description': f"Follow up with the vendor about invoice {i}",
+        'phone_number': '919742814697',
+        'status': 'pending' if i > count * (1 - pending_ratio) else 'completed',
+        'created_at': '2025-01-01T09:00:00',
+        'completed_at': None
+    } for i in range(1, count + 1)]
+
+    json_store = JsonTodoStore(os.path.join(workdir, 'todos.json'))
+    ndjson_store = NdjsonTodoStore(os.path.join(workdir, 'todos.ndjson'))
+    for name, store in [('json', json_store), ('ndjson', ndjson_store)]:
+        store.save_all(todos)
+        timings = []
+        for kwargs in ({}, {'status': 'pending'}):
+            started = time.perf_counter()
+            loaded = store.load(**kwargs)
+            timings.append((time.perf_counter() - started, len(loaded)))
+        started = time.perf_counter()
+        new_todo = dict(todos[-1], id=count + 1)
+        store.insert(new_todo, todos + [new_todo])
+        insert_time = time.perf_counter() - started
+        print(f"   • {name:<7} {os.path.getsize(store.todo_file) / 1e6:>6.1f} MB  "
+              f"load {timings[0][0] * 1000:>6.0f}ms  pending-only {timings[1][0] * 1000:>6.0f}ms "
+              f"({timings[1][1]:,} todos)  insert {insert_time * 1000:>6.1f}ms")
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'migrate':
+        main()
+    elif len(sys.argv) > 1 and sys.argv[1] == 'bench':
+        benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 100000)
+    else:
+        print("Usage: python todo_store.py [migrate | bench [count]]")
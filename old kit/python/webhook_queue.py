@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Webhook Message Queue
+Durable SQLite spool for incoming WhatsApp messages, drained by background workers
+"""
+
+import time
+import hashlib
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+DEFAULT_SPOOL_FILE = "webhook_spool.db"
+
+class WebhookQueue:
+    """Ack-then-process queue for webhook deliveries.
+
+    Messages are keyed on the WhatsApp message id, so a retried delivery of
+    a message we have already accepted is dropped at enqueue time. Messages
+    from the same sender are never processed concurrently, which keeps
+    "add" / "done" commands in the order they were sent.
+    """
+
+    def __init__(self, spool_file=DEFAULT_SPOOL_FILE, workers=2, max_attempts=3, poll_interval=1.0):
+        self.spool_file = spool_file
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition(self.lock)
+        self.in_flight = set()  # Senders currently being processed
+        self.threads = []
+        self.running = False
+
+        self.conn = sqlite3.connect(spool_file, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.create_schema()
+
+    def create_schema(self):
+        with self.lock, self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS messages (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    message_id TEXT NOT NULL UNIQUE,
+                    phone_number TEXT NOT NULL,
+                    body TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    last_error TEXT,
+                    received_at TEXT NOT NULL,
+                    processed_at TEXT
+                )
+            """)
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_messages_status ON messages (status, seq)"
+            )
+            # Anything left mid-processing by a crash goes back in the queue
+            self.conn.execute(
+                "UPDATE messages SET status = 'queued' WHERE status = 'processing'"
+            )
+
+    def message_key(self, message):
+        """Dedup key: the WhatsApp message id, or a content hash if it is missing"""
+        if message.get('id'):
+            return message['id']
+        raw = f"{message.get('from', '')}|{message.get('timestamp', '')}|{message.get('text', {}).get('body', '')}"
+        return 'sha1:' + hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def enqueue(self, message):
+        """Spool a text message; returns False if it was already received"""
+        with self.lock:
+            with self.conn:
+                cursor = self.conn.execute(
+                    "INSERT OR IGNORE INTO messages (message_id, phone_number, body, received_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (
+                        self.message_key(message),
+                        message.get('from', ''),
+                        message.get('text', {}).get('body', ''),
+                        datetime.now().isoformat()
+                    )
+                )
+            if cursor.rowcount:
+                self.wakeup.notify()
+                return True
+        return False
+
+    def claim_next(self):
+        """Claim the oldest queued message whose sender is not already in flight"""
+        busy = list(self.in_flight)
+        placeholders = ','.join('?' * len(busy))
+        query = "SELECT seq, message_id, phone_number, body, attempts FROM messages WHERE status = 'queued'"
+        if busy:
+            query += f" AND phone_number NOT IN ({placeholders})"
+        query += " ORDER BY seq LIMIT 1"
+
+        row = self.conn.execute(query, busy).fetchone()
+        if not row:
+            return None
+
+        with self.conn:
+            self.conn.execute(
+                "UPDATE messages SET status = 'processing', attempts = attempts + 1 WHERE seq = ?",
+                (row[0],)
+            )
+        self.in_flight.add(row[2])
+        return {
+            'seq': row[0],
+            'message_id': row[1],
+            'phone_number': row[2],
+            'body': row[3],
+            'attempts': row[4] + 1
+        }
+
+    def finish(self, item, error=None):
+        """Record the outcome of processing a claimed message"""
+        with self.lock:
+            if error is None:
+                status = 'done'
+            elif item['attempts'] >= self.max_attempts:
+                status = 'failed'
+            else:
+                status = 'queued'
+
+            with self.conn:
+                self.conn.execute(
+                    "UPDATE messages SET status = ?, last_error = ?, processed_at = ? WHERE seq = ?",
+                    (status, error, datetime.now().isoformat(), item['seq'])
+                )
+            self.in_flight.discard(item['phone_number'])
+            self.wakeup.notify_all()
+
+    def worker_loop(self, handler):
+        while True:
+            with self.lock:
+                item = None
+                while self.running:
+                    item = self.claim_next()
+                    if item:
+                        break
+                    self.wakeup.wait(self.poll_interval)
+                if not self.running:
+                    return
+
+            try:
+                handler(item['phone_number'], item['body'])
+                self.finish(item)
+            except Exception as e:
+                print(f"❌ Error processing queued message {item['message_id']}: {e}")
+                self.finish(item, str(e))
+
+    def start(self, handler):
+        """Start background workers calling handler(phone_number, text) per message"""
+        with self.lock:
+            self.running = True
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self.worker_loop,
+                args=(handler,),
+                name=f"webhook-queue-{i}",
+                daemon=True
+            )
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self, timeout=5):
+        """Stop the workers; queued messages stay in the spool for next start"""
+        with self.lock:
+            self.running = False
+            self.wakeup.notify_all()
+        for thread in self.threads:
+            thread.join(timeout)
+        self.threads = []
+
+    def pending_count(self):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM messages WHERE status IN ('queued', 'processing')"
+            ).fetchone()[0]
+
+    def wait_until_empty(self, timeout=30):
+        """Block until every queued message has been processed (used by tests)"""
+        deadline = time.time() + timeout
+        while self.pending_count():
+            if time.time() > deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def purge_processed(self, keep_days=7):
+        """Drop finished messages older than keep_days (the dedup window)"""
+        cutoff = (datetime.now() - timedelta(days=keep_days)).isoformat()
+        with self.lock, self.conn:
+            cursor = self.conn.execute(
+                "DELETE FROM messages WHERE status IN ('done', 'failed') AND processed_at < ?",
+                (cutoff,)
+            )
+        return cursor.rowcount
+
+    def close(self):
+        self.stop()
+        with self.lock:
+            self.conn.close()
@@ -4,90 +4,26 @@ WhatsApp Todo Integration
 Processes WhatsApp messages to create and manage todos
 """
 
-import os
 import re
-import json
-import subprocess
 from datetime import datetime
-from env_loader import load_env
+from manager_base import ChannelTodoManager
+from github_publisher import get_publisher
+from command_parser import COMMAND_PARSER
+from dedup_index import get_dedup_index
 
-class WhatsAppTodoManager:
-    def __init__(self):
-        load_env()
-        self.todo_file = "whatsapp_todos.json"
-        self.load_todos()
-    
-    def load_todos(self):
-        """Load existing todos from file"""
-        try:
-            if os.path.exists(self.todo_file):
-                with open(self.todo_file, 'r') as f:
-                    self.todos = json.load(f)
-            else:
-                self.todos = []
-        except Exception as e:
-            print(f"Error loading todos: {e}")
-            self.todos = []
-    
-    def save_todos(self):
-        """Save todos to file"""
-        try:
-            with open(self.todo_file, 'w') as f:
-                json.dump(self.todos, f, indent=2)
-        except Exception as e:
-            print(f"Error saving todos: {e}")
+class WhatsAppTodoManager(ChannelTodoManager):
+    CHANNEL = 'whatsapp'
+    TABLE = 'whatsapp_todos'
+    TODO_FILE = "whatsapp_todos.json"
+    OWNER_FIELD = 'phone_number'
     
     def parse_whatsapp_message(self, message, phone_number):
         """Parse WhatsApp message to extract todo actions"""
         message = message.strip().lower()
         phone_number = self.clean_phone_number(phone_number)
         
-        # Patterns for different todo actions
-        patterns = {
-            'add': [
-                r'add todo[:\s]+(.+)',
-                r'new todo[:\s]+(.+)',
-                r'create todo[:\s]+(.+)',
-                r'todo[:\s]+(.+)',
-                r'task[:\s]+(.+)',
-            ],
-            'complete': [
-                r'complete[:\s]+(?:#)?(\d+)',
-                r'done[:\s]+(?:#)?(\d+)',
-                r'finished[:\s]+(?:#)?(\d+)',
-                r'mark done[:\s]+(?:#)?(\d+)',
-            ],
-            'list': [
-                r'list todos?',
-                r'show todos?',
-                r'my todos?',
-                r'what are my todos?',
-                r'pending todos?',
-            ],
-            'help': [
-                r'help',
-                r'how to use',
-                r'commands',
-                r'what can you do',
-            ]
-        }
-        
-        for action, pattern_list in patterns.items():
-            for pattern in pattern_list:
-                match = re.search(pattern, message)
-                if match:
-                    if action in ['add']:
-                        return action, match.group(1).strip()
-                    elif action in ['complete']:
-                        return action, int(match.group(1))
-                    else:
-                        return action, None
-        
-        # If no pattern matches, treat as add todo
-        if len(message) > 3:  # Avoid very short messages
-            return 'add', message
-        
-        return 'unknown', None
+        # Grammar is compiled once at import (see command_parser.py)
+        return COMMAND_PARSER.parse(message)
     
     def clean_phone_number(self, phone_number):
         """Clean and standardize phone number"""
@@ -104,22 +40,21 @@ class WhatsAppTodoManager:
     
     def add_todo(self, description, phone_number):
         """Add a new todo"""
-        todo_id = len(self.todos) + 1
-        todo = {
-            'id': todo_id,
-            'description': description,
-            'phone_number': phone_number,
-            'status': 'pending',
-            'created_at': datetime.now().isoformat(),
-            'completed_at': None
-        }
+        with self.lock:
+            todo_id = self.next_todo_id()
+            todo = {
+                'id': todo_id,
+                'description': description,
+                'phone_number': phone_number,
+                'status': 'pending',
+                'created_at': datetime.now().isoformat(),
+                'completed_at': None
+            }
+            self.store_new_todo(todo)
         
-        self.todos.append(todo)
-        self.save_todos()
-        
-        # Try to create GitHub issue if possible
+        # Queue a GitHub issue if publishing is configured
         try:
-            self.create_github_issue(description)
+            self.create_github_issue(description, todo_id)
         except Exception as e:
             print(f"Could not create GitHub issue: {e}")
         
@@ -127,34 +62,39 @@ class WhatsAppTodoManager:
     
     def complete_todo(self, todo_id):
         """Mark a todo as completed"""
-        for todo in self.todos:
-            if todo['id'] == todo_id and todo['status'] == 'pending':
-                todo['status'] = 'completed'
-                todo['completed_at'] = datetime.now().isoformat()
-                self.save_todos()
-                return True
-        return False
+        return self.mark_completed(todo_id) is not None
     
     def list_todos(self, phone_number, status='pending'):
         """List todos for a specific phone number"""
-        user_todos = [
-            todo for todo in self.todos 
-            if todo['phone_number'] == phone_number and todo['status'] == status
-        ]
-        return user_todos
-    
-    def create_github_issue(self, description):
-        """Create GitHub issue for todo (if gh CLI is available)"""
-        try:
-            cmd = [
-                'gh', 'issue', 'create',
-                '--repo', 'hebbarp/todo-management',
-                '--title', description,
-                '--body', f'Created via WhatsApp integration at {datetime.now()}'
-            ]
-            subprocess.run(cmd, check=True, capture_output=True)
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            pass  # gh CLI not available or not authenticated
+        if not self.indexed(status):
+            return [todo for todo in self.iter_todos(status) if todo['phone_number'] == phone_number]
+        with self.lock:
+            return self.index.list(status, owner=phone_number)
+    
+    def recent_todos(self, phone_number, status='pending', limit=5):
+        """Most recent todos for a phone number, oldest first"""
+        if not self.indexed(status):
+            return self.list_todos(phone_number, status)[-limit:]
+        with self.lock:
+            return self.index.recent(status, owner=phone_number, limit=limit)
+    
+    def create_github_issue(self, description, todo_id=None):
+        """Queue a GitHub issue for the todo (published in the background)"""
+        dedup = get_dedup_index()
+        if dedup.seen('github', description):
+            return  # Same task already has an issue from another channel
+        
+        def on_created(issue_number):
+            # Recorded only once the issue exists, so a failed publish is retried later
+            dedup.add('github', description)
+            if todo_id is not None:
+                self.set_github_issue(todo_id, issue_number)
+        
+        get_publisher().enqueue(
+            title=description,
+            body=f'Created via WhatsApp integration at {datetime.now()}',
+            on_created=on_created
+        )
     
     def process_message(self, message, phone_number):
         """Process a WhatsApp message and return response"""
@@ -172,10 +112,10 @@ class WhatsAppTodoManager:
                 return f"❌ Todo #{data} not found or already completed"
         
         elif action == 'list':
-            todos = self.list_todos(phone_number)
+            todos = self.recent_todos(phone_number, limit=5)  # Show last 5
             if todos:
                 response = "📋 Your pending todos:\n"
-                for todo in todos[-5:]:  # Show last 5
+                for todo in todos:
                     response += f"#{todo['id']}: {todo['description']}\n"
                 return response.strip()
             else:
@@ -251,6 +191,8 @@ def main():
     for message in test_messages:
         simulate_whatsapp_message(message)
         print()
+    
+    get_publisher().flush()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -4,18 +4,114 @@ WhatsApp Webhook Server
 Receives WhatsApp messages via webhook and processes todos
 """
 
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import os
 import json
+import logging
+import threading
 import urllib.parse
 from whatsapp_todo_integration import WhatsAppTodoManager
-from env_loader import load_env
+from webhook_queue import WebhookQueue, DEFAULT_SPOOL_FILE
+from structured_log import get_logger, log_event, flush_logs, truncate, sampled, MAX_PAYLOAD_CHARS
+from env_loader import get_settings
+
+DEFAULT_WORKERS = 8
+DEFAULT_QUEUE_WORKERS = 2
+DEFAULT_LOG_FILE = "whatsapp_webhook.log"
+RESPONSE_LOG_FILE = "whatsapp_responses.log"
+PAYLOAD_SAMPLE_RATE = 1.0  # Share of webhook payloads written to the log
+
+class WebhookServer(ThreadingHTTPServer):
+    """HTTPServer with one thread per connection and a bounded request count.
+
+    Idle keep-alive connections only park their own thread, so they never
+    hold up other clients; `workers` caps how many requests are handled
+    at the same time.
+
+    All handlers share one long-lived WhatsAppTodoManager instead of
+    building (and reloading) a new one per request. Incoming messages are
+    spooled to `message_queue` and processed by its background workers.
+    Logging goes through structured_log, so request threads only queue
+    records and payloads are logged truncated (and optionally sampled).
+    """
+
+    daemon_threads = True  # Idle keep-alive connections must not block shutdown
+    
+    def __init__(self, server_address, handler_class, todo_manager, message_queue, workers=DEFAULT_WORKERS):
+        super().__init__(server_address, handler_class)
+        self.todo_manager = todo_manager
+        self.message_queue = message_queue
+        self.workers = workers
+        self.request_slots = threading.BoundedSemaphore(workers)
+        
+        settings = get_settings()
+        self.log = get_logger('whatsapp.webhook', settings.webhook_log_file or DEFAULT_LOG_FILE, console=True)
+        self.response_log = get_logger('whatsapp.responses', RESPONSE_LOG_FILE, lossless=True)
+        self.payload_chars = settings.webhook_payload_log_chars or MAX_PAYLOAD_CHARS
+        self.payload_sample_rate = (PAYLOAD_SAMPLE_RATE if settings.webhook_payload_sample_rate is None
+                                    else settings.webhook_payload_sample_rate)
+        
+        self.message_queue.start(self.handle_queued_message)
+    
+    def handle_queued_message(self, phone_number, text_content):
+        """Process one spooled message (runs on a queue worker thread)"""
+        log_event(self.log, logging.INFO, f"📱 Processing message from {phone_number}: {text_content}",
+                  phone_number=phone_number)
+        
+        response = self.todo_manager.process_message(text_content, phone_number)
+        
+        log_event(self.log, logging.INFO, f"🤖 Generated response: {response}", phone_number=phone_number)
+        
+        # In a real implementation, you would send the response back via WhatsApp API
+        # For now, we just log it
+        self.log_response(phone_number, response)
+    
+    def log_response(self, phone_number, response):
+        """Log the response (in real implementation, send via WhatsApp API)"""
+        log_event(self.log, logging.INFO, f"📤 Would send to {phone_number}: {response}", phone_number=phone_number)
+        
+        # TODO: Implement actual WhatsApp message sending
+        # This would require WhatsApp Business API credentials
+        # For now, we simulate the response
+        
+        log_event(self.response_log, logging.INFO, "response", phone_number=phone_number, response=response)
+    
+    def server_close(self):
+        super().server_close()
+        self.message_queue.close()
+        flush_logs()
 
 class WhatsAppWebhookHandler(BaseHTTPRequestHandler):
-    def __init__(self, *args, **kwargs):
-        self.todo_manager = WhatsAppTodoManager()
-        super().__init__(*args, **kwargs)
+    # Keep connections open between webhook deliveries; idle connections are
+    # dropped after `timeout` seconds so they don't pile up threads
+    protocol_version = 'HTTP/1.1'
+    timeout = 15
+    
+    @property
+    def todo_manager(self):
+        return self.server.todo_manager
+    
+    def log_message(self, format, *args):
+        """Access log lines go to the structured log instead of stderr"""
+        log_event(self.server.log, logging.DEBUG, format % args, client=self.client_address[0])
+    
+    def send_body(self, status, body, content_type='application/json'):
+        """Send a complete response (Content-Length is required for keep-alive)"""
+        self.send_response(status)
+        self.send_header('Content-type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
     
     def do_GET(self):
+        with self.server.request_slots:
+            self.handle_get()
+    
+    def do_POST(self):
+        with self.server.request_slots:
+            self.handle_post()
+    
+    def handle_get(self):
         """Handle webhook verification (required by WhatsApp)"""
         parsed_path = urllib.parse.urlparse(self.path)
         query_params = urllib.parse.parse_qs(parsed_path.query)
@@ -29,106 +125,96 @@ class WhatsAppWebhookHandler(BaseHTTPRequestHandler):
             expected_token = "todo_management_webhook_token"  # Change this!
             
             if verify_token == expected_token:
-                self.send_response(200)
-                self.send_header('Content-type', 'text/plain')
-                self.end_headers()
-                self.wfile.write(challenge.encode())
-                print(f"✅ Webhook verified successfully")
+                self.send_body(200, challenge.encode(), 'text/plain')
+                self.server.log.info("✅ Webhook verified successfully")
             else:
-                self.send_response(403)
-                self.end_headers()
-                print(f"❌ Webhook verification failed")
+                self.send_body(403, b'', 'text/plain')
+                self.server.log.warning("❌ Webhook verification failed")
         else:
             # Health check endpoint
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
             response = {
                 'status': 'running',
                 'service': 'WhatsApp Todo Webhook',
-                'version': '1.0'
+                'version': '1.0',
+                'workers': self.server.workers
             }
-            self.wfile.write(json.dumps(response).encode())
+            self.send_body(200, json.dumps(response).encode())
     
-    def do_POST(self):
-        """Handle incoming WhatsApp messages"""
+    def handle_post(self):
+        """Accept incoming WhatsApp messages; processing happens in the background"""
         try:
             content_length = int(self.headers['Content-Length'])
             post_data = self.rfile.read(content_length)
             
             # Parse webhook payload
-            webhook_data = json.loads(post_data.decode('utf-8'))
+            try:
+                webhook_data = json.loads(post_data.decode('utf-8'))
+            except ValueError as e:
+                self.send_body(400, json.dumps({'error': f'Invalid JSON: {e}'}).encode())
+                return
             
-            print(f"📱 Received webhook data: {json.dumps(webhook_data, indent=2)}")
+            # Full payloads only reach the log file, cut short and for a sample of requests
+            fields = {'bytes': content_length}
+            if sampled(self.server.payload_sample_rate):
+                fields['payload'] = truncate(post_data, self.server.payload_chars)
+            log_event(self.server.log, logging.DEBUG, "📱 Received webhook data", **fields)
             
-            # Process WhatsApp Business API webhook format
+            # Spool WhatsApp Business API webhook format
+            queued = 0
             if 'entry' in webhook_data:
                 for entry in webhook_data['entry']:
                     if 'changes' in entry:
                         for change in entry['changes']:
                             if change.get('field') == 'messages':
-                                self.process_messages(change.get('value', {}))
+                                queued += self.process_messages(change.get('value', {}))
             
-            # Send success response
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            self.wfile.write(json.dumps({'status': 'success'}).encode())
+            # Acknowledge right away so the provider does not retry
+            self.send_body(200, json.dumps({'status': 'accepted', 'queued': queued}).encode())
             
         except Exception as e:
-            print(f"❌ Error processing webhook: {e}")
-            self.send_response(500)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            self.wfile.write(json.dumps({'error': str(e)}).encode())
+            log_event(self.server.log, logging.ERROR, f"❌ Error processing webhook: {e}")
+            self.send_body(500, json.dumps({'error': str(e)}).encode())
     
     def process_messages(self, messages_data):
-        """Process incoming messages from WhatsApp"""
+        """Spool incoming text messages; returns how many were newly queued"""
         if 'messages' not in messages_data:
-            return
+            return 0
         
+        queued = 0
         for message in messages_data['messages']:
-            try:
-                # Extract message details
-                phone_number = message.get('from', '')
-                message_type = message.get('type', '')
-                
-                if message_type == 'text':
-                    text_content = message.get('text', {}).get('body', '')
-                    
-                    print(f"📱 Processing message from {phone_number}: {text_content}")
-                    
-                    # Process the todo
-                    response = self.todo_manager.process_message(text_content, phone_number)
-                    
-                    print(f"🤖 Generated response: {response}")
-                    
-                    # In a real implementation, you would send the response back via WhatsApp API
-                    # For now, we just log it
-                    self.log_response(phone_number, response)
-                    
-            except Exception as e:
-                print(f"❌ Error processing message: {e}")
-    
-    def log_response(self, phone_number, response):
-        """Log the response (in real implementation, send via WhatsApp API)"""
-        print(f"📤 Would send to {phone_number}: {response}")
-        
-        # TODO: Implement actual WhatsApp message sending
-        # This would require WhatsApp Business API credentials
-        # For now, we simulate the response
+            if message.get('type', '') != 'text':
+                continue
+            
+            if self.server.message_queue.enqueue(message):
+                queued += 1
+            else:
+                log_event(self.server.log, logging.INFO, f"♻️  Duplicate delivery ignored: {message.get('id')}",
+                          message_id=message.get('id'))
         
-        with open('whatsapp_responses.log', 'a') as f:
-            f.write(f"{phone_number}: {response}\n")
+        return queued
 
-def start_webhook_server(port=8000):
-    """Start the webhook server"""
-    load_env()
+def create_webhook_server(port=8000, workers=None, host='localhost', spool_file=None):
+    """Create a threaded webhook server with one shared todo manager"""
+    settings = get_settings()
     
-    server = HTTPServer(('localhost', port), WhatsAppWebhookHandler)
+    if workers is None:
+        workers = settings.webhook_workers or DEFAULT_WORKERS
+    
+    todo_manager = WhatsAppTodoManager()
+    message_queue = WebhookQueue(
+        spool_file or settings.webhook_spool_db or DEFAULT_SPOOL_FILE,
+        workers=settings.webhook_queue_workers or DEFAULT_QUEUE_WORKERS
+    )
+    message_queue.purge_processed()
+    return WebhookServer((host, port), WhatsAppWebhookHandler, todo_manager, message_queue, workers)
+
+def start_webhook_server(port=8000, workers=None):
+    """Start the webhook server"""
+    server = create_webhook_server(port, workers)
     
     print(f"🚀 WhatsApp Webhook Server starting...")
     print(f"📡 Listening on: http://localhost:{port}")
+    print(f"🧵 Concurrent requests: {server.workers}, queue workers: {server.message_queue.workers}")
     print(f"🔗 Webhook URL: http://localhost:{port}/webhook")
     print(f"💡 For production, use a service like ngrok to expose this publicly")
     print(f"⚠️  Remember to configure your webhook verify token!")
@@ -164,9 +250,30 @@ def test_webhook():
         }]
     }
     
-    # Simulate processing
-    handler = WhatsAppWebhookHandler(None, None, None)
-    handler.process_messages(sample_webhook_data['entry'][0]['changes'][0]['value'])
+    # Run a real server on a free port and post the sample over one
+    # keep-alive connection; the second post is a retried delivery and
+    # must not create a second todo
+    import http.client
+    import tempfile
+    import threading
+    
+    spool_dir = tempfile.mkdtemp()
+    server = create_webhook_server(port=0, workers=2, spool_file=os.path.join(spool_dir, 'spool.db'))
+    port = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    
+    try:
+        conn = http.client.HTTPConnection('localhost', port, timeout=10)
+        body = json.dumps(sample_webhook_data)
+        for _ in range(2):
+            conn.request('POST', '/webhook', body, {'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            print(f"📨 {response.status} {response.read().decode()}")
+        conn.close()
+        server.message_queue.wait_until_empty()
+    finally:
+        server.shutdown()
+        server.server_close()
 
 if __name__ == "__main__":
     import sys